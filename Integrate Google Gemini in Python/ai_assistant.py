@@ -1,5 +1,8 @@
 import os
-import requests
+import http_client
+from conversation_memory import ConversationMemory
+from intent_router import Intent, IntentRouter
+from tool_cache import ToolCache
 import google.generativeai as genai
 from dotenv import load_dotenv
 import json
@@ -18,20 +21,39 @@ OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
 genai.configure(api_key=GEMINI_API_KEY)
 model = genai.GenerativeModel("gemini-2.0-flash")
 
-# Global variable for conversation memory
-conversation_history = []
+# External API endpoints (called through the pooled http_client)
+COINGECKO_PRICE_URL = "https://api.coingecko.com/api/v3/simple/price"
+OPENWEATHER_URL = "http://api.openweathermap.org/data/2.5"
+
+# Recent API payloads, shared by every tool (see tool_cache.py for the TTLs)
+tool_cache = ToolCache()
+
+# Conversation memory: recent turns plus a rolling summary, within a token budget
+conversation_memory = ConversationMemory()
 
 def add_to_history(user_msg, bot_reply):
-    conversation_history.append({"user": user_msg, "bot": bot_reply})
+    conversation_memory.add(user_msg, bot_reply)
 
 # === EXISTING FEATURES ===
+def fetch_json(kind, url, params):
+    """
+    GET a JSON API through the tool cache
+    Returns: (HTTP status, decoded JSON or None)
+    """
+    def fetch():
+        response = http_client.get(url, params=params)
+        return response.status_code, response.json() if response.status_code == 200 else None
+    return tool_cache.get(kind, url, params, fetch)
+
+def openweather_params(city):
+    """Query parameters for an OpenWeather call about a city"""
+    return {"q": city, "appid": OPENWEATHER_API_KEY, "units": "metric"}
+
 def get_bitcoin_price():
     """Get current Bitcoin price"""
-    url = "https://api.coingecko.com/api/v3/simple/price?ids=bitcoin&vs_currencies=usd"
     try:
-        response = requests.get(url, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
+        status, data = fetch_json("crypto", COINGECKO_PRICE_URL, {"ids": "bitcoin", "vs_currencies": "usd"})
+        if status == 200:
             return f"💰 Current Bitcoin price: ${data['bitcoin']['usd']:,}"
         else:
             return "❌ Couldn't fetch Bitcoin price: API unavailable."
@@ -40,11 +62,9 @@ def get_bitcoin_price():
 
 def get_weather(city="Lucknow"):
     """Get current weather information for a city"""
-    url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={OPENWEATHER_API_KEY}&units=metric"
     try:
-        response = requests.get(url, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
+        status, data = fetch_json("weather", f"{OPENWEATHER_URL}/weather", openweather_params(city))
+        if status == 200:
             temp = data['main']['temp']
             feels_like = data['main']['feels_like']
             desc = data['weather'][0]['description']
@@ -73,11 +93,10 @@ def get_weather(city="Lucknow"):
 
 def get_weather_forecast(city="Lucknow"):
     """Get 5-day weather forecast for a city"""
-    url = f"http://api.openweathermap.org/data/2.5/forecast?q={city}&appid={OPENWEATHER_API_KEY}&units=metric"
     try:
-        response = requests.get(url, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
+        # Same payload as the rain prediction, so one of them is usually a cache hit
+        status, data = fetch_json("forecast", f"{OPENWEATHER_URL}/forecast", openweather_params(city))
+        if status == 200:
             result = f"📅 5-Day Weather Forecast for {city}:\n\n"
             
             # Group forecasts by day
@@ -153,11 +172,10 @@ def calculate_rain_chance(humidity, description, weather_main):
 
 def get_rain_prediction(city="Lucknow"):
     """Get specific rain prediction for a city"""
-    url = f"http://api.openweathermap.org/data/2.5/forecast?q={city}&appid={OPENWEATHER_API_KEY}&units=metric"
     try:
-        response = requests.get(url, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
+        # Same payload as the weather forecast
+        status, data = fetch_json("forecast", f"{OPENWEATHER_URL}/forecast", openweather_params(city))
+        if status == 200:
             result = f"🌧️ Rain Prediction for {city}:\n\n"
             
             rain_forecasts = []
@@ -216,11 +234,12 @@ def get_stock_price(symbol):
 
 def get_crypto_prices():
     """Get multiple cryptocurrency prices"""
-    url = "https://api.coingecko.com/api/v3/simple/price?ids=bitcoin,ethereum,cardano,solana,dogecoin,litecoin,polygon&vs_currencies=usd"
     try:
-        response = requests.get(url, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
+        status, data = fetch_json("crypto", COINGECKO_PRICE_URL, {
+            "ids": "bitcoin,ethereum,cardano,solana,dogecoin,litecoin,polygon",
+            "vs_currencies": "usd"
+        })
+        if status == 200:
             result = "💰 Cryptocurrency Prices:\n"
             crypto_names = {
                 "bitcoin": "Bitcoin (BTC)",
@@ -403,55 +422,28 @@ def handle_future_feature(feature_type, user_input):
     return feature_messages.get(feature_type, 
         "🚀 This feature will be integrated in later upgrades! We're constantly expanding the AI assistant's capabilities.")
 
+# Feature requests answered with a "coming soon" note, in priority order
+FUTURE_FEATURE_INTENTS = [
+    Intent("translation", any_of=["translate", "translation", "spanish", "french", "german", "hindi"]),
+    Intent("timezone", any_of=["time in tokyo", "time in london", "time in new york", "timezone"]),
+    Intent("reminders", any_of=["reminder", "remind me", "schedule", "calendar", "alarm"]),
+    # Specific coins not supported
+    Intent("advanced_crypto", any_of=["shiba", "xrp", "ripple", "chainlink", "avalanche"]),
+    Intent("email", any_of=["email", "send mail", "compose email"]),
+    Intent("file_operations", any_of=["create file", "read file", "delete file", "file management"]),
+    Intent("currency_exchange", any_of=["usd to eur", "currency exchange", "exchange rate", "dollar to euro"]),
+    Intent("entertainment", any_of=["oscar winner", "movie", "netflix", "music", "song"]),
+    # Capital questions are left to the AI
+    Intent("geography", any_of=["population of", "demographics"]),
+    Intent("qr_code", any_of=["qr code", "generate qr", "create qr"]),
+    Intent("web_status", any_of=["is google down", "website status", "server down"]),
+]
+FUTURE_FEATURES = frozenset(intent.name for intent in FUTURE_FEATURE_INTENTS)
+future_feature_router = IntentRouter(FUTURE_FEATURE_INTENTS)
+
 def detect_future_feature_request(user_input):
     """Detect if user is asking for a feature that will be added later"""
-    user_input_lower = user_input.lower()
-    
-    # Translation requests
-    if any(word in user_input_lower for word in ["translate", "translation", "spanish", "french", "german", "hindi"]):
-        return "translation"
-    
-    # Timezone requests
-    if any(phrase in user_input_lower for phrase in ["time in tokyo", "time in london", "time in new york", "timezone"]):
-        return "timezone"
-    
-    # Reminder/scheduling requests
-    if any(word in user_input_lower for word in ["reminder", "remind me", "schedule", "calendar", "alarm"]):
-        return "reminders"
-    
-    # Advanced crypto requests (specific coins not supported)
-    if any(word in user_input_lower for word in ["shiba", "xrp", "ripple", "chainlink", "avalanche"]):
-        return "advanced_crypto"
-    
-    # Email requests
-    if any(word in user_input_lower for word in ["email", "send mail", "compose email"]):
-        return "email"
-    
-    # File operation requests
-    if any(phrase in user_input_lower for phrase in ["create file", "read file", "delete file", "file management"]):
-        return "file_operations"
-    
-    # Currency exchange requests
-    if any(phrase in user_input_lower for phrase in ["usd to eur", "currency exchange", "exchange rate", "dollar to euro"]):
-        return "currency_exchange"
-    
-    # Entertainment requests
-    if any(phrase in user_input_lower for phrase in ["oscar winner", "movie", "netflix", "music", "song"]):
-        return "entertainment"
-    
-    # Geography requests - Remove capital questions since AI can handle them
-    if any(phrase in user_input_lower for phrase in ["population of", "demographics"]):
-        return "geography"
-    
-    # QR code requests
-    if any(phrase in user_input_lower for phrase in ["qr code", "generate qr", "create qr"]):
-        return "qr_code"
-    
-    # Website status requests
-    if any(phrase in user_input_lower for phrase in ["is google down", "website status", "server down"]):
-        return "web_status"
-    
-    return None
+    return future_feature_router.route(user_input)
 
 # === SMART INPUT PROCESSING ===
 
@@ -512,6 +504,14 @@ def extract_conversion_params(user_input):
     
     return None, None, None
 
+def extract_password_length(user_input):
+    """Extract the requested password length (default 12)"""
+    length_match = re.search(r"(\d+)", user_input)
+    return int(length_match.group(1)) if length_match else 12
+
+# A bare arithmetic expression
+MATH_EXPRESSION = re.compile(r'^[0-9+\-*/().\s]+$')
+
 def extract_math_expression(user_input):
     """Extract mathematical expression from user input"""
     # Look for calculate/math keywords followed by expression
@@ -532,11 +532,11 @@ def extract_math_expression(user_input):
         # Extract the part after "what is"
         expression = user_input[7:].strip()
         # Check if it looks like a math expression (contains numbers and operators)
-        if re.match(r'^[0-9+\-*/().\s]+$', expression):
+        if MATH_EXPRESSION.match(expression):
             return expression
     
     # If input looks like a math expression directly
-    if re.match(r'^[0-9+\-*/().\s]+$', user_input.strip()):
+    if MATH_EXPRESSION.match(user_input.strip()):
         return user_input.strip()
     
     return None
@@ -544,121 +544,125 @@ def extract_math_expression(user_input):
 def generate_gemini_reply(user_input):
     """Generate reply using Gemini AI"""
     try:
-        prompt = "\n".join([f"User: {h['user']}\nBot: {h['bot']}" for h in conversation_history])
-        prompt += f"\nUser: {user_input}\nBot:"
+        prompt = conversation_memory.build_prompt(user_input)
         response = model.generate_content(prompt)
         return response.text
     except Exception as e:
         return f"🤖 I'm having trouble connecting to my AI brain right now. Error: {str(e)}"
 
+def stream_gemini_reply(user_input):
+    """Generate reply using Gemini AI, yielding text chunks as they arrive"""
+    streamed = False
+    try:
+        prompt = conversation_memory.build_prompt(user_input)
+        for chunk in model.generate_content(prompt, stream=True):
+            try:
+                text = chunk.text
+            except ValueError:
+                # A chunk without text (e.g. only the finish reason)
+                continue
+            if text:
+                streamed = True
+                yield text
+    except Exception as e:
+        prefix = "\n" if streamed else ""
+        yield f"{prefix}🤖 I'm having trouble connecting to my AI brain right now. Error: {str(e)}"
+
 def process_user_input(user_input):
     """Main function to process user input and determine response"""
-    user_input_lower = user_input.lower()
-    
-    # Handle greetings - improved to match whole words only
-    greeting_words = ["hello", "hi", "hey", "good morning", "good afternoon", "good evening", "greetings", "howdy"]
-    words_in_input = user_input_lower.split()
-    if any(word in words_in_input for word in greeting_words):
-        return get_user_greeting_response()
-    
-    # Handle "how are you" type questions
-    if any(phrase in user_input_lower for phrase in ["how are you", "how's it going", "how are things", "what's up"]):
-        return "😊 I'm doing great, thank you for asking! I'm here and ready to help you with anything you need. How can I assist you today?"
-    
-    # Handle "thank you" responses
-    if any(word in user_input_lower for word in ["thank you", "thanks", "thank"]):
-        return "🙏 You're very welcome! I'm happy to help! Is there anything else you'd like me to assist you with?"
-    
-    # Handle "good" or "nice" responses
-    if any(word in user_input_lower for word in ["good", "nice", "great", "awesome", "cool", "excellent"]) and len(user_input.split()) <= 3:
-        return "😊 Glad to hear that! What else can I help you with today?"
-    
-    # Bitcoin price
-    if any(word in user_input_lower for word in ["bitcoin", "btc"]) and "price" in user_input_lower:
-        return get_bitcoin_price()
-    
-    # Multiple crypto prices
-    if any(word in user_input_lower for word in ["crypto", "cryptocurrency"]) and "price" in user_input_lower:
-        return get_crypto_prices()
-    
-    # Stock prices
-    if any(word in user_input_lower for word in ["stock", "share"]) and "price" in user_input_lower:
-        symbol = extract_stock_symbol(user_input)
-        return get_stock_price(symbol)
-    
-    # Weather - Enhanced with forecasts and rain predictions
-    if "weather" in user_input_lower:
-        city = extract_city_from_input(user_input)
-        
-        # Check for forecast requests
-        if any(word in user_input_lower for word in ["forecast", "tomorrow", "next", "future", "week", "days"]):
-            return get_weather_forecast(city)
-        # Check for rain-specific requests
-        elif any(word in user_input_lower for word in ["rain", "precipitation", "shower", "drizzle"]):
-            return get_rain_prediction(city)
-        else:
-            return get_weather(city)
-    
-    # Rain prediction requests
-    if any(phrase in user_input_lower for phrase in ["will it rain", "rain today", "rain tomorrow", "chance of rain", "rain prediction"]):
-        city = extract_city_from_input(user_input)
-        return get_rain_prediction(city)
-    
-    # Weather forecast requests
-    if any(phrase in user_input_lower for phrase in ["weather forecast", "forecast", "weather tomorrow", "weather next week"]):
-        city = extract_city_from_input(user_input)
-        return get_weather_forecast(city)
-    
-    # News
-    if any(word in user_input_lower for word in ["news", "headlines", "latest news"]):
-        return get_news_headlines()
-    
-    # Unit conversion
-    if any(word in user_input_lower for word in ["convert", "conversion"]) or " to " in user_input_lower:
-        value, from_unit, to_unit = extract_conversion_params(user_input)
-        if value is not None:
-            return convert_units(value, from_unit, to_unit)
-    
-    # Password generation
-    if any(word in user_input_lower for word in ["password", "generate password"]):
-        # Extract length if specified
-        length_match = re.search(r"(\d+)", user_input)
-        length = int(length_match.group(1)) if length_match else 12
-        return generate_password(length)
-    
-    # Mathematical calculations
-    math_expr = extract_math_expression(user_input)
-    if math_expr:
-        return calculate_math(math_expr)
-    
-    # Time and date
-    if any(word in user_input_lower for word in ["time", "date", "what time", "current time"]):
-        return get_time_info()
-    
-    # Jokes
-    if any(word in user_input_lower for word in ["joke", "funny", "make me laugh"]):
-        return get_random_joke()
-    
-    # Motivation
-    if any(word in user_input_lower for word in ["motivation", "motivate", "inspire", "quote"]):
-        return get_motivation_quote()
-    
-    # Help command
-    if user_input_lower in ["help", "what can you do", "features", "commands"]:
-        return get_help_message()
-    
-    # Check for future feature requests
-    future_feature = detect_future_feature_request(user_input)
-    if future_feature:
-        return handle_future_feature(future_feature, user_input)
-    
-    # If it's a short unclear input, give a helpful response
-    if len(user_input.split()) <= 2 and not any(char.isdigit() for char in user_input):
-        return get_confused_response()
+    reply = answer_locally(user_input)
+    if reply is not None:
+        return reply
     
     # Default to Gemini AI for complex queries
     return generate_gemini_reply(user_input)
 
+def process_user_input_stream(user_input):
+    """Like process_user_input, but yields the reply in chunks (Gemini replies stream as they arrive)"""
+    reply = answer_locally(user_input)
+    if reply is not None:
+        yield reply
+        return
+    
+    yield from stream_gemini_reply(user_input)
+
+# === INTENT ROUTING ===
+
+def is_conversion_request(context):
+    """Whether the message holds a value and two units to convert"""
+    value, _, _ = extract_conversion_params(context.text)
+    return value is not None
+
+def is_bare_math(context):
+    """Whether the whole message is an arithmetic expression"""
+    return MATH_EXPRESSION.match(context.text.strip()) is not None
+
+def has_no_digits(context):
+    return not any(char.isdigit() for char in context.text)
+
+# Built-in features in priority order: the first intent that matches answers
+INTENTS = [
+    # Whole words only, so "good morning" is small talk rather than a greeting
+    Intent("greeting", any_of=["hello", "hi", "hey", "greetings", "howdy"], whole_words=True),
+    Intent("how_are_you", any_of=["how are you", "how's it going", "how are things", "what's up"]),
+    Intent("thanks", any_of=["thank you", "thanks", "thank"]),
+    Intent("small_talk", any_of=["good", "nice", "great", "awesome", "cool", "excellent"], max_words=3),
+    Intent("bitcoin_price", any_of=["bitcoin", "btc"], all_of=["price"]),
+    Intent("crypto_prices", any_of=["crypto", "cryptocurrency"], all_of=["price"]),
+    Intent("stock_price", any_of=["stock", "share"], all_of=["price"]),
+    # Weather questions, about the forecast or rain first
+    Intent("forecast", all_of=["weather"], any_of=["forecast", "tomorrow", "next", "future", "week", "days"]),
+    Intent("rain_prediction", all_of=["weather"], any_of=["rain", "precipitation", "shower", "drizzle"]),
+    Intent("weather", all_of=["weather"]),
+    Intent("rain_prediction", any_of=["will it rain", "rain today", "rain tomorrow", "chance of rain", "rain prediction"]),
+    Intent("forecast", any_of=["weather forecast", "forecast", "weather tomorrow", "weather next week"]),
+    Intent("news", any_of=["news", "headlines", "latest news"]),
+    Intent("conversion", any_of=["convert", "conversion", " to "], check=is_conversion_request),
+    Intent("password", any_of=["password", "generate password"]),
+    Intent("math", any_of=["calculate", "math", "solve", "compute", "what is"], check=lambda context: extract_math_expression(context.text)),
+    Intent("math", check=is_bare_math),
+    Intent("time", any_of=["time", "date", "what time", "current time"]),
+    Intent("joke", any_of=["joke", "funny", "make me laugh"]),
+    Intent("motivation", any_of=["motivation", "motivate", "inspire", "quote"]),
+    Intent("help", exact=["help", "what can you do", "features", "commands"]),
+    *FUTURE_FEATURE_INTENTS,
+    # A short unclear input gets a helpful response
+    Intent("confused", max_words=2, check=has_no_digits),
+]
+intent_router = IntentRouter(INTENTS)
+
+# Reply for each intent, given the user's message
+INTENT_HANDLERS = {
+    "greeting": lambda user_input: get_user_greeting_response(),
+    "how_are_you": lambda user_input: "😊 I'm doing great, thank you for asking! I'm here and ready to help you with anything you need. How can I assist you today?",
+    "thanks": lambda user_input: "🙏 You're very welcome! I'm happy to help! Is there anything else you'd like me to assist you with?",
+    "small_talk": lambda user_input: "😊 Glad to hear that! What else can I help you with today?",
+    "bitcoin_price": lambda user_input: get_bitcoin_price(),
+    "crypto_prices": lambda user_input: get_crypto_prices(),
+    "stock_price": lambda user_input: get_stock_price(extract_stock_symbol(user_input)),
+    "weather": lambda user_input: get_weather(extract_city_from_input(user_input)),
+    "forecast": lambda user_input: get_weather_forecast(extract_city_from_input(user_input)),
+    "rain_prediction": lambda user_input: get_rain_prediction(extract_city_from_input(user_input)),
+    "news": lambda user_input: get_news_headlines(),
+    "conversion": lambda user_input: convert_units(*extract_conversion_params(user_input)),
+    "password": lambda user_input: generate_password(extract_password_length(user_input)),
+    "math": lambda user_input: calculate_math(extract_math_expression(user_input)),
+    "time": lambda user_input: get_time_info(),
+    "joke": lambda user_input: get_random_joke(),
+    "motivation": lambda user_input: get_motivation_quote(),
+    "help": lambda user_input: get_help_message(),
+    "confused": lambda user_input: get_confused_response(),
+}
+
+def answer_locally(user_input):
+    """Answer with a built-in feature, or return None when the input should go to Gemini"""
+    intent = intent_router.route(user_input)
+    if intent is None:
+        return None
+    if intent in FUTURE_FEATURES:
+        return handle_future_feature(intent, user_input)
+    return INTENT_HANDLERS[intent](user_input)
+
 def get_help_message():
     """Display help message with available features"""
     return """🤖 Aiden - Your AI Assistant Features:
@@ -773,9 +777,14 @@ def chat():
                 print("👋 Goodbye! I hope I was helpful. See you next time!")
                 break
             
-            reply = process_user_input(user_input)
-            print(f"🤖 Aiden: {reply}")
-            add_to_history(user_input, reply)
+            # Print the reply as it streams in
+            print("🤖 Aiden: ", end="", flush=True)
+            chunks = []
+            for chunk in process_user_input_stream(user_input):
+                chunks.append(chunk)
+                print(chunk, end="", flush=True)
+            print()
+            add_to_history(user_input, "".join(chunks))
             
         except KeyboardInterrupt:
             print("\n\n🎉 Thank you for using Aiden!")
@@ -12,7 +12,7 @@ from datetime import datetime
 import webbrowser
 
 # Import the Aiden AI assistant functions
-from ai_assistant import process_user_input, add_to_history, conversation_history
+from ai_assistant import process_user_input_stream, add_to_history, conversation_memory
 
 class ChatbotGUI:
     def __init__(self, root):
@@ -43,6 +43,9 @@ class ChatbotGUI:
         # Queue for thread-safe GUI updates
         self.message_queue = queue.Queue()
         
+        # True while a streamed reply is being appended to the chat
+        self.streaming = False
+        
         # Animation variables
         self.typing_animation = False
         self.typing_dots = 0
@@ -302,8 +305,12 @@ How can I help you today?"""
         
         self.chat_display.config(state=tk.NORMAL)
         
-        # Add message with timestamp
-        self.chat_display.insert(tk.END, f"\n[{timestamp}] {sender}:\n{message}\n")
+        # Add message with timestamp; the mark keeps the end of the message
+        # text so a streamed reply can be appended to it
+        self.chat_display.insert(tk.END, f"\n[{timestamp}] {sender}:\n{message}")
+        self.chat_display.mark_set('message_end', 'end-1c')
+        self.chat_display.mark_gravity('message_end', tk.LEFT)
+        self.chat_display.insert(tk.END, "\n")
         
         # Apply tag for styling
         if tag in ['user', 'bot', 'system', 'error']:
@@ -324,6 +331,9 @@ How can I help you today?"""
         # Add separator line for better readability
         self.chat_display.insert(tk.END, "─" * 50 + "\n")
         
+        # Text inserted at the mark from now on goes before it
+        self.chat_display.mark_gravity('message_end', tk.RIGHT)
+        
         # Auto-scroll to bottom
         self.chat_display.see(tk.END)
         self.chat_display.config(state=tk.DISABLED)
@@ -331,6 +341,13 @@ How can I help you today?"""
         # Update the UI
         self.root.update_idletasks()
     
+    def append_to_message(self, text):
+        """Append streamed text to the last message"""
+        self.chat_display.config(state=tk.NORMAL)
+        self.chat_display.insert('message_end', text)
+        self.chat_display.see(tk.END)
+        self.chat_display.config(state=tk.DISABLED)
+    
     def send_message(self, event=None):
         """Send user message and get bot response"""
         print("🚀 send_message called")
@@ -412,14 +429,17 @@ How can I help you today?"""
     def process_message(self, message):
         """Process user message in background thread"""
         try:
-            # Get response from AI assistant
-            response = process_user_input(message)
+            # Queue the response chunk by chunk as it streams in
+            chunks = []
+            for chunk in process_user_input_stream(message):
+                chunks.append(chunk)
+                self.message_queue.put(('bot_chunk', chunk))
+            response = "".join(chunks)
             
             # Add to conversation history
             add_to_history(message, response)
             
-            # Queue the response for GUI update
-            self.message_queue.put(('bot_response', response))
+            self.message_queue.put(('bot_done', response))
             
         except Exception as e:
             error_msg = f"❌ Error: {str(e)}"
@@ -431,13 +451,26 @@ How can I help you today?"""
             while True:
                 message_type, content = self.message_queue.get_nowait()
                 
-                # Remove typing indicator
-                self.remove_typing_indicator()
+                if message_type == 'bot_chunk':
+                    if self.streaming:
+                        self.append_to_message(content)
+                    else:
+                        # First chunk: replace the typing indicator with the reply
+                        self.remove_typing_indicator()
+                        self.add_message("🤖 Aiden", content, 'bot')
+                        self.streaming = True
+                    continue
+                
+                # Remove typing indicator (already gone if the reply streamed in)
+                if not self.streaming:
+                    self.remove_typing_indicator()
                 
-                if message_type == 'bot_response':
-                    self.add_message("🤖 Aiden", content, 'bot')
+                if message_type == 'bot_done':
+                    if not self.streaming:
+                        self.add_message("🤖 Aiden", content, 'bot')
                 elif message_type == 'error':
                     self.add_message("❌ Error", content, 'error')
+                self.streaming = False
                 
                 # Re-enable send button and update status
                 self.send_button.config(state=tk.NORMAL)
@@ -459,7 +492,7 @@ How can I help you today?"""
         self.chat_display.config(state=tk.DISABLED)
         
         # Clear conversation history
-        conversation_history.clear()
+        conversation_memory.clear()
         
         # Add welcome message again
         self.add_message("🤖 Aiden", "✨ Chat cleared! Ready for a fresh start.", 'system')
@@ -0,0 +1,127 @@
+"""
+Bounded conversation memory for Gemini prompts
+
+The prompt carries the recent turns word for word and a rolling summary
+of the older ones, within a token budget. A turn that falls out of the
+recent window is compacted into a one-line digest. Digests are dropped
+oldest first once the summary outgrows its share of the budget. Both
+parts of the prompt prefix are kept as ready-joined strings and updated
+as turns come and go, so building a prompt costs the same on the
+thousandth turn as on the tenth.
+
+Tokens are estimated at about four characters each, which is close
+enough for budgeting without calling the API's token counter.
+"""
+import threading
+from collections import deque
+
+# Budget for the history part of the prompt, and the summary's share of it
+MAX_PROMPT_TOKENS = 3000
+SUMMARY_TOKENS = 500
+
+# Turns kept word for word, and the most tokens one stored turn may take
+MAX_RECENT_TURNS = 20
+MAX_TURN_TOKENS = 600
+
+# Characters of each side of a turn kept in its summary digest
+DIGEST_CHARS = 120
+
+SUMMARY_HEADER = "Summary of the earlier conversation:"
+
+def estimate_tokens(text):
+    """Rough token count of text (about 4 characters per token)"""
+    return len(text) // 4 + 1
+
+def clip(text, limit):
+    """text cut to at most limit characters, marked with '…' when cut"""
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + '…'
+
+class ConversationMemory:
+    """Recent turns word for word plus a rolling summary of older ones, within a token budget"""
+
+    def __init__(self, max_tokens=MAX_PROMPT_TOKENS, summary_tokens=SUMMARY_TOKENS,
+                 max_turns=MAX_RECENT_TURNS, max_turn_tokens=MAX_TURN_TOKENS, summarize=None):
+        self.max_tokens = max_tokens
+        self.summary_tokens = summary_tokens
+        self.max_turns = max_turns
+        self.max_turn_chars = max_turn_tokens * 4
+        self.summarize = summarize or self.digest  # (user message, bot reply) -> summary line
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._recent = deque()  # (turn text, user message, bot reply), oldest first
+        self._recent_text = ''  # turn texts joined by newlines, kept up to date
+        self._recent_tokens = 0
+        self._summary = deque()
+        self._summary_text = ''  # summary lines joined by newlines, kept up to date
+        self._summary_tokens = 0
+        self.turns = 0
+        self.summarized = 0
+
+    def clear(self):
+        """Forget the whole conversation"""
+        with self._lock:
+            self._reset()
+
+    def __len__(self):
+        return self.turns
+
+    @staticmethod
+    def digest(user_msg, bot_reply):
+        """Default summary line for a turn: the start of the question and of the answer"""
+        user_msg = clip(' '.join(user_msg.split()), DIGEST_CHARS)
+        bot_reply = clip(' '.join(bot_reply.split()), DIGEST_CHARS)
+        return f"- User: {user_msg} / Bot: {bot_reply}"
+
+    def add(self, user_msg, bot_reply):
+        """Remember a turn, compacting the oldest turns into the summary as needed"""
+        text = f"User: {clip(user_msg, self.max_turn_chars)}\nBot: {clip(bot_reply, self.max_turn_chars)}"
+        with self._lock:
+            self._recent.append((text, user_msg, bot_reply))
+            self._recent_text = f"{self._recent_text}\n{text}" if self._recent_text else text
+            self._recent_tokens += estimate_tokens(text)
+            self.turns += 1
+
+            while len(self._recent) > 1 and (
+                    len(self._recent) > self.max_turns
+                    or self._recent_tokens + self._summary_tokens > self.max_tokens):
+                self._compact_oldest()
+
+    def _compact_oldest(self):
+        """Move the oldest recent turn into the summary (called with the lock held)"""
+        text, user_msg, bot_reply = self._recent.popleft()
+        self._recent_text = self._recent_text[len(text) + 1:]
+        self._recent_tokens -= estimate_tokens(text)
+        self.summarized += 1
+
+        line = self.summarize(user_msg, bot_reply)
+        self._summary.append(line)
+        self._summary_text = f"{self._summary_text}\n{line}" if self._summary_text else line
+        self._summary_tokens += estimate_tokens(line)
+
+        while len(self._summary) > 1 and self._summary_tokens > self.summary_tokens:
+            oldest = self._summary.popleft()
+            self._summary_text = self._summary_text[len(oldest) + 1:]
+            self._summary_tokens -= estimate_tokens(oldest)
+
+    def build_prompt(self, user_input):
+        """
+        Prompt for the next reply: the summary (if any), the recent turns and the new message
+        Returns: prompt string
+        """
+        with self._lock:
+            if self._summary_text:
+                return f"{SUMMARY_HEADER}\n{self._summary_text}\n\n{self._recent_text}\nUser: {user_input}\nBot:"
+            return f"{self._recent_text}\nUser: {user_input}\nBot:"
+
+    def stats(self):
+        """Return a dict with turn counts and the estimated prompt history size"""
+        with self._lock:
+            return {
+                'turns': self.turns,
+                'recent_turns': len(self._recent),
+                'summarized_turns': self.summarized,
+                'summary_lines': len(self._summary),
+                'history_tokens': self._recent_tokens + self._summary_tokens
+            }
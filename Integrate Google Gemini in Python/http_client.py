@@ -0,0 +1,84 @@
+"""
+Shared HTTP client for the assistant's external API calls
+
+Every tool call (weather, forecast, crypto prices) goes through one
+requests.Session, so connections to CoinGecko and OpenWeather are pooled
+and kept alive instead of paying a new TCP (and TLS) handshake per call.
+Failed connections, 429s and 5xx answers are retried a few times with a
+jittered exponential backoff, and the connect and read timeouts are set
+separately so an unreachable host fails fast.
+"""
+import random
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Seconds to wait for a connection, and then for the response
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+
+# Hosts with a pool of their own, and keep-alive connections kept per host
+POOL_HOSTS = 8
+POOL_SIZE_PER_HOST = 4
+
+# Retries per request (connection errors and the statuses below)
+MAX_RETRIES = 2
+BACKOFF_FACTOR = 0.3
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class JitteredRetry(Retry):
+    """Retry policy with 'full jitter': each backoff is random between 0 and the exponential delay"""
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        return random.uniform(0, backoff) if backoff else 0
+
+class HTTPClient:
+    """A pooled, retrying requests.Session shared by all threads"""
+
+    def __init__(self, connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT, pool_hosts=POOL_HOSTS,
+                 pool_size=POOL_SIZE_PER_HOST, retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR):
+        self.timeout = (connect_timeout, read_timeout)
+        retry = JitteredRetry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True,
+            raise_on_status=False  # hand the last response back after the final retry
+        )
+        # pool_block=False: a burst beyond pool_size opens extra, unpooled connections instead of waiting
+        adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['User-Agent'] = 'Aiden-AI-Assistant'
+
+    def get(self, url, params=None, timeout=None):
+        """
+        GET url with query params over a pooled connection
+        Returns: requests.Response (raises requests.RequestException once retries are used up)
+        """
+        return self.session.get(url, params=params, timeout=timeout or self.timeout)
+
+    def close(self):
+        """Close the pooled connections"""
+        self.session.close()
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+def get_client():
+    """The process-wide client, created on first use"""
+    global _default_client
+    if _default_client is None:
+        with _default_client_lock:
+            if _default_client is None:
+                _default_client = HTTPClient()
+    return _default_client
+
+def get(url, params=None, timeout=None):
+    """GET with the process-wide client"""
+    return get_client().get(url, params=params, timeout=timeout)
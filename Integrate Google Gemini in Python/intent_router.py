@@ -0,0 +1,151 @@
+"""
+Compiled intent router for the assistant's built-in features
+
+Intents are declared as a table of keyword rules in priority order. All
+keywords of the table are compiled once into a single regular expression,
+so one scan of a message finds every keyword it contains, overlapping
+ones included. The rules are then decided by set lookups on what was
+found, in the table's order; a rule's extra check (such as "is there a
+number to convert?") only runs when its keywords are present.
+"""
+import re
+
+def keyword_pattern(keywords):
+    """
+    Regular expression matching any of keywords, longest first, written as
+    a trie (common prefixes shared) so each position is tested in a few steps
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}  # end of a keyword
+
+    def branch(node):
+        alternatives = [re.escape(char) + branch(child) for char, child in sorted(node.items()) if char]
+        if not alternatives:
+            return ''
+        pattern = alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+        if '' in node:
+            # A keyword may also end here; the greedy '?' prefers the longer one
+            pattern = pattern + '?' if len(alternatives) == 1 and len(alternatives[0]) == 1 else '(?:' + pattern + ')?'
+        return pattern
+
+    return branch(trie)
+
+class Intent:
+    """
+    One row of the intent table. A message matches when, in this order:
+    it is one of exact (if given), contains every all_of keyword, contains
+    an any_of keyword (as a whole word if whole_words), has at most
+    max_words words and check(context) is true. Empty conditions always hold.
+    """
+
+    __slots__ = ('name', 'any_of', 'all_of', 'whole_words', 'exact', 'max_words', 'check')
+
+    def __init__(self, name, any_of=(), all_of=(), whole_words=False, exact=(), max_words=None, check=None):
+        self.name = name
+        self.any_of = frozenset(any_of)
+        self.all_of = frozenset(all_of)
+        self.whole_words = whole_words
+        self.exact = frozenset(exact)
+        self.max_words = max_words
+        self.check = check
+
+    def matches(self, context):
+        if self.exact and context.lower not in self.exact:
+            return False
+        if self.all_of and not self.all_of <= context.found:
+            return False
+        if self.any_of and self.any_of.isdisjoint(context.words if self.whole_words else context.found):
+            return False
+        if self.max_words is not None and context.word_count > self.max_words:
+            return False
+        return self.check is None or bool(self.check(context))
+
+class RouteContext:
+    """What the router found in one message, for rules and their checks"""
+
+    __slots__ = ('text', 'lower', 'found', 'words', '_word_count')
+
+    def __init__(self, text, lower, found, words):
+        self.text = text
+        self.lower = lower
+        self.found = found  # keywords contained anywhere in the message
+        self.words = words  # keywords that are also whole, whitespace-separated words
+        self._word_count = None
+
+    @property
+    def word_count(self):
+        if self._word_count is None:
+            self._word_count = len(self.text.split())
+        return self._word_count
+
+class IntentRouter:
+    """Routes a message to the first intent of the table that matches it"""
+
+    def __init__(self, intents):
+        self.intents = tuple(intents)
+
+        keywords = set()
+        for intent in self.intents:
+            keywords |= intent.any_of | intent.all_of
+        self.keywords = frozenset(keywords)
+
+        self._pattern = re.compile(keyword_pattern(keywords)) if keywords else None
+        # Keywords found wherever a longer one is found at the same position
+        self._prefixes = {
+            keyword: tuple(other for other in keywords if keyword.startswith(other))
+            for keyword in keywords
+        }
+
+        # Only intents one of whose keywords was found, or that need none, are tried
+        self._always = []
+        self._by_keyword = {keyword: [] for keyword in keywords}
+        for index, intent in enumerate(self.intents):
+            if intent.any_of or intent.all_of:
+                for keyword in intent.any_of | intent.all_of:
+                    self._by_keyword[keyword].append(index)
+            else:
+                self._always.append(index)
+
+    def scan(self, text):
+        """
+        Find every keyword in text in one pass
+        Returns: RouteContext
+        """
+        lower = text.lower()
+        found = set()
+        words = set()
+        if self._pattern is not None:
+            end = len(lower)
+            search = self._pattern.search
+            match = search(lower)
+            while match is not None:
+                # The longest keyword starting here; the search goes on from the next
+                # character, so keywords overlapping this one are found too
+                start = match.start()
+                word_start = start == 0 or lower[start - 1].isspace()
+                for keyword in self._prefixes[match.group()]:
+                    found.add(keyword)
+                    stop = start + len(keyword)
+                    if word_start and (stop == end or lower[stop].isspace()):
+                        words.add(keyword)
+                match = search(lower, start + 1)
+        return RouteContext(text, lower, found, words)
+
+    def route(self, text):
+        """
+        Pick the intent for a message
+        Returns: intent name, or None when no intent matches
+        """
+        context = self.scan(text)
+        candidates = set(self._always)
+        for keyword in context.found:
+            candidates.update(self._by_keyword[keyword])
+        for index in sorted(candidates):
+            intent = self.intents[index]
+            if intent.matches(context):
+                return intent.name
+        return None
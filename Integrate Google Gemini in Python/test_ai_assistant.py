@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+"""
+Test script for the Aiden AI assistant
+Runs the assistant's tools against a local stub of the weather and crypto
+APIs, so no API keys or network access are needed.
+"""
+
+import sys
+import os
+import builtins
+import contextlib
+import io
+import json
+import queue
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Add the current directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import ai_assistant
+from ai_assistant import extract_conversion_params, extract_math_expression
+from conversation_memory import SUMMARY_HEADER, ConversationMemory, estimate_tokens
+from tool_cache import ToolCache, cache_key
+
+def forecast_payload():
+    """A /forecast answer: 16 three-hour slots, rain likely in the second one"""
+    start = int(time.time()) // 10800 * 10800
+    return {'list': [
+        {
+            'dt': start + i * 10800,
+            'main': {'temp': 20.0 + i, 'humidity': 60},
+            'weather': [{'description': 'light rain' if i == 1 else 'clear sky'}],
+            'pop': 0.8 if i == 1 else 0.0
+        }
+        for i in range(16)
+    ]}
+
+class StubAPI(BaseHTTPRequestHandler):
+    """Answers like OpenWeather and CoinGecko, counting calls per path"""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    calls = {}
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        StubAPI.calls[url.path] = StubAPI.calls.get(url.path, 0) + 1
+
+        if url.path == '/weather' and query['q'][0].lower() != 'atlantis':
+            payload = {
+                'main': {'temp': 31.5, 'feels_like': 34.0, 'humidity': 70, 'pressure': 1008},
+                'weather': [{'description': 'scattered clouds', 'main': 'Clouds'}],
+                'wind': {'speed': 3.2},
+                'visibility': 8000
+            }
+        elif url.path == '/forecast':
+            payload = forecast_payload()
+        elif url.path == '/price':
+            payload = {coin: {'usd': 100 + StubAPI.calls[url.path]} for coin in query['ids'][0].split(',')}
+        else:
+            payload = None
+
+        body = json.dumps(payload or {'message': 'city not found'}).encode('utf-8')
+        self.send_response(200 if payload else 404)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_stub_server():
+    """Serve StubAPI on a free local port and point the assistant at it"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_port}'
+    ai_assistant.OPENWEATHER_URL = base
+    ai_assistant.COINGECKO_PRICE_URL = f'{base}/price'
+    return server
+
+class FakeClock:
+    """Manually advanced clock for TTL tests"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def test_tool_cache():
+    """Test the TTL tool cache against a stub weather/crypto server."""
+
+    print("\n" + "=" * 60)
+    print("TOOL CACHE TESTS")
+    print("=" * 60)
+
+    assert cache_key('weather', '/weather', {'q': ' New  York', 'appid': 'secret', 'units': 'metric'}) == \
+        cache_key('weather', '/weather', {'units': 'metric', 'q': 'new york', 'appid': 'other'})
+    print("✅ Keys ignore case, spacing, parameter order and API keys")
+
+    server = start_stub_server()
+    clock = FakeClock()
+    ai_assistant.tool_cache = cache = ToolCache(clock=clock)
+    StubAPI.calls.clear()
+    try:
+        first = ai_assistant.get_weather("Delhi")
+        assert "31.5°C" in first and "31.5°C" in ai_assistant.get_weather("DELHI ")
+        assert StubAPI.calls == {'/weather': 1}
+
+        forecast = ai_assistant.get_weather_forecast("Mumbai")
+        rain = ai_assistant.get_rain_prediction("Mumbai")
+        assert "5-Day Weather Forecast" in forecast and "80% chance - Light Rain" in rain
+        assert StubAPI.calls['/forecast'] == 1
+        print("✅ Repeated lookups are hits; forecast and rain prediction share one /forecast payload")
+
+        assert "Can't fetch weather data" in ai_assistant.get_weather("Atlantis")
+        assert "Can't fetch weather data" in ai_assistant.get_weather("Atlantis")
+        assert StubAPI.calls['/weather'] == 3
+        print("✅ Error answers are not cached")
+
+        assert ai_assistant.get_bitcoin_price() == "💰 Current Bitcoin price: $101"
+        clock.now += 61  # crypto TTL is 60 s: stale, served while it is refreshed
+        assert ai_assistant.get_bitcoin_price() == "💰 Current Bitcoin price: $101"
+        cache.wait_for_refreshes(5)
+        assert ai_assistant.get_bitcoin_price() == "💰 Current Bitcoin price: $102"
+        clock.now += 200  # past the grace period: a plain miss
+        assert ai_assistant.get_bitcoin_price() == "💰 Current Bitcoin price: $103"
+        assert "Current Weather in Delhi" in ai_assistant.get_weather("Delhi")
+        assert StubAPI.calls['/weather'] == 3  # weather TTL is 10 minutes
+        print("✅ Stale-while-revalidate for crypto, longer TTL for weather")
+
+        stats = cache.stats()
+        print(f"   Stats: {stats}")
+        assert stats['misses'] == 6 and stats['stale_hits'] == 1 and stats['refreshes'] == 1
+        assert stats['hit_rate'] == round((stats['hits'] + 1) / (stats['hits'] + 7), 3)
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(ai_assistant.get_crypto_prices()))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(set(results)) == 1 and "Ethereum (ETH)" in results[0]
+        assert StubAPI.calls['/price'] == 4
+        print("✅ Concurrent misses for the same lookup share one fetch")
+    finally:
+        server.shutdown()
+        ai_assistant.tool_cache = ToolCache()
+
+class FakeChunk:
+    """A response (or streamed chunk) whose .text raises ValueError when it has no text, like Gemini's"""
+
+    def __init__(self, text):
+        self._text = text
+
+    @property
+    def text(self):
+        if self._text is None:
+            raise ValueError("The response has no text parts")
+        return self._text
+
+class FakeModel:
+    """Stands in for the Gemini model, remembering the prompts it was given"""
+
+    def __init__(self, reply="Sure!", chunks=None, delay=0.0, fail_after=None):
+        self.reply = reply
+        self.chunks = chunks if chunks is not None else [reply]
+        self.delay = delay  # seconds before each streamed chunk
+        self.fail_after = fail_after  # raise after this many chunks
+        self.prompts = []
+
+    def generate_content(self, prompt, stream=False):
+        self.prompts.append(prompt)
+        if not stream:
+            time.sleep(self.delay * len(self.chunks))
+            return FakeChunk(self.reply)
+        return self._stream()
+
+    def _stream(self):
+        for index, chunk in enumerate(self.chunks):
+            if index == self.fail_after:
+                raise ConnectionError("stream interrupted")
+            time.sleep(self.delay)
+            yield FakeChunk(chunk)
+
+def time_prompt_builds(build, repeat=200):
+    """Mean seconds per call of build()"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        build()
+    return (time.perf_counter() - started) / repeat
+
+def test_conversation_memory():
+    """Test the bounded, summarizing conversation memory."""
+
+    print("\n" + "=" * 60)
+    print("CONVERSATION MEMORY TESTS")
+    print("=" * 60)
+
+    memory = ConversationMemory()
+    history = [("Hello", "👋 Hi!"), ("Weather in Delhi", "🌤️ Current Weather in Delhi:\n🌡️ 31°C")]
+    for user_msg, bot_reply in history:
+        memory.add(user_msg, bot_reply)
+    old_prompt = "\n".join(f"User: {user}\nBot: {bot}" for user, bot in history) + "\nUser: And Mumbai?\nBot:"
+    assert memory.build_prompt("And Mumbai?") == old_prompt
+    print("✅ Short conversations give the same prompt as before")
+
+    memory = ConversationMemory(max_tokens=1000, summary_tokens=200, max_turns=10)
+    old_history = []
+    sizes = {}
+    for turn in range(1, 5001):
+        user_msg = f"Question {turn}: tell me about topic {turn % 37} " + "in detail " * (turn % 7)
+        bot_reply = f"Answer {turn}. " + "Here is a fact. " * (turn % 23)
+        memory.add(user_msg, bot_reply)
+        old_history.append({"user": user_msg, "bot": bot_reply})
+        if turn in (50, 500, 5000):
+            sizes[turn] = (
+                len(memory.build_prompt("Next?")),
+                time_prompt_builds(lambda: memory.build_prompt("Next?")),
+                time_prompt_builds(lambda: "\n".join([f"User: {h['user']}\nBot: {h['bot']}"
+                                                       for h in old_history]), repeat=20)
+            )
+
+    for turn, (size, seconds, old_seconds) in sizes.items():
+        print(f"   Turn {turn:>4}: prompt {size:>5} chars, built in {seconds * 1e6:6.1f} us "
+              f"(re-joining the whole history: {old_seconds * 1e6:8.1f} us)")
+    prompt = memory.build_prompt("Next?")
+    stats = memory.stats()
+    assert stats['turns'] == 5000 and stats['recent_turns'] <= 10 and stats['history_tokens'] <= 1000
+    assert estimate_tokens(prompt) <= 1000 + 10
+    assert prompt.startswith(SUMMARY_HEADER) and "\nUser: Question 5000:" in prompt
+    assert "\nUser: Question 4990:" not in prompt and "\n- User: Question 4990:" in prompt  # summarized
+    assert sizes[5000][0] < sizes[50][0] * 1.5 and sizes[5000][1] < sizes[50][1] * 3 + 20e-6
+    print("✅ Prompt size and build time stay flat as the session grows")
+
+    fake_model = FakeModel()
+    original_model, ai_assistant.model = ai_assistant.model, fake_model
+    try:
+        ai_assistant.conversation_memory.clear()
+        for turn in range(100):
+            ai_assistant.add_to_history(f"Message {turn}", "Reply " * 50)
+        assert ai_assistant.generate_gemini_reply("What did I say first?") == "Sure!"
+        assert fake_model.prompts[-1].startswith(SUMMARY_HEADER)
+        assert fake_model.prompts[-1].endswith("User: What did I say first?\nBot:")
+        print("✅ generate_gemini_reply builds its prompt from the conversation memory")
+    finally:
+        ai_assistant.model = original_model
+        ai_assistant.conversation_memory.clear()
+
+def test_streaming():
+    """Test streamed Gemini replies in the CLI and the GUI worker."""
+
+    print("\n" + "=" * 60)
+    print("STREAMING TESTS")
+    print("=" * 60)
+
+    chunks = ["Rainbows form ", "when sunlight ", "is refracted ", "by raindrops.", None]
+    question = "Explain how rainbows form please"
+    original_model = ai_assistant.model
+    ai_assistant.model = FakeModel(chunks=chunks, delay=0.05)
+    try:
+        started = time.perf_counter()
+        received = []
+        for chunk in ai_assistant.process_user_input_stream(question):
+            received.append((chunk, time.perf_counter() - started))
+        total = time.perf_counter() - started
+        assert [chunk for chunk, _ in received] == chunks[:-1]
+        assert received[0][1] < total / 3
+        print(f"✅ First chunk after {received[0][1] * 1000:.0f} ms, whole reply after {total * 1000:.0f} ms")
+
+        assert list(ai_assistant.process_user_input_stream("Convert 10 km to miles")) == ["🔄 10.0 km = 6.21 miles"]
+        print("✅ Built-in answers come as a single chunk")
+
+        ai_assistant.model = FakeModel(chunks=chunks, fail_after=2)
+        received = list(ai_assistant.process_user_input_stream(question))
+        assert received[:2] == chunks[:2] and received[2].startswith("\n🤖 I'm having trouble")
+        print("✅ A broken stream keeps the text so far and ends with an error note")
+
+        ai_assistant.model = FakeModel(chunks=chunks)
+        ai_assistant.conversation_memory.clear()
+        answers = iter([question, "exit"])
+        original_input, builtins.input = builtins.input, lambda prompt='': next(answers)
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output):
+                ai_assistant.chat()
+        finally:
+            builtins.input = original_input
+        assert "🤖 Aiden: Rainbows form when sunlight is refracted by raindrops.\n" in output.getvalue()
+        assert ai_assistant.conversation_memory.build_prompt("Next").startswith(
+            f"User: {question}\nBot: Rainbows form when sunlight is refracted by raindrops.")
+        print("✅ chat() prints chunks as they arrive and remembers the whole reply")
+
+        try:
+            from chatbot import ChatbotGUI
+        except ImportError:
+            print("⚠️ tkinter is not installed, GUI worker test skipped")
+            return
+        gui = type('GUI', (), {'message_queue': queue.Queue()})()
+        ChatbotGUI.process_message(gui, question)
+        messages = []
+        while not gui.message_queue.empty():
+            messages.append(gui.message_queue.get_nowait())
+        assert messages == [('bot_chunk', chunk) for chunk in chunks[:-1]] + [('bot_done', "".join(chunks[:-1]))]
+        print("✅ The GUI worker queues each chunk, then the finished reply")
+    finally:
+        ai_assistant.model = original_model
+        ai_assistant.conversation_memory.clear()
+
+def legacy_route(user_input):
+    """The keyword cascade answer_locally ran before the intent router, returning intent names"""
+    user_input_lower = user_input.lower()
+    greeting_words = ["hello", "hi", "hey", "good morning", "good afternoon", "good evening", "greetings", "howdy"]
+    words_in_input = user_input_lower.split()
+    if any(word in words_in_input for word in greeting_words):
+        return "greeting"
+    if any(phrase in user_input_lower for phrase in ["how are you", "how's it going", "how are things", "what's up"]):
+        return "how_are_you"
+    if any(word in user_input_lower for word in ["thank you", "thanks", "thank"]):
+        return "thanks"
+    if any(word in user_input_lower for word in ["good", "nice", "great", "awesome", "cool", "excellent"]) and len(user_input.split()) <= 3:
+        return "small_talk"
+    if any(word in user_input_lower for word in ["bitcoin", "btc"]) and "price" in user_input_lower:
+        return "bitcoin_price"
+    if any(word in user_input_lower for word in ["crypto", "cryptocurrency"]) and "price" in user_input_lower:
+        return "crypto_prices"
+    if any(word in user_input_lower for word in ["stock", "share"]) and "price" in user_input_lower:
+        return "stock_price"
+    if "weather" in user_input_lower:
+        if any(word in user_input_lower for word in ["forecast", "tomorrow", "next", "future", "week", "days"]):
+            return "forecast"
+        elif any(word in user_input_lower for word in ["rain", "precipitation", "shower", "drizzle"]):
+            return "rain_prediction"
+        else:
+            return "weather"
+    if any(phrase in user_input_lower for phrase in ["will it rain", "rain today", "rain tomorrow", "chance of rain", "rain prediction"]):
+        return "rain_prediction"
+    if any(phrase in user_input_lower for phrase in ["weather forecast", "forecast", "weather tomorrow", "weather next week"]):
+        return "forecast"
+    if any(word in user_input_lower for word in ["news", "headlines", "latest news"]):
+        return "news"
+    if any(word in user_input_lower for word in ["convert", "conversion"]) or " to " in user_input_lower:
+        value, from_unit, to_unit = extract_conversion_params(user_input)
+        if value is not None:
+            return "conversion"
+    if any(word in user_input_lower for word in ["password", "generate password"]):
+        return "password"
+    if extract_math_expression(user_input):
+        return "math"
+    if any(word in user_input_lower for word in ["time", "date", "what time", "current time"]):
+        return "time"
+    if any(word in user_input_lower for word in ["joke", "funny", "make me laugh"]):
+        return "joke"
+    if any(word in user_input_lower for word in ["motivation", "motivate", "inspire", "quote"]):
+        return "motivation"
+    if user_input_lower in ["help", "what can you do", "features", "commands"]:
+        return "help"
+    future_rules = [
+        ("translation", ["translate", "translation", "spanish", "french", "german", "hindi"]),
+        ("timezone", ["time in tokyo", "time in london", "time in new york", "timezone"]),
+        ("reminders", ["reminder", "remind me", "schedule", "calendar", "alarm"]),
+        ("advanced_crypto", ["shiba", "xrp", "ripple", "chainlink", "avalanche"]),
+        ("email", ["email", "send mail", "compose email"]),
+        ("file_operations", ["create file", "read file", "delete file", "file management"]),
+        ("currency_exchange", ["usd to eur", "currency exchange", "exchange rate", "dollar to euro"]),
+        ("entertainment", ["oscar winner", "movie", "netflix", "music", "song"]),
+        ("geography", ["population of", "demographics"]),
+        ("qr_code", ["qr code", "generate qr", "create qr"]),
+        ("web_status", ["is google down", "website status", "server down"]),
+    ]
+    for feature, phrases in future_rules:
+        if any(phrase in user_input_lower for phrase in phrases):
+            return feature
+    if len(user_input.split()) <= 2 and not any(char.isdigit() for char in user_input):
+        return "confused"
+    return None
+
+# Messages a user would type, one or more for every branch of the cascade
+GOLDEN_MESSAGES = [
+    "hello", "Hi there!", "hey", "hi!", "this is it", "good morning", "Good evening everyone", "greetings, Aiden", "howdy",
+    "How are you?", "what's up", "thanks a lot", "Thank you!", "nice", "cool stuff man", "that was a great answer, really",
+    "bitcoin price", "What's the BTC price today?", "crypto prices", "cryptocurrency price list", "Apple stock price",
+    "share price of tesla", "weather", "weather in Delhi", "London weather", "weather forecast for Paris",
+    "weather tomorrow in Mumbai", "is there rain in the weather report", "will it rain in Pune", "chance of rain",
+    "forecast", "forecast for Goa", "latest news", "headlines please", "convert 10 km to miles", "5 kg to lbs",
+    "100 celsius to fahrenheit", "how to cook rice", "convert money", "generate password", "password of 16 characters",
+    "calculate 2 + 3 * 4", "math 10/4", "solve x", "compute", "what is 15 * 3", "what is love", "12 * (3 + 4)", "42",
+    "   ", "", "what time is it", "today's date", "tell me a joke", "something funny", "motivate me", "an inspiring quote",
+    "help", "HELP", "what can you do", "features", "commands", "translate hello to spanish", "translate this into french", "time in tokyo",
+    "remind me to call mom", "set an alarm", "xrp outlook", "send mail to bob", "create file notes.txt",
+    "usd to eur", "exchange rate of the yen", "recommend a movie", "population of india", "qr code for my site",
+    "is google down", "ok", "why?", "tell me about the roman empire", "Explain quantum computing in simple terms",
+    "2 apples", "who won the 2022 world cup", "hi\tthere", "HEY\n", "Thanksgiving plans",
+]
+
+def keyword_messages(count, seed=7):
+    """Random messages built from the router's keywords, fillers, numbers and odd spacing"""
+    rng = random.Random(seed)
+    fragments = sorted(ai_assistant.intent_router.keywords) + [
+        "in delhi", "for paris", "what is", "5 km to miles", "2+3", "(1 + 2) * 3", "please", "the", "my", "42",
+        "good morning", "hi!", "HELLO", "this", "shine", "to", "weather", "price", "?", "x",
+    ]
+    separators = [" ", " ", " ", "", "  ", "\t", "\n"]
+    messages = []
+    for _ in range(count):
+        parts = [rng.choice(fragments) for _ in range(rng.randint(1, 4))]
+        message = parts[0]
+        for part in parts[1:]:
+            message += rng.choice(separators) + part
+        if rng.random() < 0.2:
+            message = message.upper()
+        elif rng.random() < 0.2:
+            message = message.title()
+        messages.append(message)
+    return messages
+
+def routing_rate(route, messages, repeat=5):
+    """Messages routed per second"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message in messages:
+            route(message)
+    return repeat * len(messages) / (time.perf_counter() - start)
+
+def test_intent_router():
+    """Test that the compiled intent router routes exactly like the old keyword cascade."""
+
+    print("\n" + "=" * 60)
+    print("INTENT ROUTER TESTS")
+    print("=" * 60)
+
+    route = ai_assistant.intent_router.route
+    for message in GOLDEN_MESSAGES:
+        assert route(message) == legacy_route(message), f"{message!r}: {route(message)} != {legacy_route(message)}"
+    routed = {route(message) for message in GOLDEN_MESSAGES}
+    # Every timezone phrase also says "time", which is answered first
+    expected = {intent.name for intent in ai_assistant.INTENTS} - {"timezone"} | {None}
+    assert routed == expected, f"Golden messages miss intents: {expected - routed}"
+    print(f"✅ {len(GOLDEN_MESSAGES)} golden messages route as before, covering all {len(expected) - 1} intents")
+
+    generated = keyword_messages(20000)
+    mismatches = [message for message in generated if route(message) != legacy_route(message)]
+    assert not mismatches, f"Routing changed for {len(mismatches)} messages, e.g. {mismatches[:5]}"
+    print(f"✅ {len(generated)} generated keyword messages route as before")
+
+    assert ai_assistant.detect_future_feature_request("What time in Tokyo is it?") == "timezone"
+    assert ai_assistant.detect_future_feature_request("remind me at 5") == "reminders"
+    assert ai_assistant.detect_future_feature_request("what is love") is None
+    assert ai_assistant.answer_locally("what is 2+3") == "🧮 2+3 = 5"
+    assert ai_assistant.answer_locally("convert 5 km to miles") == "🔄 5.0 km = 3.11 miles"
+    assert ai_assistant.answer_locally("Explain quantum computing in simple terms") is None
+    print("✅ answer_locally dispatches the routed intent and leaves the rest to Gemini")
+
+    # Micro-benchmark: short typed commands, and longer questions that end up with Gemini
+    questions = [
+        "Can you explain to me in some detail how the roman empire managed its provinces and taxes?",
+        "I am writing an essay about climate policy, could you suggest a structure and some sources?",
+        "What are the main differences between a process and a thread in modern operating systems?",
+        "My sourdough bread keeps coming out flat and dense, what am I probably doing wrong here?",
+    ]
+    for label, sample in (("typed messages", GOLDEN_MESSAGES), ("long questions", questions * 20)):
+        legacy_rate = routing_rate(legacy_route, sample)
+        router_rate = routing_rate(route, sample)
+        print(f"📊 {label}: {router_rate:,.0f} messages/s routed vs {legacy_rate:,.0f} messages/s "
+              f"with the cascade ({router_rate / legacy_rate:.1f}x)")
+
+if __name__ == "__main__":
+    print("Starting AI Assistant Tests...")
+
+    # Test the tool result cache
+    test_tool_cache()
+
+    # Test the conversation memory
+    test_conversation_memory()
+
+    # Test streamed replies
+    test_streaming()
+
+    # Test intent routing against the old keyword cascade
+    test_intent_router()
+
+    print("\n🎉 All tests completed!")
@@ -0,0 +1,164 @@
+"""
+Cache for the assistant's external API lookups
+
+Weather, forecast and crypto answers are cached as decoded JSON payloads,
+keyed by endpoint and normalized query parameters ("New  York" and
+"new york" are the same lookup; API keys are left out of the key). Each
+kind of data has its own time-to-live. Once an entry expires it is still
+served for a grace period while one background thread fetches a fresh
+copy, so a user only waits for the network on a real miss. Concurrent
+misses for the same key share a single fetch, and the forecast payload is
+shared by the forecast and rain prediction features.
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Seconds a payload is fresh, by kind of data
+DEFAULT_TTLS = {
+    'crypto': 60,
+    'weather': 10 * 60,
+    'forecast': 30 * 60,
+}
+
+# An expired payload is still served, while it is refreshed, for this multiple of its TTL
+STALE_FACTOR = 1.0
+
+# Query parameters that are not part of the cache key
+IGNORED_PARAMS = frozenset(['appid', 'apikey', 'api_key', 'key'])
+
+def normalize_value(value):
+    """Lowercase, single-spaced string form of a query parameter value"""
+    return ' '.join(str(value).lower().split())
+
+def cache_key(kind, url, params=None):
+    """Key for a lookup: kind, endpoint and sorted, normalized parameters (API keys excluded)"""
+    items = tuple(sorted(
+        (name, normalize_value(value)) for name, value in (params or {}).items()
+        if name.lower() not in IGNORED_PARAMS and value is not None
+    ))
+    return kind, url, items
+
+class ToolCache:
+    """TTL cache of API payloads with stale-while-revalidate and single-flight fetches"""
+
+    def __init__(self, ttls=None, stale_factor=STALE_FACTOR, max_entries=256, clock=time.monotonic):
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.stale_factor = stale_factor
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = {}  # key -> (payload, fetched at)
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._refreshing = {}  # key -> refresh thread
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.errors = 0
+
+    def get(self, kind, url, params, fetch):
+        """
+        Return the payload for a lookup, calling fetch() on a miss
+        fetch() returns (HTTP status, payload); only status 200 is cached.
+        Returns: (HTTP status, payload)
+        """
+        key = cache_key(kind, url, params)
+        ttl = self.ttls.get(kind, 0)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = self.clock() - entry[1]
+                if age < ttl:
+                    self.hits += 1
+                    return 200, entry[0]
+                if age < ttl * (1 + self.stale_factor):
+                    self.stale_hits += 1
+                    self._refresh_in_background(key, fetch)
+                    return 200, entry[0]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # One fetch per key: callers that missed at the same time wait for it
+        with key_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and self.clock() - entry[1] < ttl:
+                    self.hits += 1
+                    return 200, entry[0]
+                self.misses += 1
+            try:
+                return self._fetch(key, fetch)
+            finally:
+                with self._lock:
+                    if key not in self._entries:
+                        # Nothing cached (error answer): do not keep a lock per bad lookup
+                        self._key_locks.pop(key, None)
+
+    def _fetch(self, key, fetch):
+        try:
+            status, payload = fetch()
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        if status == 200:
+            self._store(key, payload)
+        return status, payload
+
+    def _store(self, key, payload):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (payload, self.clock())
+            # Dicts keep insertion order, so the first key is the least recently fetched
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                del self._entries[oldest]
+                self._key_locks.pop(oldest, None)
+
+    def _refresh_in_background(self, key, fetch):
+        """Start a refresh thread for key unless one is running (called with the lock held)"""
+        if key in self._refreshing:
+            return
+        thread = threading.Thread(target=self._refresh, args=(key, fetch), name='tool-cache-refresh', daemon=True)
+        self._refreshing[key] = thread
+        self.refreshes += 1
+        thread.start()
+
+    def _refresh(self, key, fetch):
+        try:
+            self._fetch(key, fetch)
+        except Exception as e:
+            # The stale payload stays until its grace period ends
+            logger.warning(f"Background refresh of {key[0]} failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.pop(key, None)
+
+    def wait_for_refreshes(self, timeout=None):
+        """Wait for running background refreshes (for tests and shutdown)"""
+        with self._lock:
+            threads = list(self._refreshing.values())
+        for thread in threads:
+            thread.join(timeout)
+
+    def clear(self):
+        """Drop every cached payload (stats are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return a dict of cache counters and the hit rate (stale hits count as hits)"""
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'refreshes': self.refreshes,
+                'errors': self.errors,
+                'hit_rate': round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0
+            }
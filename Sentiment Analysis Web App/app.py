@@ -1,42 +1,305 @@
-from flask import Flask, render_template, request, jsonify
-from textblob import TextBlob
+from flask import Flask, Response, g, render_template, request, jsonify
+import atexit
+import hmac
 import logging
+import sqlite3
+import threading
+import time
+
+import fast_json
+import profiling
+from aspects import DEFAULT_ASPECTS, DEFAULT_WINDOW, analyze_aspects
+from compression import Compressor, is_compressible, weak_etag
+from engines import ENGINE_NAMES, EngineScorer, classify, create_engines, sentiment_result
+from jobs import JobQueue, JobWorkers, TooManyJobs
+from long_document import analyze_document, iter_decoded
+from metrics import SentimentMetrics, NullTimer
+from page_cache import AssetManifest, PageRenderer, PAGE_CACHE_CONTROL
+from prefilter import DEFAULT_BOILERPLATE, Prefilter, read_boilerplate
+from profiling import Profiler, TracedTimer
+from rate_limit import ConcurrencyLimiter, MemoryBackend, RateLimiter, RedisBackend, client_key
+from result_cache import ResultCache
+from result_store import ResultStore
+from scoring_pool import ScoringPool, PoolBusyError, is_worker_process
 
 app = Flask(__name__)
+app.json = fast_json.FastJSONProvider(app)
+
+# Default configuration, overridable with SENTIMENT_* environment variables
+# (e.g. SENTIMENT_RESULT_CACHE_ENABLED=false, SENTIMENT_RESULT_CACHE_TTL=600)
+app.config.update(
+    RESULT_CACHE_ENABLED=True,
+    RESULT_CACHE_MAX_ENTRIES=10000,
+    RESULT_CACHE_MAX_BYTES=16 * 1024 * 1024,
+    RESULT_CACHE_TTL=3600,  # seconds, 0 disables expiry
+    RESULT_STORE_PATH='',  # SQLite file shared by all workers, '' disables
+    RESULT_STORE_WRITE=True,  # also persist newly scored results
+    SCORING_POOL_ENABLED=False,
+    SCORING_POOL_WORKERS=0,  # 0 = one worker per available core
+    SCORING_POOL_MAX_PENDING=0,  # queued chunks before shedding load, 0 = 4 per worker
+    SCORING_POOL_CHUNK_SIZE=64,
+    METRICS_ENABLED=True,
+    WARM_UP_IN_BACKGROUND=True,  # serve /healthz while the engine loads
+    PAGE_CACHE_ENABLED=True,  # render the index page shell once
+    COMPRESSION_ENABLED=True,
+    COMPRESSION_MIN_SIZE=1024,  # bytes; smaller responses are sent as they are
+    RATE_LIMIT_ENABLED=False,
+    RATE_LIMIT_PER_SECOND=10.0,  # tokens added to each client's bucket per second
+    RATE_LIMIT_BURST=20,  # bucket size: requests a client may send at once
+    RATE_LIMIT_KEY_HEADER='X-API-Key',  # clients without it are limited by address
+    API_KEYS='',  # comma-separated keys that identify a client; other keys are ignored
+    RATE_LIMIT_REDIS_URL='',  # share buckets across processes, '' keeps them in memory
+    MAX_CONCURRENT_REQUESTS=0,  # scoring requests in flight per process, 0 = unlimited
+    ENGINE='lexicon',  # textblob, lexicon, hashed or cascade; requests can pick another with ?engine=
+    CASCADE_FAST_ENGINE='hashed',  # answers texts it classifies confidently
+    CASCADE_SLOW_ENGINE='lexicon',  # scores texts near the Positive/Negative thresholds
+    CASCADE_MARGIN=0.05,  # polarity distance from a threshold that counts as confident
+    JOBS_PATH='',  # SQLite file for the background job API, '' disables it
+    JOBS_WORKERS=1,  # job worker threads per process
+    JOBS_CHUNK_SIZE=500,  # texts scored (and saved) at a time
+    JOBS_MAX_TEXTS=100000,  # texts per job
+    JOBS_MAX_ACTIVE_PER_CLIENT=2,  # queued or running jobs per client, 0 = unlimited
+    JOBS_RETENTION=7 * 24 * 3600,  # seconds finished jobs and their results are kept
+    JOBS_WEBHOOKS_ENABLED=False,  # allow ?webhook= URLs that are called when a job finishes
+    PREFILTER_ENABLED=False,  # answer boilerplate, signal-less and non-English texts without scoring
+    PREFILTER_LANGUAGES='en',  # comma-separated languages that are scored
+    PREFILTER_BOILERPLATE_PATH='',  # extra boilerplate texts, one per line
+    PROFILING_ENABLED=False,  # trace a sample of scoring requests from startup
+    PROFILING_SAMPLE_RATE=0.01,  # fraction of scoring requests traced
+    PROFILING_SLOW_MS=500,  # traced requests at least this slow leave a report
+    PROFILING_DURATION=600,  # seconds before profiling switches itself off, 0 = never
+    PROFILING_REPORT_PATH='',  # append slow-request reports to this JSON lines file
+    PROFILING_TOKEN=''  # X-Profiling-Token for /debug/profiling, '' disables the endpoint
+)
+app.config.from_prefixed_env('SENTIMENT')
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def analyze_sentiment(text):
+# Fingerprinted CSS/JS and the cached index page shell
+assets = AssetManifest(app.static_folder)
+app.jinja_env.globals['asset_url'] = assets.url
+page_renderer = PageRenderer(app.jinja_env, enabled=app.config['PAGE_CACHE_ENABLED'])
+
+# gzip/brotli response compression, negotiated per request
+compressor = Compressor(
+    min_size=app.config['COMPRESSION_MIN_SIZE'],
+    enabled=app.config['COMPRESSION_ENABLED']
+)
+
+# Input limits
+MAX_TEXT_LENGTH = 5000
+MAX_BATCH_ITEMS = 1000
+MAX_BATCH_BYTES = 1024 * 1024  # 1 MB request body
+MAX_DOCUMENT_BYTES = 2 * 1024 * 1024  # 2 MB long document
+MAX_SENTENCE_DETAILS = 5000  # per-sentence results returned for a document
+MAX_JOB_BYTES = 64 * 1024 * 1024  # 64 MB job submission
+MAX_ASPECTS = 50  # aspect terms per request
+MAX_ASPECT_LENGTH = 100
+MAX_ASPECT_WINDOW = 50  # tokens each side of a mention
+MAX_PROFILING_DURATION = 3600  # seconds profiling can be switched on for at a time
+
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/ndjson')
+
+# Routes that do scoring work and go through admission control
+ADMISSION_PATHS = frozenset(('/analyze', '/api/analyze', '/api/analyze/batch', '/api/analyze/document',
+                             '/api/analyze/aspects', '/api/jobs'))
+
+# Sentiment engines by name, and the one used when a request does not pick one
+engines = {}
+default_engine = None
+
+def configure_engines():
+    """(Re)create the sentiment engines from the app config"""
+    global engines, default_engine
+    
+    engines = create_engines(
+        fast=app.config['CASCADE_FAST_ENGINE'],
+        slow=app.config['CASCADE_SLOW_ENGINE'],
+        margin=float(app.config['CASCADE_MARGIN'])
+    )
+    if app.config['ENGINE'] not in engines:
+        raise ValueError(f"Unknown sentiment engine {app.config['ENGINE']!r}, choose one of: {', '.join(ENGINE_NAMES)}")
+    default_engine = engines[app.config['ENGINE']]
+    
+    return default_engine
+
+configure_engines()
+
+def requested_engine(name):
+    """
+    Engine picked with a request's ?engine= parameter
+    Returns: (engine or None for the default engine, error message)
+    """
+    if not name:
+        return None, None
+    
+    engine = engines.get(name)
+    if engine is None:
+        return None, f"Unknown engine {name!r}, choose one of: {', '.join(ENGINE_NAMES)}"
+    
+    return engine, None
+
+# Pre-scoring checks that short-circuit texts the lexicon cannot score
+prefilter = None
+
+def configure_prefilter():
+    """(Re)create the pre-filter from the app config"""
+    global prefilter
+    
+    boilerplate = list(DEFAULT_BOILERPLATE)
+    if app.config['PREFILTER_BOILERPLATE_PATH']:
+        boilerplate += read_boilerplate(app.config['PREFILTER_BOILERPLATE_PATH'])
+    
+    prefilter = Prefilter(
+        languages=[language.strip() for language in app.config['PREFILTER_LANGUAGES'].split(',') if language.strip()],
+        boilerplate=boilerplate,
+        enabled=app.config['PREFILTER_ENABLED']
+    )
+    return prefilter
+
+configure_prefilter()
+
+# Result cache for repeated texts (None when disabled)
+result_cache = None
+
+def configure_result_cache():
+    """(Re)create the result cache from the app config"""
+    global result_cache
+    
+    if app.config['RESULT_CACHE_ENABLED']:
+        result_cache = ResultCache(
+            max_entries=app.config['RESULT_CACHE_MAX_ENTRIES'],
+            max_bytes=app.config['RESULT_CACHE_MAX_BYTES'],
+            ttl=app.config['RESULT_CACHE_TTL'] or None
+        )
+    else:
+        result_cache = None
+    
+    return result_cache
+
+configure_result_cache()
+
+def result_version():
+    """Version tag for persisted results; changes with the default engine or its lexicon"""
+    return default_engine.version()
+
+# Persistent result store shared across workers and deploys (None when disabled)
+result_store = None
+
+def configure_result_store():
+    """(Re)open the persistent result store from the app config"""
+    global result_store
+    
+    if result_store is not None:
+        result_store.close()
+    
+    if app.config['RESULT_STORE_PATH']:
+        result_store = ResultStore(app.config['RESULT_STORE_PATH'], result_version())
+    else:
+        result_store = None
+    
+    return result_store
+
+configure_result_store()
+
+def analyze_sentiment(text, engine=None):
     """
-    Analyze sentiment of the given text using TextBlob
+    Analyze sentiment of the given text, serving repeated texts from the result cache
+    Returns: dict with sentiment classification, polarity, and subjectivity
+    """
+    return analyze_texts([text], engine)[0]
+
+def analyze_texts(texts, engine=None):
+    """
+    Analyze a list of texts: repeated texts are served from the result
+    cache, texts the pre-filter flags are answered at once, then texts are
+    looked up in the persistent result store, and the rest are scored in
+    one pass (on the scoring pool when enabled)
+    Texts for an engine other than the default one are scored directly;
+    the cache and the store only hold default engine results.
+    Returns: list of result dicts in input order
+    """
+    results = [None] * len(texts)
+    use_cache = engine is None or engine is default_engine
+    missing = []
+    
+    for index, text in enumerate(texts):
+        cached = result_cache.get(text) if use_cache and result_cache is not None else None
+        if cached is not None:
+            results[index] = {'text': text, **cached}
+            continue
+        
+        flagged = prefilter.check(text)
+        if flagged is not None:
+            reason, language = flagged
+            results[index] = skipped_result(text, reason, language)
+            prefilter_rejections.inc(reason)
+            continue
+        
+        missing.append(index)
+    
+    if not use_cache:
+        for index in missing:
+            results[index] = compute_sentiment(texts[index], engine)
+        return results
+    
+    if result_store is not None and missing:
+        try:
+            with profiling.span('result_store'):
+                stored = result_store.get_many([texts[index] for index in missing])
+        except sqlite3.Error as e:
+            logger.error(f"Error reading from result store: {str(e)}")
+            stored = [None] * len(missing)
+        still_missing = []
+        for index, value in zip(missing, stored):
+            if value is None:
+                still_missing.append(index)
+                continue
+            results[index] = {'text': texts[index], **value}
+            if result_cache is not None:
+                result_cache.put(texts[index], value)
+        missing = still_missing
+    
+    scored = score_texts([texts[index] for index in missing])
+    new_entries = []
+    for index, result in zip(missing, scored):
+        results[index] = result
+        if 'error' not in result:
+            value = {key: item for key, item in result.items() if key != 'text'}
+            new_entries.append((texts[index], value))
+            if result_cache is not None:
+                result_cache.put(texts[index], value)
+    
+    if result_store is not None and app.config['RESULT_STORE_WRITE'] and new_entries:
+        try:
+            result_store.put_many(new_entries)
+        except sqlite3.Error as e:
+            # Serving never fails because the store is busy or read-only
+            logger.error(f"Error writing to result store: {str(e)}")
+    
+    return results
+
+def compute_sentiment(text, engine=None):
+    """
+    Analyze sentiment of the given text with engine (the default engine if None)
     Returns: dict with sentiment classification, polarity, and subjectivity
     """
     try:
-        # Create TextBlob object
-        blob = TextBlob(text)
+        engine = engine or default_engine
+        trace = profiling.current_trace()
+        started = time.perf_counter() if trace is not None else None
         
         # Get polarity (-1 to 1) and subjectivity (0 to 1)
-        polarity = blob.sentiment.polarity
-        subjectivity = blob.sentiment.subjectivity
-        
-        # Classify sentiment based on polarity
-        if polarity > 0.1:
-            sentiment = "Positive"
-        elif polarity < -0.1:
-            sentiment = "Negative"
-        else:
-            sentiment = "Neutral"
+        polarity, subjectivity = engine.score(text)
         
-        return {
-            'text': text,
-            'sentiment': sentiment,
-            'polarity': round(polarity, 3),
-            'subjectivity': round(subjectivity, 3),
-            'polarity_percentage': round((polarity + 1) * 50, 1),  # Convert to 0-100 scale
-            'subjectivity_percentage': round(subjectivity * 100, 1)  # Convert to 0-100 scale
-        }
+        if trace is not None:
+            # Time inside the engine (TextBlob for the textblob engine), per sampled request
+            trace.add_span(f'engine:{engine.name}', time.perf_counter() - started)
+            trace.add_text(len(text))
+        
+        return sentiment_result(text, polarity, subjectivity)
     
     except Exception as e:
         logger.error(f"Error analyzing sentiment: {str(e)}")
@@ -44,72 +307,951 @@ def analyze_sentiment(text):
             'error': f"Error analyzing sentiment: {str(e)}"
         }
 
+def skipped_result(text, reason, language=None):
+    """
+    Neutral result for a text the pre-filter answered without scoring
+    Returns: the usual result fields plus "skipped" (the reason) and the detected language
+    """
+    result = {
+        'text': text,
+        'sentiment': 'Neutral',
+        'polarity': 0.0,
+        'subjectivity': 0.0,
+        'polarity_percentage': 50.0,
+        'subjectivity_percentage': 0.0,
+        'skipped': reason
+    }
+    if language:
+        result['language'] = language
+    return result
+
+# Process pool for CPU-bound scoring (None when disabled)
+scoring_pool = None
+
+def pool_scorer():
+    """Scoring function for pool workers: the default engine, built in each worker without importing this app"""
+    return EngineScorer(
+        app.config['ENGINE'],
+        fast=app.config['CASCADE_FAST_ENGINE'],
+        slow=app.config['CASCADE_SLOW_ENGINE'],
+        margin=float(app.config['CASCADE_MARGIN'])
+    )
+
+def configure_scoring_pool():
+    """(Re)create the scoring pool from the app config and warm up its workers"""
+    global scoring_pool
+    
+    if scoring_pool is not None:
+        scoring_pool.shutdown()
+        scoring_pool = None
+    
+    if app.config['SCORING_POOL_ENABLED']:
+        scoring_pool = ScoringPool(
+            pool_scorer(),
+            workers=app.config['SCORING_POOL_WORKERS'] or None,
+            max_pending=app.config['SCORING_POOL_MAX_PENDING'] or None,
+            chunk_size=app.config['SCORING_POOL_CHUNK_SIZE']
+        )
+        pids = scoring_pool.warm_up()
+        logger.info(f"Scoring pool ready with {len(pids)} worker processes")
+    
+    return scoring_pool
+
+def score_texts(texts):
+    """
+    Score texts without caching, on the scoring pool when it is enabled
+    Raises PoolBusyError when the pool queue is full.
+    """
+    if not texts:
+        return []
+    
+    if scoring_pool is not None:
+        return scoring_pool.map(texts)
+    
+    return [compute_sentiment(text) for text in texts]
+
+# Readiness for /readyz: set once the engine is loaded and warmed up
+ready = threading.Event()
+warm_up_lock = threading.Lock()
+warm_up_status = {'seconds': None, 'error': None}
+
+WARM_UP_TEXT = "This warm-up sentence is not bad at all!"
+
+def warm_up():
+    """
+    Load the default engine (importing TextBlob/NLTK), score a probe text
+    and start the scoring pool and job workers if enabled. Safe to call more than once; later
+    calls wait for the first to finish.
+    Returns: True if the app is ready to serve traffic
+    """
+    with warm_up_lock:
+        if ready.is_set():
+            return True
+        
+        started = time.perf_counter()
+        try:
+            default_engine.load()
+            default_engine.score(WARM_UP_TEXT)
+            configure_scoring_pool()
+            if job_workers is not None:
+                job_workers.start()
+        except Exception as e:
+            logger.error(f"Error warming up: {str(e)}")
+            warm_up_status['error'] = str(e)
+            return False
+        
+        warm_up_status['seconds'] = round(time.perf_counter() - started, 3)
+        warm_up_status['error'] = None
+        ready.set()
+        logger.info(f"Sentiment engine warmed up in {warm_up_status['seconds']}s")
+        return True
+
+def start_warm_up():
+    """Run warm_up() on a background thread so health checks are answered at once"""
+    thread = threading.Thread(target=warm_up, name='warm-up', daemon=True)
+    thread.start()
+    return thread
+
+def readiness():
+    """
+    Current readiness for /readyz
+    Returns: (response body, HTTP status)
+    """
+    if ready.is_set():
+        return {'status': 'ready', 'warm_up_seconds': warm_up_status['seconds']}, 200
+    
+    if warm_up_status['error']:
+        return {'status': 'failed', 'error': warm_up_status['error']}, 503
+    
+    return {'status': 'warming up'}, 503
+
+@atexit.register
+def shutdown_scoring_pool():
+    if job_workers is not None:
+        job_workers.stop(timeout=5)
+    if scoring_pool is not None:
+        scoring_pool.shutdown()
+
+def classify_polarity(polarity):
+    """Classify sentiment based on polarity"""
+    return classify(polarity)
+
+def validate_text(text):
+    """
+    Validate a single (already stripped) text
+    Returns: error message, or None if the text can be analyzed
+    """
+    if not text:
+        return 'Text cannot be empty'
+    
+    if len(text) > MAX_TEXT_LENGTH:
+        return f'Text is too long. Please limit to {MAX_TEXT_LENGTH} characters.'
+    
+    return None
+
+def analyze_batch(texts, engine=None):
+    """
+    Analyze sentiment for a list of texts in one pass
+    Duplicate texts within the batch are only scored once.
+    Returns: list of per-item dicts (result or error), each tagged with its index
+    """
+    results = []
+    unique = {}  # text -> position in the list of texts to score
+    
+    for index, text in enumerate(texts):
+        if not isinstance(text, str):
+            results.append({'index': index, 'error': 'Text must be a string'})
+            continue
+        
+        text = text.strip()
+        error = validate_text(text)
+        if error:
+            results.append({'index': index, 'error': error})
+            continue
+        
+        results.append((index, unique.setdefault(text, len(unique))))
+    
+    scored = analyze_texts(list(unique), engine)
+    
+    return [
+        item if isinstance(item, dict) else dict(scored[item[1]], index=item[0])
+        for item in results
+    ]
+
+class BodyTooLarge(Exception):
+    """Raised when a request body turns out to be larger than its route allows"""
+
+def iter_body(limit, chunk_size=64 * 1024):
+    """
+    Yield the request body in chunks, counting the bytes actually read
+    A chunked body has no Content-Length to check up front, so the limit is
+    enforced on what arrives. Raises BodyTooLarge once more than limit bytes are read.
+    """
+    if request.content_length is not None and request.content_length > limit:
+        raise BodyTooLarge(limit)
+    stream = request.stream
+    received = 0
+    for chunk in iter(lambda: stream.read(chunk_size), b''):
+        received += len(chunk)
+        if received > limit:
+            raise BodyTooLarge(limit)
+        yield chunk
+
+def read_body(limit):
+    """The whole request body, at most limit bytes (raises BodyTooLarge)"""
+    return b''.join(iter_body(limit))
+
+def is_json_mimetype(mimetype):
+    """Same rule as Flask's request.is_json"""
+    return mimetype == 'application/json' or (mimetype.startswith('application/') and mimetype.endswith('+json'))
+
+def parse_batch_body(body, mimetype):
+    """
+    Extract the list of texts from a batch request body (bytes)
+    Accepts a JSON array, a JSON object with a "texts" array, or NDJSON
+    (one JSON string or {"text": ...} object per line).
+    Returns: (texts, error message)
+    """
+    if mimetype in NDJSON_CONTENT_TYPES:
+        texts = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                item = fast_json.loads(line)
+            except ValueError:
+                return None, 'Invalid NDJSON line in request body'
+            texts.append(item.get('text') if isinstance(item, dict) else item)
+        return texts, None
+    
+    data = None
+    if is_json_mimetype(mimetype):
+        try:
+            data = fast_json.loads(body)
+        except ValueError:
+            pass
+    if isinstance(data, dict):
+        data = data.get('texts')
+    if not isinstance(data, list):
+        return None, 'Request body must be a JSON array of texts or an object with a "texts" array'
+    
+    return [item.get('text') if isinstance(item, dict) else item for item in data], None
+
+def validate_batch(texts):
+    """
+    Validate the size of a parsed batch
+    Returns: error message, or None if the batch can be analyzed
+    """
+    if not texts:
+        return 'Batch cannot be empty'
+    
+    if len(texts) > MAX_BATCH_ITEMS:
+        return f'Too many texts. Please limit to {MAX_BATCH_ITEMS} items per batch.'
+    
+    return None
+
+def parse_aspect_request(data):
+    """
+    Extract and validate an aspect request: {"text": ..., "aspects": [...], "window": n}
+    Returns: (text, aspect terms, window, error message)
+    """
+    if not isinstance(data, dict) or 'text' not in data:
+        return None, None, None, 'Missing text field in request body'
+    
+    text = data['text'].strip() if isinstance(data['text'], str) else ''
+    error = validate_text(text)
+    if error:
+        return None, None, None, error
+    
+    aspects = data.get('aspects', DEFAULT_ASPECTS)
+    if (not isinstance(aspects, (list, tuple)) or not aspects
+            or not all(isinstance(term, str) and term.strip() for term in aspects)):
+        return None, None, None, 'aspects must be a non-empty list of terms'
+    if len(aspects) > MAX_ASPECTS or any(len(term) > MAX_ASPECT_LENGTH for term in aspects):
+        return None, None, None, f'Please limit to {MAX_ASPECTS} aspects of at most {MAX_ASPECT_LENGTH} characters.'
+    
+    window = data.get('window', DEFAULT_WINDOW)
+    if not isinstance(window, int) or isinstance(window, bool) or not 1 <= window <= MAX_ASPECT_WINDOW:
+        return None, None, None, f'window must be an integer between 1 and {MAX_ASPECT_WINDOW}'
+    
+    return text, tuple(term.strip() for term in aspects), window, None
+
+def score_job_chunk(texts, engine_name):
+    """Score one chunk of a background job (runs on a job worker thread)"""
+    return analyze_batch(texts, engines.get(engine_name) if engine_name else None)
+
+# Durable background job queue and its workers (None when disabled)
+job_queue = None
+job_workers = None
+
+def configure_jobs():
+    """(Re)open the job queue from the app config; workers start with warm_up()"""
+    global job_queue, job_workers
+    
+    if job_workers is not None:
+        job_workers.stop()
+    if job_queue is not None:
+        job_queue.close()
+    
+    if app.config['JOBS_PATH']:
+        job_queue = JobQueue(
+            app.config['JOBS_PATH'],
+            max_active_per_client=app.config['JOBS_MAX_ACTIVE_PER_CLIENT']
+        )
+        job_workers = JobWorkers(
+            job_queue,
+            score_job_chunk,
+            threads=app.config['JOBS_WORKERS'],
+            chunk_size=app.config['JOBS_CHUNK_SIZE'],
+            retention=app.config['JOBS_RETENTION']
+        )
+    else:
+        job_queue = job_workers = None
+    
+    return job_queue
+
+configure_jobs()
+
+def submit_job(body, mimetype, engine_name, webhook, api_key, remote_addr):
+    """
+    Queue a job for a batch-style request body
+    Returns: (response body, HTTP status, headers)
+    """
+    if job_queue is None:
+        return {'error': 'The job API is disabled. Set SENTIMENT_JOBS_PATH to enable it.'}, 404, {}
+    
+    _, error = requested_engine(engine_name)
+    if error:
+        return {'error': error}, 400, {}
+    
+    if webhook:
+        if not app.config['JOBS_WEBHOOKS_ENABLED']:
+            return {'error': 'Webhooks are disabled on this server'}, 400, {}
+        if not webhook.startswith(('http://', 'https://')):
+            return {'error': 'Webhook must be an http:// or https:// URL'}, 400, {}
+    
+    texts, error = parse_batch_body(body, mimetype)
+    if error:
+        return {'error': error}, 400, {}
+    if not texts:
+        return {'error': 'Job cannot be empty'}, 400, {}
+    if len(texts) > app.config['JOBS_MAX_TEXTS']:
+        return {'error': f"Too many texts. Please limit to {app.config['JOBS_MAX_TEXTS']} items per job."}, 400, {}
+    
+    try:
+        job_id = job_queue.submit(texts, request_client(api_key, remote_addr), engine=engine_name, webhook=webhook)
+    except TooManyJobs as e:
+        return {'error': str(e)}, 429, {'Retry-After': '30'}
+    
+    job_workers.wake()
+    return job_queue.get(job_id), 202, {'Location': f'/api/jobs/{job_id}'}
+
+def job_status(job_id):
+    """
+    Status and progress of a job
+    Returns: (response body, HTTP status)
+    """
+    job = job_queue.get(job_id) if job_queue is not None else None
+    if job is None:
+        return {'error': 'Job not found'}, 404
+    return job, 200
+
+def job_results(job_id, offset, limit):
+    """
+    One page of a job's results (only texts scored so far while it is running)
+    Returns: (response body, HTTP status)
+    """
+    job = job_queue.get(job_id) if job_queue is not None else None
+    if job is None:
+        return {'error': 'Job not found'}, 404
+    
+    try:
+        offset = max(0, int(offset or 0))
+        limit = min(MAX_BATCH_ITEMS, max(1, int(limit or MAX_BATCH_ITEMS)))
+    except ValueError:
+        return {'error': 'offset and limit must be integers'}, 400
+    
+    results = job_queue.results(job_id, offset, limit)
+    next_offset = offset + limit if offset + limit < job['total'] else None
+    return {
+        'id': job_id,
+        'status': job['status'],
+        'offset': offset,
+        'count': len(results),
+        'next_offset': next_offset,
+        'results': results
+    }, 200
+
+def batch_response(results):
+    """Response body for a scored batch"""
+    return {
+        'count': len(results),
+        'errors': sum(1 for item in results if 'error' in item),
+        'results': results
+    }
+
+# Request counts, per-stage latencies and text lengths for /metrics
+metrics = SentimentMetrics()
+prefilter_rejections = metrics.registry.counter(
+    'sentiment_prefilter_rejected_total', 'Texts answered by the pre-filter without scoring', ('reason',))
+
+def collect_cache_metrics():
+    """Expose result cache counters alongside the request metrics"""
+    if result_cache is None:
+        return []
+    
+    stats = result_cache.stats()
+    return [
+        ('sentiment_cache_hits_total', 'counter', 'Result cache hits', stats['hits']),
+        ('sentiment_cache_misses_total', 'counter', 'Result cache misses', stats['misses']),
+        ('sentiment_cache_evictions_total', 'counter', 'Result cache evictions', stats['evictions']),
+        ('sentiment_cache_entries', 'gauge', 'Entries in the result cache', stats['entries'])
+    ]
+
+metrics.registry.add_collector(collect_cache_metrics)
+
+def collect_store_metrics():
+    """Expose persistent result store counters"""
+    if result_store is None:
+        return []
+    
+    return [
+        ('sentiment_store_hits_total', 'counter', 'Result store hits', result_store.hits),
+        ('sentiment_store_misses_total', 'counter', 'Result store misses', result_store.misses),
+        ('sentiment_store_writes_total', 'counter', 'Results written to the result store', result_store.writes)
+    ]
+
+metrics.registry.add_collector(collect_store_metrics)
+
+def collect_compression_metrics():
+    """Expose response compression counters"""
+    stats = compressor.stats()
+    return [
+        ('sentiment_compressed_responses_total', 'counter', 'Responses sent compressed', stats['compressed']),
+        ('sentiment_compression_bytes_in_total', 'counter', 'Response bytes before compression', stats['bytes_in']),
+        ('sentiment_compression_bytes_out_total', 'counter', 'Response bytes after compression', stats['bytes_out'])
+    ]
+
+metrics.registry.add_collector(collect_compression_metrics)
+
+def collect_job_metrics():
+    """Expose background job counts by status"""
+    if job_queue is None:
+        return []
+    
+    stats = job_queue.stats()
+    return [
+        ('sentiment_jobs_queued', 'gauge', 'Background jobs waiting for a worker', stats['queued']),
+        ('sentiment_jobs_running', 'gauge', 'Background jobs being scored', stats['running'])
+    ]
+
+metrics.registry.add_collector(collect_job_metrics)
+
+def cache_stats():
+    """Counters for the result cache and, when enabled, the result store"""
+    stats = dict(result_cache.stats(), enabled=True) if result_cache is not None else {'enabled': False}
+    if result_store is not None:
+        stats['store'] = result_store.stats()
+    return stats
+
+# Sampled request tracing, off unless enabled in the config or at /debug/profiling
+profiler = None
+
+def configure_profiling():
+    """(Re)create the request profiler from the app config"""
+    global profiler
+    
+    profiler = Profiler(
+        sample_rate=float(app.config['PROFILING_SAMPLE_RATE']),
+        slow_ms=float(app.config['PROFILING_SLOW_MS']),
+        report_path=app.config['PROFILING_REPORT_PATH'],
+        duration=float(app.config['PROFILING_DURATION'])
+    )
+    if app.config['PROFILING_ENABLED']:
+        profiler.enable()
+    
+    return profiler
+
+configure_profiling()
+
+def traced_timer(timer, path, route, input_bytes):
+    """
+    Wrap a scoring request's stage timer so its stages are also traced, when
+    the profiler samples the request
+    Returns: the timer to use for the request
+    """
+    if path not in ADMISSION_PATHS:
+        return timer
+    
+    trace = profiler.start(route, input_bytes)
+    if trace is None:
+        return timer
+    return TracedTimer(timer, trace, profiler)
+
+def profiling_control(method, token, data=None):
+    """
+    Profiler status and slow-request reports (GET), or switch profiling on or
+    off (POST with {"enabled": bool, "sample_rate": float, "duration": seconds})
+    Returns: (response body, HTTP status)
+    """
+    expected = app.config['PROFILING_TOKEN']
+    if not expected:
+        return {'error': 'Not found'}, 404
+    if not token or not hmac.compare_digest(token.encode('utf-8'), expected.encode('utf-8')):
+        return {'error': 'Invalid or missing X-Profiling-Token header'}, 403
+    
+    if method == 'GET':
+        return dict(profiler.stats(), reports=list(profiler.reports)), 200
+    
+    if not isinstance(data, dict) or not isinstance(data.get('enabled'), bool):
+        return {'error': 'Missing enabled field in request body'}, 400
+    
+    if not data['enabled']:
+        profiler.disable()
+        return profiler.stats(), 200
+    
+    sample_rate = data.get('sample_rate', profiler.sample_rate)
+    if isinstance(sample_rate, bool) or not isinstance(sample_rate, (int, float)) or not 0 < sample_rate <= 1:
+        return {'error': 'sample_rate must be a number between 0 and 1'}, 400
+    
+    duration = data.get('duration', profiler.duration or MAX_PROFILING_DURATION)
+    if (isinstance(duration, bool) or not isinstance(duration, (int, float))
+            or not 0 < duration <= MAX_PROFILING_DURATION):
+        return {'error': f'duration must be between 1 and {MAX_PROFILING_DURATION} seconds'}, 400
+    
+    profiler.enable(float(sample_rate), float(duration))
+    return profiler.stats(), 200
+
+@app.before_request
+def start_request_timer():
+    """Start timing the request stages (parse, validate, score, serialize), tracing sampled requests"""
+    if request.path == '/metrics':
+        g.stage_timer = NullTimer()
+        return
+    
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    timer = metrics.timer(route) if app.config['METRICS_ENABLED'] else NullTimer()
+    g.stage_timer = traced_timer(timer, request.path, route, request.content_length)
+    if isinstance(g.stage_timer, TracedTimer):
+        g.stage_timer.trace.enter()
+
+@app.after_request
+def record_request_metrics(response):
+    g.get('stage_timer', NullTimer()).finish(response.status_code)
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Compress text responses for clients that accept brotli or gzip"""
+    if response.direct_passthrough or response.is_streamed or not is_compressible(response.mimetype):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    encoding = compressor.encoding_for(
+        request.headers.get('Accept-Encoding', ''),
+        response.status_code,
+        response.mimetype,
+        response.headers.get('Content-Encoding'),
+        len(body)
+    )
+    if encoding is None:
+        return response
+    
+    etag = response.headers.get('ETag')
+    response.set_data(compressor.compress(body, encoding, etag))
+    response.headers['Content-Encoding'] = encoding
+    if etag:
+        response.headers['ETag'] = weak_etag(etag)
+    return response
+
+# Admission control (None when disabled)
+rate_limiter = None
+concurrency_limiter = None
+known_api_keys = frozenset()  # from API_KEYS
+
+def configure_admission_control():
+    """(Re)create the rate limiter and concurrency limiter from the app config"""
+    global rate_limiter, concurrency_limiter, known_api_keys
+    
+    known_api_keys = frozenset(key.strip() for key in app.config['API_KEYS'].split(',') if key.strip())
+    
+    rate_limiter = None
+    if app.config['RATE_LIMIT_ENABLED']:
+        if app.config['RATE_LIMIT_REDIS_URL']:
+            backend = RedisBackend.from_url(app.config['RATE_LIMIT_REDIS_URL'])
+        else:
+            backend = MemoryBackend()
+        rate_limiter = RateLimiter(
+            rate=float(app.config['RATE_LIMIT_PER_SECOND']),
+            burst=int(app.config['RATE_LIMIT_BURST']),
+            backend=backend
+        )
+    
+    max_concurrent = app.config['MAX_CONCURRENT_REQUESTS']
+    concurrency_limiter = ConcurrencyLimiter(max_concurrent) if max_concurrent else None
+    
+    return rate_limiter, concurrency_limiter
+
+configure_admission_control()
+
+def request_client(api_key, remote_addr):
+    """Identity a request is limited under: a configured API key, or the client address"""
+    return client_key(api_key, remote_addr, known_api_keys)
+
+def admit_request(path, api_key, remote_addr):
+    """
+    Admission control for one request, before its body is read or scored
+    Returns: (rejection as (body, status) or None, headers to add, concurrency
+    limiter holding a slot for this request or None)
+    """
+    headers = {}
+    if path not in ADMISSION_PATHS:
+        return None, headers, None
+    
+    if rate_limiter is not None:
+        allowed, headers = rate_limiter.check(request_client(api_key, remote_addr))
+        if not allowed:
+            return ({'error': 'Rate limit exceeded, please retry later'}, 429), headers, None
+    
+    limiter = concurrency_limiter
+    if limiter is not None:
+        if not limiter.acquire():
+            return ({'error': 'Server is busy, please retry shortly'}, 503), dict(headers, **{'Retry-After': '1'}), None
+        return None, headers, limiter
+    
+    return None, headers, None
+
+@app.before_request
+def admission_control():
+    """Reject over-limit clients (429) and excess concurrent requests (503) up front"""
+    rejection, g.admission_headers, g.admission_slot = admit_request(
+        request.path,
+        request.headers.get(app.config['RATE_LIMIT_KEY_HEADER']),
+        request.remote_addr
+    )
+    if rejection is not None:
+        body, status = rejection
+        return jsonify(body), status
+
+@app.after_request
+def add_admission_headers(response):
+    response.headers.extend(g.get('admission_headers', {}))
+    return response
+
+@app.teardown_request
+def release_admission_slot(error=None):
+    limiter = g.pop('admission_slot', None)
+    if limiter is not None:
+        limiter.release()
+
+@app.teardown_request
+def end_request_trace(error=None):
+    timer = g.get('stage_timer')
+    if isinstance(timer, TracedTimer):
+        timer.trace.exit()
+
+def collect_admission_metrics():
+    """Expose requests rejected by admission control"""
+    return [
+        ('sentiment_rate_limited_total', 'counter', 'Requests rejected by the per-client rate limit',
+         rate_limiter.limited if rate_limiter is not None else 0),
+        ('sentiment_shed_total', 'counter', 'Requests shed by the concurrency limit',
+         concurrency_limiter.shed if concurrency_limiter is not None else 0)
+    ]
+
+metrics.registry.add_collector(collect_admission_metrics)
+
+def collect_engine_metrics():
+    """Expose cascade counters (texts scored in this process, not in pool workers)"""
+    cascade = engines['cascade']
+    return [
+        ('sentiment_cascade_answered_total', 'counter', 'Texts answered by the cascade fast engine', cascade.answered),
+        ('sentiment_cascade_escalated_total', 'counter', 'Texts escalated to the cascade slow engine', cascade.escalated)
+    ]
+
+metrics.registry.add_collector(collect_engine_metrics)
+
+def busy_response(error):
+    """503 response telling the client to back off and retry"""
+    return jsonify({'error': str(error)}), 503, {'Retry-After': '1'}
+
 @app.route('/')
 def index():
-    """Render the main page"""
-    return render_template('index.html')
+    """Serve the main page from the cached shell, answering conditional GETs with 304"""
+    body, etag = page_renderer.empty_page()
+    response = Response(body, mimetype='text/html')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = PAGE_CACHE_CONTROL
+    return response.make_conditional(request)
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    """Fingerprinted CSS/JS with long-lived cache headers"""
+    found = assets.lookup(filename)
+    if found is None:
+        return render_template('404.html'), 404
+    
+    body, content_type, cache_control, etag = found
+    response = Response(body, content_type=content_type, headers={'Cache-Control': cache_control})
+    response.set_etag(etag)
+    return response.make_conditional(request)
 
 @app.route('/analyze', methods=['POST'])
 def analyze():
     """Analyze sentiment for the submitted text"""
+    # Decide the response format once, from the request's Content-Type
+    is_json = request.is_json
+    
     try:
         # Get text from form or JSON
-        if request.is_json:
-            data = request.get_json()
-            text = data.get('text', '').strip()
+        if is_json:
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict):
+                return jsonify({'error': 'Invalid JSON in request body'}), 400
+            text = data.get('text', '')
+            text = text.strip() if isinstance(text, str) else ''
         else:
             text = request.form.get('text', '').strip()
+        g.stage_timer.mark('parse')
         
         # Validate input
         if not text:
             return jsonify({'error': 'Please enter some text to analyze'}), 400
         
-        if len(text) > 5000:
-            return jsonify({'error': 'Text is too long. Please limit to 5000 characters.'}), 400
+        error = validate_text(text)
+        if error:
+            return jsonify({'error': error}), 400
+        metrics.observe_text_length(len(text))
+        g.stage_timer.mark('validate')
         
         # Analyze sentiment
         result = analyze_sentiment(text)
+        g.stage_timer.mark('score')
         
         # Return JSON response for AJAX requests
-        if request.is_json or request.headers.get('Content-Type') == 'application/json':
+        if is_json:
             return jsonify(result)
         
         # Render template with results for form submissions
-        return render_template('index.html', result=result)
+        return page_renderer.render(result=result)
+    
+    except PoolBusyError as e:
+        if is_json:
+            return busy_response(e)
+        
+        return page_renderer.render(error=str(e)), 503, {'Retry-After': '1'}
     
     except Exception as e:
         logger.error(f"Error in analyze route: {str(e)}")
         error_msg = f"An error occurred: {str(e)}"
         
-        if request.is_json:
+        if is_json:
             return jsonify({'error': error_msg}), 500
         
-        return render_template('index.html', error=error_msg)
+        return page_renderer.render(error=error_msg)
 
 @app.route('/api/analyze', methods=['POST'])
 def api_analyze():
     """API endpoint for sentiment analysis"""
     try:
-        data = request.get_json()
+        engine, error = requested_engine(request.args.get('engine'))
+        if error:
+            return jsonify({'error': error}), 400
+        
+        data = request.get_json(silent=True)
         
-        if not data or 'text' not in data:
+        if not isinstance(data, dict) or 'text' not in data:
             return jsonify({'error': 'Missing text field in request body'}), 400
         
-        text = data['text'].strip()
+        text = data['text'].strip() if isinstance(data['text'], str) else ''
+        g.stage_timer.mark('parse')
         
-        if not text:
+        error = validate_text(text)
+        if error:
+            return jsonify({'error': error}), 400
+        metrics.observe_text_length(len(text))
+        g.stage_timer.mark('validate')
+        
+        result = analyze_sentiment(text, engine)
+        g.stage_timer.mark('score')
+        return jsonify(result)
+    
+    except PoolBusyError as e:
+        return busy_response(e)
+    
+    except Exception as e:
+        logger.error(f"Error in API analyze: {str(e)}")
+        return jsonify({'error': f"An error occurred: {str(e)}"}), 500
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def api_analyze_batch():
+    """API endpoint for analyzing many texts in a single request"""
+    try:
+        engine, error = requested_engine(request.args.get('engine'))
+        if error:
+            return jsonify({'error': error}), 400
+        
+        texts, error = parse_batch_body(read_body(MAX_BATCH_BYTES), request.mimetype)
+        g.stage_timer.mark('parse')
+        if error:
+            return jsonify({'error': error}), 400
+        
+        error = validate_batch(texts)
+        if error:
+            return jsonify({'error': error}), 400
+        for text in texts:
+            if isinstance(text, str):
+                metrics.observe_text_length(len(text))
+        g.stage_timer.mark('validate')
+        
+        results = analyze_batch(texts, engine)
+        g.stage_timer.mark('score')
+        return jsonify(batch_response(results))
+    
+    except BodyTooLarge:
+        return jsonify({'error': f'Request body is too large. Please limit to {MAX_BATCH_BYTES} bytes.'}), 413
+    
+    except PoolBusyError as e:
+        return busy_response(e)
+    
+    except Exception as e:
+        logger.error(f"Error in API batch analyze: {str(e)}")
+        return jsonify({'error': f"An error occurred: {str(e)}"}), 500
+
+@app.route('/api/analyze/document', methods=['POST'])
+def api_analyze_document():
+    """
+    API endpoint for long documents, scored sentence by sentence
+    A text/plain body is streamed through the sentence splitter as it is
+    read; a JSON body must carry the document in its "text" field.
+    """
+    try:
+        engine, error = requested_engine(request.args.get('engine'))
+        if error:
+            return jsonify({'error': error}), 400
+        
+        if request.mimetype == 'text/plain':
+            chunks = iter_decoded(iter_body(MAX_DOCUMENT_BYTES))
+        else:
+            body = read_body(MAX_DOCUMENT_BYTES)
+            try:
+                data = fast_json.loads(body) if is_json_mimetype(request.mimetype) else None
+            except ValueError:
+                data = None
+            if not isinstance(data, dict) or not isinstance(data.get('text'), str):
+                return jsonify({'error': 'Missing text field in request body'}), 400
+            chunks = [data['text']]
+        g.stage_timer.mark('parse')
+        
+        result = analyze_document(
+            chunks,
+            score_batch=lambda texts: analyze_texts(texts, engine),
+            classify=classify_polarity,
+            max_details=MAX_SENTENCE_DETAILS,
+            max_sentence_length=MAX_TEXT_LENGTH
+        )
+        g.stage_timer.mark('score')
+        
+        if result['sentence_count'] == 0:
             return jsonify({'error': 'Text cannot be empty'}), 400
         
-        if len(text) > 5000:
-            return jsonify({'error': 'Text is too long. Please limit to 5000 characters.'}), 400
+        metrics.observe_text_length(result['characters'])
+        return jsonify(result)
+    
+    except BodyTooLarge:
+        return jsonify({'error': f'Document is too large. Please limit to {MAX_DOCUMENT_BYTES} bytes.'}), 413
+    
+    except PoolBusyError as e:
+        return busy_response(e)
+    
+    except Exception as e:
+        logger.error(f"Error in API document analyze: {str(e)}")
+        return jsonify({'error': f"An error occurred: {str(e)}"}), 500
+
+@app.route('/api/analyze/aspects', methods=['POST'])
+def api_analyze_aspects():
+    """API endpoint for overall and per-aspect sentiment of one text"""
+    try:
+        text, aspects, window, error = parse_aspect_request(request.get_json(silent=True))
+        g.stage_timer.mark('parse')
+        if error:
+            return jsonify({'error': error}), 400
+        metrics.observe_text_length(len(text))
         
-        result = analyze_sentiment(text)
+        result = analyze_aspects(text, aspects, window)
+        g.stage_timer.mark('score')
         return jsonify(result)
     
     except Exception as e:
-        logger.error(f"Error in API analyze: {str(e)}")
+        logger.error(f"Error in API aspect analyze: {str(e)}")
+        return jsonify({'error': f"An error occurred: {str(e)}"}), 500
+
+@app.route('/api/jobs', methods=['POST'])
+def api_submit_job():
+    """Queue a large corpus for background scoring; answers 202 with the job id"""
+    try:
+        body, status, headers = submit_job(
+            read_body(MAX_JOB_BYTES),
+            request.mimetype,
+            request.args.get('engine', ''),
+            request.args.get('webhook', ''),
+            request.headers.get(app.config['RATE_LIMIT_KEY_HEADER']),
+            request.remote_addr
+        )
+        return jsonify(body), status, headers
+    
+    except BodyTooLarge:
+        return jsonify({'error': f'Request body is too large. Please limit to {MAX_JOB_BYTES} bytes.'}), 413
+    
+    except Exception as e:
+        logger.error(f"Error submitting job: {str(e)}")
         return jsonify({'error': f"An error occurred: {str(e)}"}), 500
 
+@app.route('/api/jobs/<job_id>')
+def api_job_status(job_id):
+    """Poll a job's status and progress"""
+    body, status = job_status(job_id)
+    return jsonify(body), status
+
+@app.route('/api/jobs/<job_id>/results')
+def api_job_results(job_id):
+    """Page through a job's results with ?offset= and ?limit="""
+    body, status = job_results(job_id, request.args.get('offset'), request.args.get('limit'))
+    return jsonify(body), status
+
+@app.route('/api/cache/stats')
+def api_cache_stats():
+    """Hit/miss/eviction counters for the result cache and result store"""
+    return jsonify(cache_stats())
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/debug/profiling', methods=['GET', 'POST'])
+def debug_profiling():
+    """Profiler status and slow-request reports; POST switches sampling on or off"""
+    body, status = profiling_control(
+        request.method,
+        request.headers.get('X-Profiling-Token'),
+        request.get_json(silent=True) if request.method == 'POST' else None
+    )
+    return jsonify(body), status
+
+@app.route('/healthz')
+def healthz():
+    """Liveness probe: the process is up and answering requests"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz')
+def readyz():
+    """Readiness probe: 200 once the engine is loaded and warmed up, 503 before"""
+    body, status = readiness()
+    headers = {'Retry-After': '1'} if status != 200 else {}
+    return jsonify(body), status, headers
+
 @app.errorhandler(404)
 def not_found(error):
     return render_template('404.html'), 404
@@ -118,5 +1260,15 @@ def not_found(error):
 def internal_error(error):
     return render_template('500.html'), 500
 
+# Load the engine and start the scoring pool (if enabled) once every route
+# and helper is defined. Processes started by multiprocessing (pool workers
+# under the spawn start method) may import this module too, but never start
+# pools or job workers of their own.
+if not is_worker_process():
+    if app.config['WARM_UP_IN_BACKGROUND']:
+        start_warm_up()
+    else:
+        warm_up()
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,487 @@
+"""
+ASGI serving mode for the Sentiment Analysis Web Application
+
+Exposes the same /analyze, /api/analyze, /api/analyze/batch and
+/api/analyze/document contracts
+as app.py, but as a plain ASGI application: request bodies are read,
+parsed and validated on the event loop, and CPU-bound scoring is handed
+to an executor so slow requests never block other connections.
+
+Run it with any ASGI server, for example:
+    pip install uvicorn
+    uvicorn asgi_app:application --host 0.0.0.0 --port 5000 --workers 4
+"""
+
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+# Add the current directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app as sentiment_app
+import fast_json
+import profiling
+from app import (app, assets, compressor, page_renderer, logger, metrics, analyze_sentiment, analyze_batch,
+                 analyze_texts, classify_polarity, validate_text, validate_batch, parse_batch_body,
+                 batch_response, is_json_mimetype, requested_engine, submit_job, job_status, job_results,
+                 parse_aspect_request,
+                 MAX_BATCH_BYTES, MAX_DOCUMENT_BYTES, MAX_JOB_BYTES,
+                 MAX_SENTENCE_DETAILS, MAX_TEXT_LENGTH)
+from aspects import analyze_aspects
+from compression import is_compressible, weak_etag
+from long_document import analyze_document
+from metrics import NullTimer
+from page_cache import PAGE_CACHE_CONTROL
+from profiling import TracedTimer
+from scoring_pool import PoolBusyError, available_cores
+
+app.config.setdefault('ASGI_SCORING_THREADS', 0)  # 0 = Python's default thread count
+
+# Scoring runs here so the event loop only does I/O, parsing and validation.
+# With the scoring pool enabled these threads just wait on worker processes.
+executor = ThreadPoolExecutor(
+    max_workers=app.config['ASGI_SCORING_THREADS'] or None,
+    thread_name_prefix='scoring'
+)
+
+class RequestTooLarge(Exception):
+    """Raised when a request body exceeds MAX_BATCH_BYTES"""
+
+async def read_body(receive, limit=MAX_BATCH_BYTES):
+    """Read the whole request body, giving up as soon as it exceeds limit"""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > limit:
+            raise RequestTooLarge(f'Request body is too large. Please limit to {limit} bytes.')
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            break
+    return b''.join(chunks)
+
+def get_header(scope, name):
+    """Return a request header value (name in lowercase bytes), or ''"""
+    for header, value in scope['headers']:
+        if header == name:
+            return value.decode('latin-1')
+    return ''
+
+def get_query_param(scope, name):
+    """Return the first value of a query string parameter, or ''"""
+    values = parse_qs(scope.get('query_string', b'').decode('latin-1')).get(name)
+    return values[0] if values else ''
+
+def get_mimetype(scope):
+    """Return the request's Content-Type without parameters"""
+    return get_header(scope, b'content-type').split(';', 1)[0].strip().lower()
+
+async def send_response(send, status, body, content_type, headers=()):
+    """Send a complete HTTP response"""
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', content_type.encode('latin-1')),
+            (b'content-length', str(len(body)).encode('latin-1')),
+        ] + [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+async def send_json(send, data, status=200, headers=()):
+    body = fast_json.dumps(data)
+    await send_response(send, status, body, 'application/json', headers)
+
+async def send_html(send, template, status=200, headers=(), **context):
+    body = app.jinja_env.get_template(template).render(**context).encode('utf-8')
+    await send_response(send, status, body, 'text/html; charset=utf-8', headers)
+
+def compress_response(start, body, accept_encoding):
+    """
+    Compress a complete response for the client's Accept-Encoding
+    Returns: (start message, body), updated if the body was compressed
+    """
+    headers = dict(start['headers'])
+    content_type = headers.get(b'content-type', b'').decode('latin-1')
+    if not is_compressible(content_type):
+        return start, body
+
+    encoding = compressor.encoding_for(accept_encoding, start['status'], content_type.split(';', 1)[0],
+                                       headers.get(b'content-encoding'), len(body))
+    headers[b'vary'] = b'Accept-Encoding'
+    if encoding is not None:
+        etag = headers.get(b'etag', b'').decode('latin-1') or None
+        body = compressor.compress(body, encoding, etag)
+        headers[b'content-encoding'] = encoding.encode('latin-1')
+        headers[b'content-length'] = str(len(body)).encode('latin-1')
+        if etag:
+            headers[b'etag'] = weak_etag(etag).encode('latin-1')
+    return dict(start, headers=list(headers.items())), body
+
+async def run_scoring(func, *args):
+    """Run a CPU-bound scoring call on the executor (traced there too when the request is sampled)"""
+    loop = asyncio.get_running_loop()
+    trace = profiling.current_trace()
+    if trace is not None:
+        return await loop.run_in_executor(executor, trace.call, func, *args)
+    return await loop.run_in_executor(executor, func, *args)
+
+def parse_json(body):
+    """Decode a JSON body, returning None if it is not valid JSON"""
+    try:
+        return fast_json.loads(body)
+    except ValueError:
+        return None
+
+async def analyze(scope, receive, send):
+    """Analyze sentiment for the submitted text (form or JSON)"""
+    timer = scope['stage_timer']
+    mimetype = get_mimetype(scope)
+    is_json = is_json_mimetype(mimetype)
+    body = await read_body(receive)
+
+    if is_json:
+        data = parse_json(body)
+        if not isinstance(data, dict):
+            return await send_json(send, {'error': 'Invalid JSON in request body'}, 400)
+        text = data.get('text', '')
+        text = text.strip() if isinstance(text, str) else ''
+    else:
+        form = parse_qs(body.decode('utf-8', 'replace'))
+        text = form.get('text', [''])[0].strip()
+    timer.mark('parse')
+
+    if not text:
+        return await send_json(send, {'error': 'Please enter some text to analyze'}, 400)
+
+    error = validate_text(text)
+    if error:
+        return await send_json(send, {'error': error}, 400)
+    metrics.observe_text_length(len(text))
+    timer.mark('validate')
+
+    if is_json:
+        result = await run_scoring(analyze_sentiment, text)
+        timer.mark('score')
+        return await send_json(send, result)
+
+    # Form submissions get the page back, with the error on it, like the Flask route
+    try:
+        result = await run_scoring(analyze_sentiment, text)
+    except PoolBusyError as e:
+        page = page_renderer.render(error=str(e))
+        return await send_response(send, 503, page.encode('utf-8'), 'text/html; charset=utf-8', [('Retry-After', '1')])
+    except Exception as e:
+        logger.error(f"Error in analyze route: {str(e)}")
+        page = page_renderer.render(error=f"An error occurred: {str(e)}")
+        return await send_response(send, 200, page.encode('utf-8'), 'text/html; charset=utf-8')
+    timer.mark('score')
+
+    await send_response(send, 200, page_renderer.render(result=result).encode('utf-8'), 'text/html; charset=utf-8')
+
+async def api_analyze(scope, receive, send):
+    """API endpoint for sentiment analysis"""
+    timer = scope['stage_timer']
+    engine, error = requested_engine(get_query_param(scope, 'engine'))
+    if error:
+        return await send_json(send, {'error': error}, 400)
+    data = parse_json(await read_body(receive))
+
+    if not isinstance(data, dict) or 'text' not in data:
+        return await send_json(send, {'error': 'Missing text field in request body'}, 400)
+
+    text = data['text'].strip() if isinstance(data['text'], str) else ''
+    timer.mark('parse')
+
+    error = validate_text(text)
+    if error:
+        return await send_json(send, {'error': error}, 400)
+    metrics.observe_text_length(len(text))
+    timer.mark('validate')
+
+    result = await run_scoring(analyze_sentiment, text, engine)
+    timer.mark('score')
+    await send_json(send, result)
+
+async def api_analyze_batch(scope, receive, send):
+    """API endpoint for analyzing many texts in a single request"""
+    timer = scope['stage_timer']
+    engine, error = requested_engine(get_query_param(scope, 'engine'))
+    if error:
+        return await send_json(send, {'error': error}, 400)
+    body = await read_body(receive)
+
+    texts, error = parse_batch_body(body, get_mimetype(scope))
+    timer.mark('parse')
+    if error:
+        return await send_json(send, {'error': error}, 400)
+
+    error = validate_batch(texts)
+    if error:
+        return await send_json(send, {'error': error}, 400)
+    for text in texts:
+        if isinstance(text, str):
+            metrics.observe_text_length(len(text))
+    timer.mark('validate')
+
+    results = await run_scoring(analyze_batch, texts, engine)
+    timer.mark('score')
+    await send_json(send, batch_response(results))
+
+def score_document(text, engine=None):
+    """Score a long document sentence by sentence (runs on the executor)"""
+    return analyze_document(
+        [text],
+        score_batch=lambda texts: analyze_texts(texts, engine),
+        classify=classify_polarity,
+        max_details=MAX_SENTENCE_DETAILS,
+        max_sentence_length=MAX_TEXT_LENGTH
+    )
+
+async def api_analyze_document(scope, receive, send):
+    """API endpoint for long documents, scored sentence by sentence"""
+    timer = scope['stage_timer']
+    engine, error = requested_engine(get_query_param(scope, 'engine'))
+    if error:
+        return await send_json(send, {'error': error}, 400)
+    body = await read_body(receive, MAX_DOCUMENT_BYTES)
+
+    if get_mimetype(scope) == 'text/plain':
+        text = body.decode('utf-8', 'replace')
+    else:
+        data = parse_json(body)
+        if not isinstance(data, dict) or not isinstance(data.get('text'), str):
+            return await send_json(send, {'error': 'Missing text field in request body'}, 400)
+        text = data['text']
+    timer.mark('parse')
+
+    result = await run_scoring(score_document, text, engine)
+    timer.mark('score')
+
+    if result['sentence_count'] == 0:
+        return await send_json(send, {'error': 'Text cannot be empty'}, 400)
+
+    metrics.observe_text_length(result['characters'])
+    await send_json(send, result)
+
+async def api_analyze_aspects(scope, receive, send):
+    """API endpoint for overall and per-aspect sentiment of one text"""
+    timer = scope['stage_timer']
+    text, aspects, window, error = parse_aspect_request(parse_json(await read_body(receive)))
+    timer.mark('parse')
+    if error:
+        return await send_json(send, {'error': error}, 400)
+    metrics.observe_text_length(len(text))
+
+    result = await run_scoring(analyze_aspects, text, aspects, window)
+    timer.mark('score')
+    await send_json(send, result)
+
+async def api_submit_job(scope, receive, send):
+    """Queue a large corpus for background scoring; answers 202 with the job id"""
+    body = await read_body(receive, MAX_JOB_BYTES)
+    client = scope.get('client') or (None, None)
+    result, status, headers = await run_scoring(
+        submit_job,
+        body,
+        get_mimetype(scope),
+        get_query_param(scope, 'engine'),
+        get_query_param(scope, 'webhook'),
+        get_header(scope, app.config['RATE_LIMIT_KEY_HEADER'].lower().encode('latin-1')),
+        client[0]
+    )
+    await send_json(send, result, status, list(headers.items()))
+
+async def api_job(scope, receive, send):
+    """Job status at /api/jobs/<id>, paged results at /api/jobs/<id>/results"""
+    job_id, _, rest = scope['path'][len(JOBS_PREFIX):].partition('/')
+    if rest == 'results':
+        body, status = job_results(job_id, get_query_param(scope, 'offset'), get_query_param(scope, 'limit'))
+    elif not rest:
+        body, status = job_status(job_id)
+    else:
+        return await send_html(send, '404.html', 404)
+    await send_json(send, body, status)
+
+async def index(scope, receive, send):
+    """Serve the main page from the cached shell, answering conditional GETs with 304"""
+    body, etag = page_renderer.empty_page()
+    headers = [('ETag', f'"{etag}"'), ('Cache-Control', PAGE_CACHE_CONTROL)]
+    if_none_match = get_header(scope, b'if-none-match')
+    if if_none_match and (if_none_match.strip() == '*' or f'"{etag}"' in if_none_match):
+        return await send_response(send, 304, b'', 'text/html; charset=utf-8', headers)
+    await send_response(send, 200, body, 'text/html; charset=utf-8', headers)
+
+async def asset(scope, receive, send):
+    """Fingerprinted CSS/JS with long-lived cache headers"""
+    found = assets.lookup(scope['path'][len(assets.url_prefix):])
+    if found is None:
+        return await send_html(send, '404.html', 404)
+
+    body, content_type, cache_control, etag = found
+    await send_response(send, 200, body, content_type, [('Cache-Control', cache_control), ('ETag', f'"{etag}"')])
+
+async def api_cache_stats(scope, receive, send):
+    """Hit/miss/eviction counters for the result cache and result store"""
+    await send_json(send, sentiment_app.cache_stats())
+
+async def debug_profiling(scope, receive, send):
+    """Profiler status and slow-request reports; POST switches sampling on or off"""
+    data = parse_json(await read_body(receive)) if scope['method'] == 'POST' else None
+    body, status = sentiment_app.profiling_control(scope['method'], get_header(scope, b'x-profiling-token'), data)
+    await send_json(send, body, status)
+
+async def healthz(scope, receive, send):
+    """Liveness probe: the process is up and answering requests"""
+    await send_json(send, {'status': 'ok'})
+
+async def readyz(scope, receive, send):
+    """Readiness probe: 200 once the engine is loaded and warmed up, 503 before"""
+    body, status = sentiment_app.readiness()
+    headers = [('Retry-After', '1')] if status != 200 else []
+    await send_json(send, body, status, headers)
+
+async def metrics_endpoint(scope, receive, send):
+    """Prometheus scrape endpoint"""
+    await send_response(send, 200, metrics.render().encode('utf-8'), 'text/plain; version=0.0.4')
+
+JOBS_PREFIX = '/api/jobs/'
+
+ROUTES = {
+    ('GET', '/'): index,
+    ('POST', '/analyze'): analyze,
+    ('POST', '/api/analyze'): api_analyze,
+    ('POST', '/api/analyze/batch'): api_analyze_batch,
+    ('POST', '/api/analyze/document'): api_analyze_document,
+    ('POST', '/api/analyze/aspects'): api_analyze_aspects,
+    ('POST', '/api/jobs'): api_submit_job,
+    ('GET', '/api/cache/stats'): api_cache_stats,
+    ('GET', '/metrics'): metrics_endpoint,
+    ('GET', '/debug/profiling'): debug_profiling,
+    ('POST', '/debug/profiling'): debug_profiling,
+    ('GET', '/healthz'): healthz,
+    ('GET', '/readyz'): readyz,
+}
+
+async def lifespan(receive, send):
+    """Finish warming up before accepting traffic, release threads on shutdown"""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            if await run_scoring(sentiment_app.warm_up):
+                await send({'type': 'lifespan.startup.complete'})
+            else:
+                await send({'type': 'lifespan.startup.failed',
+                            'message': sentiment_app.warm_up_status['error']})
+                return
+        elif message['type'] == 'lifespan.shutdown':
+            executor.shutdown(wait=False)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+async def application(scope, receive, send):
+    """ASGI entry point"""
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+
+    if scope['type'] != 'http':
+        return
+
+    path = scope['path']
+    known_path = any(route_path == path for _, route_path in ROUTES)
+
+    if known_path:
+        route = path
+    elif path.startswith(assets.url_prefix):
+        route = '/assets/<path:filename>'
+    elif path.startswith(JOBS_PREFIX):
+        route = '/api/jobs/<job_id>'
+    else:
+        route = 'unmatched'
+
+    if path == '/metrics':
+        timer = NullTimer()
+    else:
+        timer = metrics.timer(route) if app.config['METRICS_ENABLED'] else NullTimer()
+        content_length = get_header(scope, b'content-length')
+        timer = sentiment_app.traced_timer(timer, path, route, int(content_length) if content_length.isdigit() else None)
+        if isinstance(timer, TracedTimer):
+            # Scoring calls carry the trace to the executor threads (see run_scoring)
+            profiling.activate(timer.trace)
+    scope['stage_timer'] = timer
+
+    # Remember the response status for the request metrics, and hold the
+    # start message back until the body is known so it can be compressed
+    status = [500]
+    pending_start = []
+    accept_encoding = get_header(scope, b'accept-encoding')
+
+    # Admission control runs before the body is read or anything is scored
+    client = scope.get('client') or (None, None)
+    rejection, admission_headers, slot = sentiment_app.admit_request(
+        path,
+        get_header(scope, app.config['RATE_LIMIT_KEY_HEADER'].lower().encode('latin-1')),
+        client[0]
+    )
+
+    async def send_and_record(message):
+        if message['type'] == 'http.response.start':
+            status[0] = message['status']
+            headers = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                       for name, value in admission_headers.items()]
+            pending_start.append(dict(message, headers=list(message['headers']) + headers))
+            return
+        if pending_start:
+            start = pending_start.pop()
+            if message['type'] == 'http.response.body' and not message.get('more_body', False):
+                start, body = compress_response(start, message.get('body', b''), accept_encoding)
+                message = dict(message, body=body)
+            await send(start)
+        await send(message)
+
+    try:
+        if rejection is not None:
+            body, rejection_status = rejection
+            return await send_json(send_and_record, body, rejection_status)
+
+        handler = ROUTES.get((scope['method'], path))
+        if handler is None and scope['method'] == 'GET' and path.startswith(assets.url_prefix):
+            handler = asset
+        if handler is None and scope['method'] == 'GET' and path.startswith(JOBS_PREFIX):
+            handler = api_job
+        if handler is None:
+            if known_path:
+                return await send_json(send_and_record, {'error': 'Method not allowed'}, 405)
+            return await send_html(send_and_record, '404.html', 404)
+
+        await handler(scope, receive, send_and_record)
+    except RequestTooLarge as e:
+        await send_json(send_and_record, {'error': str(e)}, 413)
+    except PoolBusyError as e:
+        await send_json(send_and_record, {'error': str(e)}, 503, [('Retry-After', '1')])
+    except Exception as e:
+        logger.error(f"Error in ASGI handler: {str(e)}")
+        await send_json(send_and_record, {'error': f"An error occurred: {str(e)}"}, 500)
+    finally:
+        if slot is not None:
+            slot.release()
+        timer.finish(status[0])
+
+if __name__ == '__main__':
+    try:
+        import uvicorn
+    except ImportError:
+        print("❌ uvicorn is not installed. Please install it with: pip install uvicorn")
+        sys.exit(1)
+
+    # Same production profile as gunicorn.conf.py: a worker per core and
+    # keep-alive longer than the usual load balancer idle timeout
+    uvicorn.run('asgi_app:application', host='0.0.0.0', port=5000, workers=available_cores(),
+                timeout_keep_alive=75, backlog=2048)
@@ -0,0 +1,145 @@
+"""
+Aspect-level sentiment for product reviews
+
+The text is tokenized once with the lexicon tokenizer. Aspect terms
+("battery", "battery life", "customer service") are found in that token
+stream by an Aho-Corasick automaton built over tokens, so every term is
+matched in a single pass, whole words only, whatever the number of
+terms. Each mention is scored from a window of tokens around it, clipped
+at sentence and clause boundaries ("but", "however"), with the same
+lexicon arithmetic as the whole text. Nothing is tokenized twice.
+"""
+
+from collections import deque
+from functools import lru_cache
+
+import lexicon_scorer
+from engines import classify
+
+# Aspects looked for when a request does not name its own
+DEFAULT_ASPECTS = (
+    'battery', 'battery life', 'price', 'value', 'quality', 'screen', 'display', 'camera',
+    'sound', 'design', 'size', 'performance', 'software', 'app', 'delivery', 'shipping',
+    'packaging', 'customer service', 'support'
+)
+
+# Tokens around a mention that are scored with it
+DEFAULT_WINDOW = 5
+
+# Context windows stop at these tokens
+CLAUSE_BREAKS = frozenset(('.', '!', '?', ';', 'but', 'however', 'although', 'though', 'whereas'))
+
+class AspectMatcher:
+    """Aho-Corasick automaton over tokens, matching many aspect terms in one pass"""
+
+    def __init__(self, aspects):
+        self.aspects = tuple(aspects)
+        # Trie nodes: outgoing edges, failure link, (aspect, length in tokens) ending here
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+
+        for aspect in self.aspects:
+            tokens = lexicon_scorer.tokenize(aspect)
+            if not tokens:
+                continue
+            node = 0
+            for token in tokens:
+                next_node = self._goto[node].get(token)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][token] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                node = next_node
+            self._output[node] += ((aspect, len(tokens)),)
+
+        # Breadth-first failure links: the longest proper suffix that is also in the trie
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self._goto[node].items():
+                fallback = self._fail[node]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(token, 0)
+                self._output[child] += self._output[self._fail[child]]
+                queue.append(child)
+
+    def find_all(self, tokens):
+        """Every (start, end, aspect) match in tokens, overlapping ones included"""
+        goto, fail, output = self._goto, self._fail, self._output
+        matches = []
+        node = 0
+        for index, token in enumerate(tokens):
+            while node and token not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(token, 0)
+            for aspect, length in output[node]:
+                matches.append((index - length + 1, index + 1, aspect))
+        return matches
+
+    def find(self, tokens):
+        """
+        Non-overlapping matches, preferring the longest ("battery life" over "battery")
+        Returns: list of (start, end, aspect) in text order
+        """
+        matches = sorted(self.find_all(tokens), key=lambda match: (match[0], match[0] - match[1]))
+        chosen = []
+        end = 0
+        for match in matches:
+            if match[0] >= end:
+                chosen.append(match)
+                end = match[1]
+        return chosen
+
+@lru_cache(maxsize=128)
+def get_matcher(aspects):
+    """Compiled matcher for a tuple of aspect terms, reused across requests"""
+    return AspectMatcher(aspects)
+
+def context_window(tokens, start, end, window):
+    """Token range around tokens[start:end], at most window tokens each side, within one clause"""
+    low = start
+    while low > 0 and start - low < window and tokens[low - 1] not in CLAUSE_BREAKS:
+        low -= 1
+    high = end
+    while high < len(tokens) and high - end < window and tokens[high] not in CLAUSE_BREAKS:
+        high += 1
+    return low, high
+
+def sentiment_fields(polarity, subjectivity):
+    """The result fields shared by the text and every aspect"""
+    return {
+        'sentiment': classify(polarity),
+        'polarity': round(polarity, 3),
+        'subjectivity': round(subjectivity, 3)
+    }
+
+def analyze_aspects(text, aspects=DEFAULT_ASPECTS, window=DEFAULT_WINDOW):
+    """
+    Overall and per-aspect sentiment of text from a single tokenization
+    Returns: dict with the overall sentiment and an "aspects" list (in order
+    of first mention), each aspect with its mean polarity over its mentions
+    """
+    tokens = lexicon_scorer.tokenize(text)
+    polarity, subjectivity = lexicon_scorer.score_tokens(tokens)
+
+    found = {}
+    for start, end, aspect in get_matcher(tuple(aspects)).find(tokens):
+        low, high = context_window(tokens, start, end, window)
+        context = tokens[low:high]
+        found.setdefault(aspect, []).append((lexicon_scorer.score_tokens(context), ' '.join(context)))
+
+    results = []
+    for aspect, mentions in found.items():
+        aspect_polarity = sum(score[0] for score, _ in mentions) / len(mentions)
+        aspect_subjectivity = sum(score[1] for score, _ in mentions) / len(mentions)
+        results.append(dict(
+            {'aspect': aspect, 'mentions': len(mentions)},
+            **sentiment_fields(aspect_polarity, aspect_subjectivity),
+            contexts=[context for _, context in mentions]
+        ))
+
+    return dict({'text': text}, **sentiment_fields(polarity, subjectivity), aspects=results)
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Benchmark script for the Sentiment Analysis Web Application
+Compares documents per second through the single-text and batch API routes,
+per-document latency of TextBlob against the precompiled lexicon scorer, the
+per-request CPU cost of the standard json module against the fast JSON codec,
+response sizes and CPU with and without compression, accuracy and
+throughput of each sentiment engine, and (with --pool-scaling) scoring pool throughput as worker processes are added.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+# Add the current directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask.json.provider import DefaultJSONProvider
+from textblob import TextBlob
+
+import fast_json
+from compression import supported_encodings
+
+import lexicon_scorer
+from app import app, compute_sentiment, configure_result_cache, pool_scorer, MAX_BATCH_ITEMS
+from engines import CascadeEngine, calibrate_margin, classify, create_engines
+from labelled_cases import SENTIMENT_TEST_CASES
+from load_test import make_corpus as make_synthetic_corpus
+from scoring_pool import ScoringPool, available_cores
+
+SAMPLE_TEXTS = [
+    "I absolutely love this new product! It's amazing and works perfectly.",
+    "This is terrible! I hate how complicated everything is.",
+    "The meeting is scheduled for tomorrow at 3 PM.",
+    "I'm really disappointed and frustrated with this service.",
+    "What a beautiful day! I'm feeling great and excited about the future.",
+    "Python is a programming language used for web development.",
+    "This product is awful and completely useless.",
+    "The delivery was quick but the packaging was a bit damaged.",
+]
+
+def make_corpus(size, seed=42):
+    """Build a corpus of unique review-like texts"""
+    rng = random.Random(seed)
+    return [f"{rng.choice(SAMPLE_TEXTS)} (review #{i})" for i in range(size)]
+
+def bench_single(client, corpus):
+    """Score every text with one request each, return docs/sec"""
+    start = time.perf_counter()
+    for text in corpus:
+        response = client.post('/api/analyze', json={'text': text})
+        assert response.status_code == 200, response.get_json()
+    return len(corpus) / (time.perf_counter() - start)
+
+def bench_batch(client, corpus, batch_size):
+    """Score the corpus in batches, return docs/sec"""
+    start = time.perf_counter()
+    for i in range(0, len(corpus), batch_size):
+        response = client.post('/api/analyze/batch', json={'texts': corpus[i:i + batch_size]})
+        assert response.status_code == 200, response.get_json()
+    return len(corpus) / (time.perf_counter() - start)
+
+def bench_scorer(score, corpus):
+    """Score the corpus directly, return microseconds per document"""
+    start = time.perf_counter()
+    for text in corpus:
+        score(text)
+    return (time.perf_counter() - start) / len(corpus) * 1e6
+
+def textblob_score(text):
+    """Score text the way app.py used to, with a fresh TextBlob"""
+    sentiment = TextBlob(text).sentiment
+    return sentiment.polarity, sentiment.subjectivity
+
+def bench_codec(loads, dumps, bodies, results):
+    """Decode every request body and encode every result, return CPU microseconds per request"""
+    start = time.process_time()
+    for body, result in zip(bodies, results):
+        loads(body)
+        dumps(result)
+    return (time.process_time() - start) / len(bodies) * 1e6
+
+def bench_route_cpu(client, bodies):
+    """POST every body to /api/analyze, return CPU microseconds per request"""
+    start = time.process_time()
+    for body in bodies:
+        response = client.post('/api/analyze', data=body, content_type='application/json')
+        assert response.status_code == 200, response.get_json()
+    return (time.process_time() - start) / len(bodies) * 1e6
+
+def bench_json(client, corpus):
+    """Print JSON codec and /api/analyze CPU per request, stdlib json against fast_json"""
+    bodies = [json.dumps({'text': text}).encode('utf-8') for text in corpus]
+    results = [compute_sentiment(text) for text in corpus]
+
+    stdlib_us = bench_codec(json.loads, json.dumps, bodies, results)
+    fast_us = bench_codec(fast_json.loads, fast_json.dumps, bodies, results)
+
+    # Same route, served with Flask's default provider and with the fast one
+    fast_provider = app.json
+    app.json = DefaultJSONProvider(app)
+    try:
+        stdlib_route_us = bench_route_cpu(client, bodies)
+    finally:
+        app.json = fast_provider
+    fast_route_us = bench_route_cpu(client, bodies)
+
+    print("-" * 60)
+    print(f"JSON codec ({fast_json.BACKEND} vs json), per request:")
+    print(f"  parse + serialize: {stdlib_us:8.1f} -> {fast_us:6.1f} us CPU ({stdlib_us - fast_us:.1f} us saved)")
+    print(f"  /api/analyze:      {stdlib_route_us:8.1f} -> {fast_route_us:6.1f} us CPU "
+          f"({stdlib_route_us - fast_route_us:.1f} us saved)")
+
+def bench_compression(client, corpus, batch_size):
+    """Print response bytes and CPU per response for each Accept-Encoding"""
+    document = ' '.join(corpus)
+    requests = [
+        ('batch', '/api/analyze/batch', {'json': {'texts': corpus[:batch_size]}}),
+        ('document', '/api/analyze/document', {'data': document.encode('utf-8'), 'content_type': 'text/plain'}),
+        ('page', '/', None),
+    ]
+
+    print("-" * 60)
+    print(f"Response compression ({', '.join(supported_encodings())} available):")
+    for name, path, kwargs in requests:
+        sizes = []
+        for encoding in ('identity', 'gzip', 'br'):
+            if encoding == 'br' and 'br' not in supported_encodings():
+                continue
+            headers = {'Accept-Encoding': encoding}
+            rounds = 20
+            start = None
+            # One untimed round first, so every timed round hits the result cache
+            for _ in range(rounds + 1):
+                if kwargs is None:
+                    response = client.get(path, headers=headers)
+                else:
+                    response = client.post(path, headers=headers, **kwargs)
+                start = start or time.process_time()
+            cpu_ms = (time.process_time() - start) / rounds * 1000
+            sizes.append(f"{encoding} {len(response.get_data()):>8} B {cpu_ms:6.2f} ms")
+        print(f"  {name:9s} " + " | ".join(sizes))
+
+def bench_engines(docs):
+    """
+    Print each engine's accuracy on the labelled test cases, agreement with
+    the exact lexicon scorer and microseconds per document, then the cascade
+    margin needed for 99% agreement and whether it beats lexicon alone
+    """
+    corpus = make_synthetic_corpus(docs, seed=7)
+    engines = create_engines()
+    reference = [classify(engines['lexicon'].score(text)[0]) for text in corpus]
+
+    print("-" * 60)
+    print(f"Sentiment engines ({len(SENTIMENT_TEST_CASES)} labelled test cases, {docs} synthetic texts):")
+    timings = {}
+    for name, engine in engines.items():
+        engine.load()
+        correct = sum(classify(engine.score(case['text'])[0]) == case['expected_sentiment']
+                      for case in SENTIMENT_TEST_CASES)
+        agree = sum(classify(engine.score(text)[0]) == label for text, label in zip(corpus, reference))
+        us_per_doc = bench_scorer(engine.score, corpus)
+        timings[name] = us_per_doc
+        print(f"  {name:9s} {correct}/{len(SENTIMENT_TEST_CASES)} correct, {agree / docs:6.1%} agree, "
+              f"{us_per_doc:7.1f} us/doc")
+
+    fast, slow = engines['hashed'], engines['lexicon']
+    margin, agreement, escalation_rate = calibrate_margin(fast, slow, corpus, target_agreement=0.99)
+    us_per_doc = bench_scorer(CascadeEngine(fast, slow, margin).score, corpus)
+    print(f"  calibrated cascade: margin {margin}, {agreement:.1%} agree, "
+          f"{escalation_rate:.1%} escalated, {us_per_doc:.1f} us/doc")
+
+    # Escalated texts are scored twice, so the cascade only pays below this rate
+    break_even = 1 - timings['hashed'] / timings['lexicon']
+    verdict = "faster" if us_per_doc < timings['lexicon'] else "slower"
+    print(f"  cascade is {verdict} than lexicon alone "
+          f"(break-even escalation rate {break_even:.1%})")
+
+def bench_pool_scaling(corpus):
+    """Print scoring pool docs/sec for 1, 2, 4, ... worker processes"""
+    print("-" * 60)
+    print(f"Scoring pool scaling ({available_cores()} cores available)")
+
+    workers = 1
+    baseline = None
+    while workers <= available_cores():
+        pool = ScoringPool(pool_scorer(), workers=workers, max_pending=len(corpus))
+        pool.warm_up()
+        start = time.perf_counter()
+        pool.map(corpus)
+        rate = len(corpus) / (time.perf_counter() - start)
+        pool.shutdown()
+
+        baseline = baseline or rate
+        print(f"{workers:3d} workers:         {rate:10.1f} docs/sec ({rate / baseline:.2f}x)")
+        workers *= 2
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sentiment API routes")
+    parser.add_argument('--docs', type=int, default=2000, help="number of documents to score")
+    parser.add_argument('--batch-size', type=int, default=MAX_BATCH_ITEMS, help="texts per batch request")
+    parser.add_argument('--pool-scaling', action='store_true', help="also measure scoring pool scaling with cores")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.docs)
+    client = app.test_client()
+
+    # Measure scoring work, not cache hits between the two runs
+    app.config['RESULT_CACHE_ENABLED'] = False
+    configure_result_cache()
+
+    # Warm up lexicon loading before timing
+    client.post('/api/analyze', json={'text': 'warm up'})
+
+    textblob_us = bench_scorer(textblob_score, corpus)
+    lexicon_us = bench_scorer(lexicon_scorer.score, corpus)
+
+    single = bench_single(client, corpus)
+    batch = bench_batch(client, corpus, args.batch_size)
+
+    print("=" * 60)
+    print(f"SENTIMENT API BENCHMARK ({args.docs} documents)")
+    print("=" * 60)
+    print(f"/api/analyze:        {single:10.1f} docs/sec")
+    print(f"/api/analyze/batch:  {batch:10.1f} docs/sec (batch size {args.batch_size})")
+    print(f"Speedup:             {batch / single:10.2f}x")
+    print("-" * 60)
+    print(f"TextBlob scoring:    {textblob_us:10.1f} us/doc")
+    print(f"Lexicon scorer:      {lexicon_us:10.1f} us/doc")
+    print(f"Speedup:             {textblob_us / lexicon_us:10.2f}x")
+
+    bench_json(client, corpus)
+
+    # Compression is measured with the result cache on, so it is not lost in scoring time
+    app.config['RESULT_CACHE_ENABLED'] = True
+    configure_result_cache()
+    bench_compression(client, corpus, args.batch_size)
+
+    bench_engines(args.docs)
+
+    if args.pool_scaling:
+        bench_pool_scaling(corpus)
+
+if __name__ == "__main__":
+    main()
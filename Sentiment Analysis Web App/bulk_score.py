@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Bulk sentiment scoring for large NDJSON or CSV files
+
+Streams the input through a generator pipeline in constant memory, scores
+chunks of records across worker processes with analyze_sentiment, and
+writes results incrementally in input order. After every written chunk a
+checkpoint records how far the input and output have got, so an
+interrupted run can be continued with --resume (or from an explicit
+input byte offset with --offset).
+
+Usage:
+    python bulk_score.py reviews.ndjson scored.ndjson
+    python bulk_score.py reviews.csv scored.csv --text-field review_body
+    python bulk_score.py reviews.ndjson scored.ndjson --resume
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+
+# Add the current directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import analyze_sentiment, validate_text, warm_up
+from scoring_pool import ScoringPool, available_cores
+
+RESULT_FIELDS = ['sentiment', 'polarity', 'subjectivity', 'error']
+
+def score_text(text):
+    """Validate and score one text (runs inside a worker process)"""
+    if not isinstance(text, str):
+        return {'error': 'Text must be a string'}
+
+    text = text.strip()
+    error = validate_text(text)
+    if error:
+        return {'error': error}
+
+    return analyze_sentiment(text)
+
+def read_lines(stream, position):
+    """
+    Yield decoded lines from a binary stream, keeping position['offset']
+    at the byte offset just past the last line handed out. A line that is
+    not valid UTF-8 is decoded with replacement characters and sets
+    position['invalid'], so the reader can turn its record into an error
+    instead of stopping the whole run.
+    """
+    for raw in stream:
+        position['offset'] += len(raw)
+        try:
+            line = raw.decode('utf-8')
+        except UnicodeDecodeError:
+            line = raw.decode('utf-8', errors='replace')
+            position['invalid'] = True
+        yield line
+
+def read_ndjson(stream, position, text_field):
+    """Yield (end_offset, record, text) for each NDJSON line"""
+    for line in read_lines(stream, position):
+        if not line.strip():
+            position.pop('invalid', None)
+            continue
+        if position.pop('invalid', False):
+            yield position['offset'], {'raw': line.rstrip('\r\n')}, None
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = {'raw': line.rstrip('\r\n')}
+            yield position['offset'], record, None
+            continue
+
+        if isinstance(record, dict):
+            yield position['offset'], record, record.get(text_field)
+        else:
+            yield position['offset'], {text_field: record}, record
+
+def read_csv(stream, position, text_field, header):
+    """Yield (end_offset, record, text) for each CSV row"""
+    for row in csv.DictReader(read_lines(stream, position), fieldnames=header):
+        if position.pop('invalid', False):
+            yield position['offset'], row, None
+        else:
+            yield position['offset'], row, row.get(text_field)
+
+def read_csv_header(path):
+    """Return (column names, byte offset of the first data row)"""
+    with open(path, 'rb') as stream:
+        first_line = stream.readline()
+    header = next(csv.reader([first_line.decode('utf-8-sig', errors='replace')]))
+    return header, len(first_line)
+
+def chunked(records, size):
+    """Group an iterator of records into lists of at most size records"""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def format_ndjson(record, result):
+    """Merge the sentiment result into an NDJSON record"""
+    output = dict(record)
+    for field in RESULT_FIELDS:
+        if field in result:
+            output[field] = result[field]
+    return json.dumps(output, ensure_ascii=False) + '\n'
+
+def load_checkpoint(path):
+    """Read a checkpoint file, or return None if there is none"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_checkpoint(path, checkpoint):
+    """Atomically replace the checkpoint file"""
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(temp_path, path)
+
+def bulk_score(input_path, output_path, input_format=None, text_field='text',
+               workers=None, chunk_size=500, offset=None, resume=False, progress=True):
+    """
+    Score every record in input_path and write the results to output_path
+    Returns: number of records written in this run
+    """
+    input_format = input_format or ('csv' if input_path.lower().endswith('.csv') else 'ndjson')
+    checkpoint_path = output_path + '.checkpoint'
+
+    header, data_start = read_csv_header(input_path) if input_format == 'csv' else (None, 0)
+    output_offset = 0
+    written = 0
+
+    checkpoint = load_checkpoint(checkpoint_path) if resume else None
+    if checkpoint:
+        # Drop anything written after the last checkpoint, then continue
+        start_offset = checkpoint['input_offset']
+        output_offset = checkpoint['output_offset']
+        written = checkpoint['records']
+        output_mode = 'r+b'
+    elif offset is not None and os.path.exists(output_path):
+        start_offset = max(offset, data_start)
+        output_offset = os.path.getsize(output_path)
+        output_mode = 'r+b'
+    else:
+        start_offset = max(offset or 0, data_start)
+        output_mode = 'wb'
+
+    # Finish loading the engine before forking, so workers inherit it
+    warm_up()
+    pool = ScoringPool(score_text, workers=workers, chunk_size=chunk_size)
+    pool.warm_up()
+    max_in_flight = pool.max_pending
+    started = time.perf_counter()
+    run_records = 0
+
+    try:
+        with open(input_path, 'rb') as source, open(output_path, output_mode) as sink:
+            sink.seek(output_offset)
+            sink.truncate()
+            out = io.TextIOWrapper(sink, encoding='utf-8', newline='', write_through=True)
+
+            if input_format == 'csv':
+                writer = csv.DictWriter(out, fieldnames=header + [f for f in RESULT_FIELDS if f not in header],
+                                        extrasaction='ignore')
+                if output_offset == 0:
+                    writer.writeheader()
+
+            source.seek(start_offset)
+            position = {'offset': start_offset}
+            if input_format == 'csv':
+                records = read_csv(source, position, text_field, header)
+            else:
+                records = read_ndjson(source, position, text_field)
+
+            in_flight = deque()
+
+            def write_next():
+                """Write the oldest chunk once it is scored, then checkpoint"""
+                nonlocal written, run_records
+                chunk, future = in_flight.popleft()
+                for (_, record, _), result in zip(chunk, future.result()):
+                    if input_format == 'csv':
+                        writer.writerow(dict(record, **{f: result.get(f, '') for f in RESULT_FIELDS}))
+                    else:
+                        out.write(format_ndjson(record, result))
+                out.flush()
+                written += len(chunk)
+                run_records += len(chunk)
+                save_checkpoint(checkpoint_path, {
+                    'input_offset': chunk[-1][0],
+                    'output_offset': sink.tell(),
+                    'records': written
+                })
+                if progress:
+                    rate = run_records / (time.perf_counter() - started)
+                    print(f"\r{written} records scored ({rate:.0f} records/sec)", end='', file=sys.stderr)
+
+            for chunk in chunked(records, chunk_size):
+                while len(in_flight) >= max_in_flight:
+                    write_next()
+                in_flight.append((chunk, pool.submit([text for _, _, text in chunk], block=True)))
+
+            while in_flight:
+                write_next()
+
+            out.detach()
+    finally:
+        pool.shutdown()
+
+    if progress:
+        print(file=sys.stderr)
+    return run_records
+
+def main():
+    parser = argparse.ArgumentParser(description="Score sentiment for a large NDJSON or CSV file")
+    parser.add_argument('input', help="input file (.ndjson/.jsonl or .csv)")
+    parser.add_argument('output', help="output file, same format as the input")
+    parser.add_argument('--format', choices=['ndjson', 'csv'], help="input format (default: from the file extension)")
+    parser.add_argument('--text-field', default='text', help="field/column holding the text (default: text)")
+    parser.add_argument('--workers', type=int, default=available_cores(), help="worker processes (default: all cores)")
+    parser.add_argument('--chunk-size', type=int, default=500, help="records per chunk sent to a worker")
+    parser.add_argument('--resume', action='store_true', help="continue from the last checkpoint")
+    parser.add_argument('--offset', type=int, help="start reading the input at this byte offset and append to the output")
+    args = parser.parse_args()
+
+    try:
+        count = bulk_score(args.input, args.output, args.format, args.text_field,
+                           args.workers, args.chunk_size, args.offset, args.resume)
+        print(f"✅ Scored {count} records into {args.output}")
+    except KeyboardInterrupt:
+        print("\n⏸️ Interrupted. Run again with --resume to continue.", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
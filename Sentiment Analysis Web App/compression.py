@@ -0,0 +1,136 @@
+"""
+Response compression negotiated with Accept-Encoding
+
+Brotli is used when the client accepts it and the brotli package is
+installed, gzip otherwise. Small bodies, already-encoded responses and
+non-text content types are sent as they are. Compressed bodies of
+responses with a strong ETag (the index page shell, fingerprinted assets)
+are memoized, so static content is only compressed once per encoding.
+"""
+
+import gzip
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript',
+                      'application/x-ndjson', 'application/ndjson')
+
+# Fast settings: sentiment responses are small and generated per request
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+# Compressed bodies kept per (ETag, encoding)
+MEMO_MAX_ENTRIES = 64
+
+def supported_encodings():
+    """Encodings this process can produce, in order of preference"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def parse_accept_encoding(header):
+    """Map each encoding in an Accept-Encoding header to its q-value"""
+    accepted = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+def choose_encoding(accept_encoding):
+    """
+    Pick the response encoding for an Accept-Encoding header
+    Returns: 'br', 'gzip' or None (send uncompressed)
+    """
+    if not accept_encoding:
+        return None
+
+    accepted = parse_accept_encoding(accept_encoding)
+    wildcard = accepted.get('*', 0.0)
+    best, best_quality = None, 0.0
+    for encoding in supported_encodings():
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def is_compressible(content_type):
+    """True for text-like content types worth compressing"""
+    return bool(content_type) and content_type.lower().startswith(COMPRESSIBLE_TYPES)
+
+def compress(body, encoding):
+    """Compress body (bytes) with the given encoding"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+def weak_etag(etag):
+    """The weak form of an ETag header value (compressed variants are not byte-identical)"""
+    return etag if etag.startswith('W/') else f'W/{etag}'
+
+class Compressor:
+    """Decides whether and how to compress a response, memoizing static bodies"""
+
+    def __init__(self, min_size=1024, enabled=True):
+        self.min_size = min_size
+        self.enabled = enabled
+        self._memo = {}
+        self._lock = threading.Lock()
+
+        self.compressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def encoding_for(self, accept_encoding, status, content_type, content_encoding, size):
+        """
+        Encoding to apply to a response, or None to send it as it is
+        Only complete 200 responses of a compressible type and at least
+        min_size bytes are compressed.
+        """
+        if not self.enabled or status != 200 or content_encoding or size < self.min_size:
+            return None
+        if not is_compressible(content_type):
+            return None
+        return choose_encoding(accept_encoding)
+
+    def compress(self, body, encoding, etag=None):
+        """Compress body, reusing an earlier result for the same strong ETag"""
+        memo_key = (etag, encoding) if etag and not etag.startswith('W/') else None
+        compressed = self._memo.get(memo_key) if memo_key else None
+        if compressed is None:
+            compressed = compress(body, encoding)
+            if memo_key:
+                with self._lock:
+                    if len(self._memo) >= MEMO_MAX_ENTRIES:
+                        self._memo.pop(next(iter(self._memo)))
+                    self._memo[memo_key] = compressed
+
+        with self._lock:
+            self.compressed += 1
+            self.bytes_in += len(body)
+            self.bytes_out += len(compressed)
+        return compressed
+
+    def stats(self):
+        """Return a dict of compression counters"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'encodings': list(supported_encodings()),
+                'min_size': self.min_size,
+                'compressed': self.compressed,
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'ratio': round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else 0.0
+            }
@@ -0,0 +1,307 @@
+"""
+Pluggable sentiment engines
+
+Every engine scores a text to a (polarity, subjectivity) pair:
+
+- textblob: TextBlob(text).sentiment, the reference implementation
+- lexicon:  the precompiled pattern lexicon (lexicon_scorer), same scores
+            as TextBlob without building a TextBlob per text
+- hashed:   a linear model over hashed unigrams and bigrams with weights
+            derived from the same lexicon; one regex pass and a dict
+            lookup per n-gram, but it ignores intensifiers ("very good")
+            and exclamation marks, so scores are approximate
+- cascade:  a fast engine answers texts it classifies confidently and
+            escalates texts whose polarity lands within a margin of the
+            Positive/Negative thresholds to a slower, exact engine
+
+calibrate_margin() picks the cascade margin from a sample of texts: the
+smallest margin at which the cascade agrees with the slow engine often
+enough.
+"""
+
+import logging
+import re
+import threading
+from zlib import crc32
+
+import lexicon_scorer
+
+# Polarity above +threshold is Positive, below -threshold Negative
+POLARITY_THRESHOLD = 0.1
+
+# Escalate fast scores within this distance of a threshold
+DEFAULT_MARGIN = 0.05
+
+# Bump whenever a change to the hashed model can change its scores
+HASHED_MODEL_VERSION = 1
+
+# Words, "n't" split off its verb like the pattern tokenizer does, and runs of punctuation (emoticons, "!!!")
+TOKEN_PATTERN = re.compile(r"\w+(?=n't)|n't|[\w'-]+|[^\w\s]+")
+
+def classify(polarity, threshold=POLARITY_THRESHOLD):
+    """Sentiment label for a polarity score"""
+    if polarity > threshold:
+        return "Positive"
+    elif polarity < -threshold:
+        return "Negative"
+    else:
+        return "Neutral"
+
+def sentiment_result(text, polarity, subjectivity):
+    """The result dict the API returns for a scored text"""
+    return {
+        'text': text,
+        'sentiment': classify(polarity),
+        'polarity': round(polarity, 3),
+        'subjectivity': round(subjectivity, 3),
+        'polarity_percentage': round((polarity + 1) * 50, 1),  # Convert to 0-100 scale
+        'subjectivity_percentage': round(subjectivity * 100, 1)  # Convert to 0-100 scale
+    }
+
+class Engine:
+    """Base class: subclasses set name and implement score()"""
+
+    name = None
+
+    def load(self):
+        """Load models and tables up front (engines also load on first use)"""
+
+    def version(self):
+        """String that changes whenever this engine's scores could change"""
+        raise NotImplementedError
+
+    def score(self, text):
+        """
+        Score one text
+        Returns: (polarity, subjectivity) tuple
+        """
+        raise NotImplementedError
+
+class TextBlobEngine(Engine):
+    """TextBlob's PatternAnalyzer, one TextBlob per text"""
+
+    name = 'textblob'
+
+    def load(self):
+        import textblob  # noqa: F401 (imports NLTK, which is slow)
+
+    def version(self):
+        return f"textblob-{lexicon_scorer.version()}"
+
+    def score(self, text):
+        from textblob import TextBlob
+        sentiment = TextBlob(text).sentiment
+        return sentiment.polarity, sentiment.subjectivity
+
+class LexiconEngine(Engine):
+    """The precompiled pattern lexicon; same scores as TextBlob"""
+
+    name = 'lexicon'
+
+    def load(self):
+        lexicon_scorer.load_lexicon()
+
+    def version(self):
+        return lexicon_scorer.version()
+
+    def score(self, text):
+        return lexicon_scorer.score(text)
+
+def feature_hash(*words):
+    """Hash of an n-gram (words joined by spaces), stable across processes"""
+    return crc32(' '.join(words).encode('utf-8'))
+
+def lexicon_weights():
+    """
+    Derive the hashed model from the pattern lexicon
+    Returns: dict of n-gram hash -> (polarity weight, subjectivity weight, count weight)
+    """
+    lexicon, emoticons, negations = lexicon_scorer.tables()
+    weights = {}
+    for word, (polarity, subjectivity, _, _) in lexicon.items():
+        weights[feature_hash(word)] = (polarity, subjectivity, 1.0)
+        # "not good" scores -0.5 * good: the bigram cancels the unigram and adds the flipped polarity
+        for negation in negations:
+            weights[feature_hash(negation, word)] = (-1.5 * polarity, 0.0, 0.0)
+    for face, polarity in emoticons.items():
+        weights.setdefault(feature_hash(face), (polarity, 1.0, 1.0))
+    return weights
+
+class HashedLinearEngine(Engine):
+    """Linear model over hashed unigrams and bigrams, averaged over the n-grams that carry weight"""
+
+    name = 'hashed'
+
+    def __init__(self, weights=None):
+        self.weights = weights
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self.weights is None:
+            with self._lock:
+                if self.weights is None:
+                    self.weights = lexicon_weights()
+
+    def version(self):
+        return f"hashed-{HASHED_MODEL_VERSION}-{lexicon_scorer.version()}"
+
+    def score(self, text):
+        if self.weights is None:
+            self.load()
+        get = self.weights.get
+
+        polarity = subjectivity = count = 0.0
+        previous = None
+        for token in TOKEN_PATTERN.findall(text.lower()):
+            data = token.encode('utf-8')
+            unigram = crc32(data)
+            weight = get(unigram)
+            if weight is not None:
+                polarity += weight[0]
+                subjectivity += weight[1]
+                count += weight[2]
+            if previous is not None:
+                # crc32 of "previous token" continued with " token"
+                weight = get(crc32(b' ' + data, previous))
+                if weight is not None:
+                    polarity += weight[0]
+                    subjectivity += weight[1]
+                    count += weight[2]
+            previous = unigram
+
+        if not count:
+            return 0.0, 0.0
+        return max(-1.0, min(polarity / count, 1.0)), subjectivity / count
+
+class CascadeEngine(Engine):
+    """
+    Fast engine first; near-threshold texts are escalated to the slow engine.
+    An escalated text is scored by both engines, so the cascade only beats
+    the slow engine alone while the escalation rate stays below
+    1 - fast cost / slow cost (see benchmark.py --engines)
+    """
+
+    name = 'cascade'
+
+    def __init__(self, fast, slow, margin=DEFAULT_MARGIN, threshold=POLARITY_THRESHOLD):
+        self.fast = fast
+        self.slow = slow
+        self.margin = margin
+        self.threshold = threshold
+        self.answered = 0
+        self.escalated = 0
+        self._lock = threading.Lock()  # request threads share one engine
+
+    def load(self):
+        self.fast.load()
+        self.slow.load()
+
+    def version(self):
+        return f"cascade-{self.margin}-{self.fast.version()}-{self.slow.version()}"
+
+    def is_confident(self, polarity):
+        """True when polarity is at least margin away from both thresholds"""
+        return abs(abs(polarity) - self.threshold) >= self.margin
+
+    def score(self, text):
+        polarity, subjectivity = self.fast.score(text)
+        if self.is_confident(polarity):
+            with self._lock:
+                self.answered += 1
+            return polarity, subjectivity
+        with self._lock:
+            self.escalated += 1
+        return self.slow.score(text)
+
+    def stats(self):
+        """Return a dict of cascade counters (for this process)"""
+        with self._lock:
+            answered, escalated = self.answered, self.escalated
+        total = answered + escalated
+        return {
+            'fast': self.fast.name,
+            'slow': self.slow.name,
+            'margin': self.margin,
+            'answered': answered,
+            'escalated': escalated,
+            'escalation_rate': round(escalated / total, 3) if total else 0.0
+        }
+
+ENGINE_CLASSES = {
+    'textblob': TextBlobEngine,
+    'lexicon': LexiconEngine,
+    'hashed': HashedLinearEngine
+}
+
+ENGINE_NAMES = tuple(ENGINE_CLASSES) + ('cascade',)
+
+def create_engines(fast='hashed', slow='lexicon', margin=DEFAULT_MARGIN):
+    """
+    One instance of every engine, the cascade sharing the fast and slow ones
+    Returns: dict of engine name -> engine
+    """
+    engines = {name: engine_class() for name, engine_class in ENGINE_CLASSES.items()}
+    for name in (fast, slow):
+        if name not in engines:
+            raise ValueError(f"Unknown cascade engine {name!r}, choose one of: {', '.join(ENGINE_CLASSES)}")
+    engines['cascade'] = CascadeEngine(engines[fast], engines[slow], margin)
+    return engines
+
+def calibrate_margin(fast, slow, texts, target_agreement=0.99, step=0.01, max_margin=0.5):
+    """
+    Find the smallest cascade margin at which the cascade's labels agree with
+    the slow engine's on at least target_agreement of texts
+    Returns: (margin, agreement, escalation rate), or the widest margin tried
+    when the target cannot be reached
+    """
+    scored = [(fast.score(text)[0], classify(slow.score(text)[0])) for text in texts]
+    steps = int(round(max_margin / step))
+
+    for i in range(steps + 1):
+        margin = round(i * step, 6)
+        cascade = CascadeEngine(fast, slow, margin)
+        agree = escalated = 0
+        for fast_polarity, slow_label in scored:
+            if cascade.is_confident(fast_polarity):
+                agree += classify(fast_polarity) == slow_label
+            else:
+                agree += 1
+                escalated += 1
+        agreement = agree / len(scored)
+        if agreement >= target_agreement or i == steps:
+            return margin, agreement, escalated / len(scored)
+
+# Engines built inside scoring pool workers, by EngineScorer settings
+_worker_engines = {}
+_worker_engines_lock = threading.Lock()
+
+class EngineScorer:
+    """
+    Picklable scoring function for the scoring pool: scores a text to a
+    result dict with an engine that each worker process builds (once) from
+    these settings. Only this module is imported in the workers, never the
+    web app, so a spawned worker does not run the app's start-up.
+    """
+
+    def __init__(self, engine='lexicon', fast='hashed', slow='lexicon', margin=DEFAULT_MARGIN):
+        self.settings = (engine, fast, slow, margin)
+
+    def engine(self):
+        engine = _worker_engines.get(self.settings)
+        if engine is None:
+            with _worker_engines_lock:
+                engine = _worker_engines.get(self.settings)
+                if engine is None:
+                    name, fast, slow, margin = self.settings
+                    engine = create_engines(fast=fast, slow=slow, margin=margin)[name]
+                    engine.load()
+                    _worker_engines[self.settings] = engine
+        return engine
+
+    def __call__(self, text):
+        try:
+            polarity, subjectivity = self.engine().score(text)
+            return sentiment_result(text, polarity, subjectivity)
+        except Exception as e:
+            logging.getLogger(__name__).error(f"Error analyzing sentiment: {str(e)}")
+            return {'error': f"Error analyzing sentiment: {str(e)}"}
@@ -0,0 +1,54 @@
+"""
+Fast JSON encoding and decoding for the sentiment routes
+
+Uses orjson when it is installed (bytes in, bytes out, no intermediate
+str) and falls back to the standard library json module otherwise.
+FastJSONProvider plugs the same codec into Flask, so request.get_json()
+and jsonify() use it without any route changes.
+"""
+
+import json
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+if orjson is not None:
+    def loads(data):
+        """Decode JSON from bytes or str; raises ValueError if invalid"""
+        return orjson.loads(data)
+
+    def dumps(obj):
+        """Encode obj as compact UTF-8 JSON bytes"""
+        return orjson.dumps(obj)
+else:
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+    def loads(data):
+        """Decode JSON from bytes or str; raises ValueError if invalid"""
+        return json.loads(data)
+
+    def dumps(obj):
+        """Encode obj as compact UTF-8 JSON bytes"""
+        return _encoder.encode(obj).encode('utf-8')
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider backed by the fast codec"""
+
+    mimetype = 'application/json'
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        """Build a JSON response straight from the encoded bytes"""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
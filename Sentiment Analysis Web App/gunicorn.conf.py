@@ -0,0 +1,52 @@
+"""
+Production server profile for the Sentiment Analysis Web Application
+
+Scoring is CPU-bound and holds the GIL, so throughput comes from one
+worker process per core; a few threads per worker only overlap network
+I/O (reading request bodies, writing responses) with scoring. Keep-alive
+outlasts the usual 60-second load balancer idle timeout so connections
+are reused instead of re-established.
+
+Usage:
+    pip install gunicorn
+    gunicorn -c gunicorn.conf.py app:app
+
+Every setting can be overridden with a SENTIMENT_SERVER_* environment variable.
+"""
+
+import os
+
+from scoring_pool import available_cores
+
+def _env_int(name, default):
+    return int(os.environ.get(f'SENTIMENT_SERVER_{name}', default))
+
+bind = os.environ.get('SENTIMENT_SERVER_BIND', '0.0.0.0:5000')
+
+# One process per core; threads cover I/O waits, not scoring. With gthread
+# workers, threads is what bounds the requests a worker handles at once
+# (worker_connections only applies to the eventlet/gevent workers)
+workers = _env_int('WORKERS', available_cores())
+worker_class = 'gthread'
+threads = _env_int('THREADS', 4)
+
+# Reuse client and load balancer connections
+keepalive = _env_int('KEEPALIVE', 75)
+backlog = _env_int('BACKLOG', 2048)
+
+# Long documents take a while; anything slower than this is stuck
+timeout = _env_int('TIMEOUT', 60)
+graceful_timeout = _env_int('GRACEFUL_TIMEOUT', 30)
+
+# Recycle workers now and then to bound memory growth of the caches
+max_requests = _env_int('MAX_REQUESTS', 100000)
+max_requests_jitter = _env_int('MAX_REQUESTS_JITTER', 10000)
+
+# Heartbeat files on tmpfs so a slow disk cannot stall workers
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# Each worker imports the app and warms up on its own thread after the
+# fork; preloading would start that thread in the master before forking
+preload_app = False
+
+accesslog = os.environ.get('SENTIMENT_SERVER_ACCESS_LOG') or None
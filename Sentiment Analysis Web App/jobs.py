@@ -0,0 +1,386 @@
+"""
+Durable background jobs for large sentiment workloads
+
+A job is a corpus submitted in one request and scored in the background:
+the client gets a job id straight away, then polls progress and pages
+through the results, or gives a webhook URL that is called when the job
+is done. Jobs and their per-text results live in a SQLite file, so a
+restart loses nothing. Queued jobs are picked up again, and a job whose
+worker died halfway resumes from its last saved chunk once its lease
+expires. Several processes can share the file, and claiming a job is
+atomic.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import urllib.request
+import uuid
+
+from scoring_pool import PoolBusyError
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id TEXT PRIMARY KEY,
+        client TEXT NOT NULL,
+        status TEXT NOT NULL,
+        engine TEXT NOT NULL,
+        webhook TEXT NOT NULL,
+        total INTEGER NOT NULL,
+        processed INTEGER NOT NULL DEFAULT 0,
+        errors INTEGER NOT NULL DEFAULT 0,
+        error TEXT,
+        worker TEXT,
+        lease_until REAL,
+        created REAL NOT NULL,
+        started REAL,
+        finished REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, created)",
+    "CREATE INDEX IF NOT EXISTS jobs_by_client ON jobs (client, status)",
+    """
+    CREATE TABLE IF NOT EXISTS job_items (
+        job_id TEXT NOT NULL,
+        idx INTEGER NOT NULL,
+        text TEXT,
+        result TEXT,
+        PRIMARY KEY (job_id, idx)
+    ) WITHOUT ROWID
+    """
+)
+
+class TooManyJobs(Exception):
+    """Raised when a client already has the maximum number of active jobs"""
+
+class JobQueue:
+    """SQLite-backed job queue shared by threads and processes"""
+
+    def __init__(self, path, max_active_per_client=2, lease=60.0, timeout=5.0):
+        self.path = path
+        self.max_active_per_client = max_active_per_client
+        self.lease = lease
+        self.timeout = timeout
+        self._local = threading.local()
+
+        connection = self._connection()
+        connection.execute('PRAGMA journal_mode=WAL')
+        for statement in SCHEMA:
+            connection.execute(statement)
+        connection.commit()
+
+    def _connection(self):
+        """One connection per thread (and per process after a fork)"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            # Autocommit; transactions are opened explicitly with BEGIN IMMEDIATE
+            connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _transaction(self):
+        """Start a write transaction; returns the connection to use and commit"""
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        return connection
+
+    def submit(self, texts, client, engine='', webhook=''):
+        """
+        Queue a job for texts (non-string items are kept and reported as errors)
+        Raises TooManyJobs when client already has max_active_per_client active jobs.
+        Returns: job id
+        """
+        job_id = uuid.uuid4().hex
+        connection = self._transaction()
+        try:
+            active = connection.execute(
+                "SELECT COUNT(*) FROM jobs WHERE client = ? AND status IN ('queued', 'running')", (client,)
+            ).fetchone()[0]
+            if self.max_active_per_client and active >= self.max_active_per_client:
+                raise TooManyJobs(f'Too many active jobs. Please wait for one of your '
+                                  f'{active} jobs to finish before submitting another.')
+
+            connection.execute(
+                "INSERT INTO jobs (id, client, status, engine, webhook, total, created) VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                (job_id, client, engine or '', webhook or '', len(texts), time.time())
+            )
+            connection.executemany(
+                'INSERT INTO job_items (job_id, idx, text) VALUES (?, ?, ?)',
+                ((job_id, index, text if isinstance(text, str) else None) for index, text in enumerate(texts))
+            )
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return job_id
+
+    def get(self, job_id):
+        """Return a job's status and progress as a dict, or None if there is no such job"""
+        row = self._connection().execute(
+            'SELECT id, status, engine, webhook, total, processed, errors, error, created, started, finished '
+            'FROM jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        job_id, status, engine, webhook, total, processed, errors, error, created, started, finished = row
+        job = {
+            'id': job_id,
+            'status': status,
+            'engine': engine or None,
+            'total': total,
+            'processed': processed,
+            'errors': errors,
+            'progress': round(processed / total, 3) if total else 1.0,
+            'created_at': created,
+            'started_at': started,
+            'finished_at': finished
+        }
+        if webhook:
+            job['webhook'] = webhook
+        if error:
+            job['error'] = error
+        return job
+
+    def results(self, job_id, offset=0, limit=1000):
+        """Scored results with index in [offset, offset + limit), in input order"""
+        rows = self._connection().execute(
+            'SELECT result FROM job_items WHERE job_id = ? AND idx >= ? AND idx < ? AND result IS NOT NULL ORDER BY idx',
+            (job_id, offset, offset + limit)
+        )
+        return [json.loads(result) for (result,) in rows]
+
+    def claim(self, worker):
+        """
+        Take the oldest queued job, or a running job whose worker stopped renewing its lease
+        Returns: job dict (with the claiming worker), or None when there is nothing to do
+        """
+        now = time.time()
+        connection = self._transaction()
+        try:
+            row = connection.execute(
+                "SELECT id, engine, webhook FROM jobs WHERE status = 'queued' "
+                "OR (status = 'running' AND lease_until < ?) ORDER BY created LIMIT 1", (now,)
+            ).fetchone()
+            if row is not None:
+                connection.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, started = COALESCE(started, ?) "
+                    "WHERE id = ?", (worker, now + self.lease, now, row[0])
+                )
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+        if row is None:
+            return None
+        return {'id': row[0], 'engine': row[1], 'webhook': row[2], 'worker': worker}
+
+    def pending(self, job_id, limit):
+        """Next (index, text) items of a job that have no result yet"""
+        return self._connection().execute(
+            'SELECT idx, text FROM job_items WHERE job_id = ? AND result IS NULL ORDER BY idx LIMIT ?',
+            (job_id, limit)
+        ).fetchall()
+
+    def save(self, job_id, results):
+        """
+        Store (index, result) pairs for a job, update its progress and renew its lease
+        Items that already have a result (saved by a worker whose lease had
+        expired) are left alone and not counted twice.
+        """
+        rows = [(json.dumps(result), job_id, index, 'error' in result) for index, result in results]
+
+        connection = self._transaction()
+        try:
+            saved = errors = 0
+            for result, _, index, is_error in rows:
+                updated = connection.execute(
+                    'UPDATE job_items SET result = ? WHERE job_id = ? AND idx = ? AND result IS NULL',
+                    (result, job_id, index)
+                ).rowcount
+                saved += updated
+                errors += updated if is_error else 0
+            connection.execute(
+                'UPDATE jobs SET processed = processed + ?, errors = errors + ?, lease_until = ? WHERE id = ?',
+                (saved, errors, time.time() + self.lease, job_id)
+            )
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+    def renew(self, job_id, worker):
+        """
+        Extend a running job's lease while worker still holds it
+        Returns: False if the job was reclaimed (or finished) by another worker
+        """
+        return self._connection().execute(
+            "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = 'running' AND worker = ?",
+            (time.time() + self.lease, job_id, worker)
+        ).rowcount == 1
+
+    def finish(self, job_id, worker, error=None):
+        """
+        Mark a job done (or failed, with an error message) if worker still holds it
+        A worker whose lease expired while another worker reclaimed the job
+        must not finish it too (and call its webhook a second time).
+        Returns: True if the job was finished by this call
+        """
+        return self._connection().execute(
+            "UPDATE jobs SET status = ?, error = ?, finished = ?, lease_until = NULL "
+            "WHERE id = ? AND status = 'running' AND worker = ?",
+            ('failed' if error else 'done', error, time.time(), job_id, worker)
+        ).rowcount == 1
+
+    def purge(self, max_age):
+        """
+        Delete finished jobs (and their results) older than max_age seconds
+        Returns: number of deleted jobs
+        """
+        cutoff = time.time() - max_age
+        connection = self._transaction()
+        try:
+            connection.execute(
+                "DELETE FROM job_items WHERE job_id IN "
+                "(SELECT id FROM jobs WHERE status IN ('done', 'failed') AND finished < ?)", (cutoff,)
+            )
+            deleted = connection.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished < ?", (cutoff,)
+            ).rowcount
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return deleted
+
+    def stats(self):
+        """Return a dict of job counts by status"""
+        counts = dict(self._connection().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status'))
+        return {status: counts.get(status, 0) for status in ('queued', 'running', 'done', 'failed')}
+
+    def close(self):
+        """Close this thread's connection"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+def post_webhook(url, payload, timeout=10.0):
+    """POST a JSON payload to url; failures are logged, not raised"""
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+        method='POST'
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+        return True
+    except Exception as e:
+        logger.error(f"Error calling job webhook {url}: {str(e)}")
+        return False
+
+class JobWorkers:
+    """Background threads that claim jobs and score them chunk by chunk"""
+
+    def __init__(self, queue, score_batch, threads=1, chunk_size=500, poll_interval=1.0,
+                 retention=7 * 24 * 3600, notify=post_webhook):
+        self.queue = queue
+        self.score_batch = score_batch  # (texts, engine name) -> list of result dicts
+        self.threads = threads
+        self.chunk_size = chunk_size
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.notify = notify
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._last_purge = 0.0
+
+    def start(self):
+        """Start the worker threads (once)"""
+        if self._threads:
+            return
+        for i in range(self.threads):
+            thread = threading.Thread(target=self._run, name=f'job-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def wake(self):
+        """Tell idle workers a job was submitted"""
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        """Stop the worker threads after their current chunk"""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def run_once(self):
+        """
+        Claim one job and process it to the end
+        Returns: True if a job was processed
+        """
+        job = self.queue.claim(f'{os.getpid()}:{threading.current_thread().name}')
+        if job is None:
+            return False
+
+        error = None
+        reclaimed = False
+        try:
+            while not self._stop.is_set():
+                items = self.queue.pending(job['id'], self.chunk_size)
+                if not items:
+                    break
+                try:
+                    results = self.score_batch([text for _, text in items], job['engine'])
+                except PoolBusyError:
+                    # Interactive traffic has the scoring pool; retry the chunk shortly,
+                    # holding on to the job meanwhile
+                    time.sleep(self.poll_interval)
+                    if not self.queue.renew(job['id'], job['worker']):
+                        reclaimed = True
+                        break
+                    continue
+                self.queue.save(job['id'], [
+                    (index, dict(result, index=index)) for (index, _), result in zip(items, results)
+                ])
+        except Exception as e:
+            logger.error(f"Error processing job {job['id']}: {str(e)}")
+            error = str(e)
+
+        if self._stop.is_set() and error is None:
+            # Stopped halfway: the job resumes once its lease expires
+            return True
+
+        if reclaimed or not self.queue.finish(job['id'], job['worker'], error):
+            logger.warning(f"Job {job['id']} was reclaimed by another worker after its lease expired")
+            return True
+        if job['webhook'] and self.notify is not None:
+            self.notify(job['webhook'], self.queue.get(job['id']))
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.run_once():
+                    continue
+                if self.retention and time.time() - self._last_purge > 3600:
+                    self._last_purge = time.time()
+                    self.queue.purge(self.retention)
+            except sqlite3.Error as e:
+                logger.error(f"Error reading the job queue: {str(e)}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
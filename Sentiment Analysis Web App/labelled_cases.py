@@ -0,0 +1,48 @@
+"""
+Hand-labelled example texts, shared by the tests (test_sentiment.py) and
+the engine comparison in benchmark.py
+"""
+
+SENTIMENT_TEST_CASES = [
+    # Positive examples
+    {
+        'text': "I absolutely love this new product! It's amazing and works perfectly.",
+        'expected_sentiment': 'Positive'
+    },
+    {
+        'text': "What a beautiful day! I'm feeling great and excited about the future.",
+        'expected_sentiment': 'Positive'
+    },
+    {
+        'text': "This is the best thing that has ever happened to me!",
+        'expected_sentiment': 'Positive'
+    },
+    
+    # Negative examples
+    {
+        'text': "This is terrible! I hate how complicated everything is.",
+        'expected_sentiment': 'Negative'
+    },
+    {
+        'text': "I'm really disappointed and frustrated with this service.",
+        'expected_sentiment': 'Negative'
+    },
+    {
+        'text': "This product is awful and completely useless.",
+        'expected_sentiment': 'Negative'
+    },
+    
+    # Neutral examples
+    {
+        'text': "The meeting is scheduled for tomorrow at 3 PM.",
+        'expected_sentiment': 'Neutral'
+    },
+    {
+        'text': "Python is a programming language used for web development.",
+        'expected_sentiment': 'Neutral'
+    },
+    {
+        'text': "The weather report shows 20 degrees Celsius.",
+        'expected_sentiment': 'Neutral'
+    }
+]
@@ -0,0 +1,166 @@
+"""
+Precompiled lexicon scorer for sentiment analysis
+
+Scores text with the same pattern lexicon that TextBlob's PatternAnalyzer
+uses, but loads it once into a flat dict of interned tokens and scores
+polarity and subjectivity in a single linear pass over the tokens.
+Results match TextBlob(text).sentiment exactly (same tokens, same
+arithmetic in the same order).
+
+TextBlob (and with it NLTK) is only imported by load_lexicon(), so
+importing this module is cheap and the cost is paid at warm-up instead.
+"""
+
+import hashlib
+import importlib.util
+import os
+import sys
+
+# Bump whenever a change to this module can change scores
+SCORER_VERSION = 1
+
+# Lazily built lookup tables, shared by every call in the process
+_lexicon = None
+_emoticons = None
+_tokenizer = None
+_negations = frozenset()
+_punctuation = ()
+
+def load_lexicon():
+    """
+    Load the pattern lexicon into compact lookup tables (once per process)
+    Returns: number of lexicon entries
+    """
+    global _lexicon, _emoticons, _tokenizer, _negations, _punctuation
+
+    if _lexicon is None:
+        from textblob._text import EMOTICONS, PUNCTUATION
+        from textblob.en import sentiment as pattern_sentiment
+
+        # Any lookup on the lazy dict triggers loading of en-sentiment.xml
+        pattern_sentiment.get('good')
+
+        # word -> (polarity, subjectivity, intensity, is_modifier)
+        lexicon = {}
+        for word, tags in dict.items(pattern_sentiment):
+            polarity, subjectivity, intensity = tags[None]
+            is_modifier = any(tag in tags for tag in pattern_sentiment.modifiers)
+            lexicon[sys.intern(word)] = (polarity, subjectivity, intensity, is_modifier)
+
+        # emoticon -> polarity, keeping the first match in EMOTICONS order
+        emoticons = {}
+        for (_, polarity), faces in EMOTICONS.items():
+            for face in faces:
+                emoticons.setdefault(face.lower(), polarity)
+
+        _tokenizer = pattern_sentiment.tokenizer
+        _negations = frozenset(pattern_sentiment.negations)
+        _punctuation = PUNCTUATION
+        _lexicon, _emoticons = lexicon, emoticons
+
+    return len(_lexicon)
+
+def version():
+    """
+    Identify this scorer and the lexicon it reads, without importing TextBlob
+    Returns: string that changes whenever scores could change
+    """
+    package_dir = os.path.dirname(importlib.util.find_spec('textblob').origin)
+    with open(os.path.join(package_dir, 'en', 'en-sentiment.xml'), 'rb') as f:
+        lexicon_digest = hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+    return f"lexicon-{SCORER_VERSION}-{lexicon_digest}"
+
+def is_loaded():
+    """True once the lexicon tables have been built in this process"""
+    return _lexicon is not None
+
+def tables():
+    """
+    The loaded lookup tables, for engines that derive their own model from the lexicon
+    Returns: (word -> (polarity, subjectivity, intensity, is_modifier), emoticon -> polarity, negations)
+    """
+    if _lexicon is None:
+        load_lexicon()
+    return _lexicon, _emoticons, _negations
+
+def tokenize(text):
+    """Split text into lowercase tokens the same way the pattern analyzer does"""
+    if _tokenizer is None:
+        load_lexicon()
+    return " ".join(_tokenizer(text)).lower().split()
+
+def score(text):
+    """
+    Score the given text against the precompiled lexicon
+    Returns: (polarity, subjectivity) tuple
+    """
+    if _lexicon is None:
+        load_lexicon()
+    return score_tokens(tokenize(text))
+
+def score_tokens(tokens):
+    """
+    Score an already tokenized (lowercase) text in one pass
+    Returns: (polarity, subjectivity) tuple
+    """
+    lexicon = _lexicon
+    emoticons = _emoticons
+    negations = _negations
+
+    # Each assessment is [polarity, subjectivity, intensity, negated]
+    assessments = []
+    modifier = None  # Preceding modifier word ("really good")
+    negation = None  # Preceding negation word ("not good")
+
+    for word in tokens:
+        entry = lexicon.get(word)
+        if entry is not None:
+            polarity, subjectivity, intensity, is_modifier = entry
+            if modifier is None:
+                assessments.append([polarity, subjectivity, intensity, False])
+            else:
+                last = assessments[-1]
+                last[0] = max(-1.0, min(polarity * last[2], +1.0))
+                last[1] = max(-1.0, min(subjectivity * last[2], +1.0))
+                last[2] = intensity
+            if negation is not None:
+                last = assessments[-1]
+                last[2] = 1.0 / last[2]
+                last[3] = True
+            modifier = word if is_modifier else None
+            negation = word if word in negations else None
+        else:
+            if word in negations:
+                negation = word
+            elif negation and len(word.strip("'")) > 1:
+                negation = None
+            # A negation preceded by an -ly modifier ("really not good")
+            if negation is not None and modifier is not None and modifier.endswith("ly"):
+                assessments[-1][3] = True
+                negation = None
+            elif modifier and len(word) > 2:
+                modifier = None
+            # Exclamation marks boost the previous word
+            if word == "!" and assessments:
+                last = assessments[-1]
+                last[0] = max(-1.0, min(last[0] * 1.25, +1.0))
+            # Exclamation marks in parentheses indicate sarcasm
+            if word == "(!)":
+                assessments.append([0.0, 1.0, 1.0, False])
+            if word.isalpha() is False and len(word) <= 5 and word not in _punctuation:
+                polarity = emoticons.get(word)
+                if polarity is not None:
+                    assessments.append([polarity, 1.0, 1.0, False])
+
+    if not assessments:
+        return 0.0, 0.0
+
+    polarity_total = 0
+    subjectivity_total = 0
+    for polarity, subjectivity, _, negated in assessments:
+        # "not good" = slightly bad, "not bad" = slightly good
+        polarity_total += polarity * -0.5 if negated else polarity
+        subjectivity_total += subjectivity
+
+    count = float(len(assessments))
+    return polarity_total / count, subjectivity_total / count
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Load-testing and regression benchmark suite for the Sentiment Analysis Web App
+
+Generates a reproducible synthetic corpus, drives POST /api/analyze at fixed
+concurrency levels and reports p50/p95/p99 latency and requests/sec, then
+micro-benchmarks analyze_sentiment on its own. Results can be saved as JSON
+(tagged with the git commit) and compared against an earlier run to catch
+regressions.
+
+Usage:
+    python load_test.py                                  # start a local server and test it
+    python load_test.py --url http://localhost:5000      # test a running server
+    python load_test.py --output before.json
+    python load_test.py --compare before.json --max-regression 10
+"""
+
+import argparse
+import http.client
+import json
+import logging
+import math
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+# Add the current directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import app, analyze_sentiment, configure_result_cache, MAX_TEXT_LENGTH
+
+FILLER_WORDS = [
+    "the", "a", "this", "that", "it", "was", "is", "and", "but", "with", "for", "on",
+    "product", "service", "delivery", "app", "price", "support", "battery", "screen",
+    "order", "team", "update", "experience", "quality", "really", "very", "quite",
+]
+
+OPINION_WORDS = [
+    "good", "great", "excellent", "amazing", "love", "happy", "perfect", "beautiful", "nice", "fast",
+    "bad", "terrible", "awful", "hate", "sad", "broken", "slow", "disappointing", "poor", "useless",
+    "not", "never", "extremely", "slightly", "!", ":)", ":(",
+]
+
+# Length distributions in words: (mean, standard deviation) of a log-normal
+LENGTH_PROFILES = {
+    'short': (12, 6),
+    'mixed': (40, 40),
+    'long': (300, 150),
+}
+
+def make_corpus(size, profile='mixed', seed=42, opinion_ratio=0.2):
+    """
+    Build size unique synthetic texts with word counts drawn from profile
+    Returns: list of texts, identical for the same arguments
+    """
+    rng = random.Random(seed)
+    mean, spread = LENGTH_PROFILES[profile]
+    # Log-normal parameters giving the requested mean and spread
+    sigma = math.sqrt(math.log(1 + spread ** 2 / mean ** 2))
+    mu = math.log(mean) - sigma ** 2 / 2
+
+    corpus = []
+    for i in range(size):
+        words = max(1, int(rng.lognormvariate(mu, sigma)))
+        text = ' '.join(rng.choice(OPINION_WORDS) if rng.random() < opinion_ratio else rng.choice(FILLER_WORDS)
+                        for _ in range(words))
+        # The suffix keeps every text unique so the result cache never hits
+        corpus.append(f"{text[:MAX_TEXT_LENGTH - 12].capitalize()}. #{i}")
+    return corpus
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize_latencies(latencies, errors, elapsed):
+    """Return the latency percentiles (ms) and throughput for one run"""
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies) + errors,
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'requests_per_sec': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+def run_load(url, corpus, concurrency, requests_count):
+    """
+    Send requests_count POST /api/analyze requests over concurrency
+    keep-alive connections, cycling through the corpus
+    Returns: summary dict for this concurrency level
+    """
+    target = urlsplit(url)
+    path = (target.path.rstrip('/') or '') + '/api/analyze'
+    bodies = [json.dumps({'text': text}).encode('utf-8') for text in corpus]
+    headers = {'Content-Type': 'application/json'}
+
+    next_index = [0]
+    index_lock = threading.Lock()
+    latencies = []
+    errors = [0]
+
+    def worker():
+        connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+        local_latencies = []
+        local_errors = 0
+        while True:
+            with index_lock:
+                i = next_index[0]
+                if i >= requests_count:
+                    break
+                next_index[0] += 1
+
+            start = time.perf_counter()
+            try:
+                connection.request('POST', path, bodies[i % len(bodies)], headers)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status == 200
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                ok = False
+            if ok:
+                local_latencies.append(time.perf_counter() - start)
+            else:
+                local_errors += 1
+
+        connection.close()
+        with index_lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+
+    return dict(summarize_latencies(latencies, errors[0], elapsed), concurrency=concurrency)
+
+def micro_benchmark(corpus, repeats=5):
+    """
+    Time analyze_sentiment directly (result cache disabled)
+    Returns: best and median microseconds per call over repeats passes
+    """
+    cache_enabled = app.config['RESULT_CACHE_ENABLED']
+    app.config['RESULT_CACHE_ENABLED'] = False
+    configure_result_cache()
+    try:
+        analyze_sentiment("warm up")
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for text in corpus:
+                analyze_sentiment(text)
+            timings.append((time.perf_counter() - start) / len(corpus) * 1e6)
+    finally:
+        app.config['RESULT_CACHE_ENABLED'] = cache_enabled
+        configure_result_cache()
+
+    return {
+        'documents': len(corpus),
+        'repeats': repeats,
+        'best_us': round(min(timings), 2),
+        'median_us': round(statistics.median(timings), 2),
+    }
+
+def start_local_server(with_cache=False):
+    """Serve app.py on a free local port in a background thread, return its URL"""
+    from werkzeug.serving import make_server
+
+    app.config['RESULT_CACHE_ENABLED'] = with_cache
+    configure_result_cache()
+    # Per-request access logging would dominate the measurements
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+def git_commit():
+    """Short hash of the checked-out commit, or None outside a git checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def environment():
+    """Details that make results comparable (or explain why they are not)"""
+    return {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+def compare(baseline, current, max_regression):
+    """
+    Print the change of every metric against a baseline run
+    Returns: list of regressions worse than max_regression percent
+    """
+    regressions = []
+
+    def check(label, old, new, higher_is_better):
+        if not old:
+            return
+        change = (new - old) / old * 100
+        worse = -change if higher_is_better else change
+        flag = ''
+        if worse > max_regression:
+            flag = '  <-- REGRESSION'
+            regressions.append(label)
+        print(f"{label:32s} {old:10.2f} -> {new:10.2f} ({change:+6.1f}%){flag}")
+
+    print("-" * 60)
+    print(f"Compared with {baseline['environment'].get('commit') or 'baseline'}")
+
+    old_runs = {run['concurrency']: run for run in baseline.get('load', [])}
+    for run in current.get('load', []):
+        old = old_runs.get(run['concurrency'])
+        if old:
+            prefix = f"c={run['concurrency']}"
+            check(f"{prefix} requests/sec", old['requests_per_sec'], run['requests_per_sec'], True)
+            for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+                check(f"{prefix} {key}", old[key], run[key], False)
+
+    if 'micro' in baseline and 'micro' in current:
+        check("analyze_sentiment best us", baseline['micro']['best_us'], current['micro']['best_us'], False)
+
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the sentiment API and benchmark analyze_sentiment")
+    parser.add_argument('--url', help="base URL of a running server (default: start one locally)")
+    parser.add_argument('--corpus-size', type=int, default=1000, help="number of synthetic texts")
+    parser.add_argument('--profile', choices=sorted(LENGTH_PROFILES), default='mixed', help="text length distribution")
+    parser.add_argument('--seed', type=int, default=42, help="corpus random seed")
+    parser.add_argument('--concurrency', default='1,4,16', help="comma-separated concurrency levels")
+    parser.add_argument('--requests', type=int, default=2000, help="requests per concurrency level")
+    parser.add_argument('--with-cache', action='store_true', help="keep the result cache on in the local server")
+    parser.add_argument('--skip-load', action='store_true', help="only run the micro-benchmark")
+    parser.add_argument('--output', help="write results as JSON to this file")
+    parser.add_argument('--compare', help="compare against results from an earlier --output")
+    parser.add_argument('--max-regression', type=float, default=10.0,
+                        help="percent change treated as a regression with --compare (default: 10)")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.corpus_size, args.profile, args.seed)
+    lengths = sorted(len(text) for text in corpus)
+    results = {
+        'environment': environment(),
+        'corpus': {
+            'size': len(corpus),
+            'profile': args.profile,
+            'seed': args.seed,
+            'median_chars': lengths[len(lengths) // 2],
+            'p95_chars': percentile(lengths, 0.95),
+        },
+        'load': [],
+    }
+
+    print("=" * 60)
+    print(f"SENTIMENT LOAD TEST ({len(corpus)} '{args.profile}' texts, "
+          f"median {results['corpus']['median_chars']} chars)")
+    print("=" * 60)
+
+    if not args.skip_load:
+        server = None
+        url = args.url
+        if not url:
+            url, server = start_local_server(args.with_cache)
+        print(f"Target: {url}")
+        # Untimed warm-up so the first level does not pay for lazy loading
+        run_load(url, corpus, 1, min(50, args.requests))
+        print(f"{'concurrency':>11} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+
+        try:
+            for concurrency in (int(level) for level in args.concurrency.split(',')):
+                run = run_load(url, corpus, concurrency, args.requests)
+                results['load'].append(run)
+                print(f"{concurrency:>11} {run['requests_per_sec']:>10.1f} {run['p50_ms']:>9.2f} "
+                      f"{run['p95_ms']:>9.2f} {run['p99_ms']:>9.2f} {run['errors']:>7}")
+        finally:
+            if server is not None:
+                server.shutdown()
+
+    results['micro'] = micro_benchmark(corpus)
+    print("-" * 60)
+    print(f"analyze_sentiment: {results['micro']['best_us']:.1f} us/doc best, "
+          f"{results['micro']['median_us']:.1f} us/doc median")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('corpus') != results['corpus']:
+            print("⚠️ Corpus settings differ from the baseline; numbers are not directly comparable")
+        regressions = compare(baseline, results, args.max_regression)
+        if regressions:
+            print(f"❌ {len(regressions)} metric(s) regressed by more than {args.max_regression}%")
+            sys.exit(1)
+        print("✅ No regressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Long-document sentiment analysis
+
+Splits a document into sentences as its text streams in, scores the
+sentences in small batches and folds the results into running,
+length-weighted aggregates. Only the current partial sentence, one batch
+of sentences and (up to a cap) the per-sentence results are held in
+memory, so documents far beyond the single-text limit can be analyzed in
+one request.
+"""
+
+import codecs
+import re
+
+# Sentence ends: terminal punctuation (plus closing quotes/brackets)
+# followed by whitespace, or a blank line
+SENTENCE_BOUNDARY = re.compile(r'[.!?]+["\'\)\]]*\s+|\n\s*\n')
+
+def iter_sentences(chunks, max_sentence_length=5000):
+    """
+    Yield (start_offset, sentence) for the text arriving in chunks
+    Sentences longer than max_sentence_length are cut at the last
+    whitespace before the limit, so the buffer never grows past it.
+    """
+    buffer = ''
+    offset = 0  # character offset of buffer[0] in the document
+
+    for chunk in chunks:
+        buffer += chunk
+        position = 0
+        while True:
+            match = SENTENCE_BOUNDARY.search(buffer, position)
+            if (match is not None and match.end() < len(buffer)
+                    and match.start() - position <= max_sentence_length):
+                end, next_start = match.start() + len(match.group().rstrip()), match.end()
+            elif len(buffer) - position > max_sentence_length:
+                cut = buffer.rfind(' ', position, position + max_sentence_length)
+                end = next_start = cut if cut > position else position + max_sentence_length
+            else:
+                break
+
+            sentence = buffer[position:end]
+            stripped = sentence.strip()
+            if stripped:
+                yield offset + position + (len(sentence) - len(sentence.lstrip())), stripped
+            position = next_start
+
+        buffer = buffer[position:]
+        offset += position
+
+    stripped = buffer.strip()
+    if stripped:
+        yield offset + (len(buffer) - len(buffer.lstrip())), stripped
+
+def iter_decoded(byte_chunks, encoding='utf-8'):
+    """Decode a stream of byte chunks without splitting multi-byte characters"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    for chunk in byte_chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+class DocumentAggregator:
+    """Running length-weighted sentiment aggregates over scored sentences"""
+
+    def __init__(self, max_details=5000):
+        self.max_details = max_details
+        self.sentences = []
+        self.sentence_count = 0
+        self.characters = 0
+        self.weighted_polarity = 0.0
+        self.weighted_subjectivity = 0.0
+        self.polarity_total = 0.0
+        self.counts = {'Positive': 0, 'Negative': 0, 'Neutral': 0}
+
+    def add(self, start, length, result):
+        """Fold one scored sentence into the aggregates"""
+        polarity = result['polarity']
+        subjectivity = result['subjectivity']
+
+        self.sentence_count += 1
+        self.characters += length
+        self.weighted_polarity += polarity * length
+        self.weighted_subjectivity += subjectivity * length
+        self.polarity_total += polarity
+        self.counts[result['sentiment']] += 1
+
+        if len(self.sentences) < self.max_details:
+            self.sentences.append({
+                'index': self.sentence_count - 1,
+                'start': start,
+                'length': length,
+                'sentiment': result['sentiment'],
+                'polarity': polarity,
+                'subjectivity': subjectivity
+            })
+
+    def summary(self, classify):
+        """Return the aggregate result, classifying the weighted polarity with classify"""
+        weight = self.characters or 1
+        polarity = self.weighted_polarity / weight
+        subjectivity = self.weighted_subjectivity / weight
+
+        return {
+            'sentiment': classify(polarity),
+            'polarity': round(polarity, 3),
+            'subjectivity': round(subjectivity, 3),
+            'polarity_percentage': round((polarity + 1) * 50, 1),
+            'subjectivity_percentage': round(subjectivity * 100, 1),
+            'mean_polarity': round(self.polarity_total / (self.sentence_count or 1), 3),
+            'sentence_count': self.sentence_count,
+            'characters': self.characters,
+            'sentiment_counts': self.counts,
+            'sentences': self.sentences,
+            'sentences_truncated': self.sentence_count > len(self.sentences)
+        }
+
+def analyze_document(chunks, score_batch, classify, batch_size=64, max_details=5000,
+                     max_sentence_length=5000):
+    """
+    Analyze a document given as an iterable of text chunks
+    score_batch takes a list of sentences and returns a list of result dicts.
+    Returns: aggregate result dict with per-sentence details
+    """
+    aggregator = DocumentAggregator(max_details)
+    pending = []
+
+    def flush():
+        for (start, sentence), result in zip(pending, score_batch([s for _, s in pending])):
+            if 'error' not in result:
+                aggregator.add(start, len(sentence), result)
+        pending.clear()
+
+    for start, sentence in iter_sentences(chunks, max_sentence_length):
+        pending.append((start, sentence))
+        if len(pending) >= batch_size:
+            flush()
+    flush()
+
+    return aggregator.summary(classify)
@@ -0,0 +1,193 @@
+"""
+Prometheus-style metrics for the Sentiment Analysis Web Application
+
+A small, dependency-free registry of counters and histograms rendered in
+the Prometheus text exposition format. Recording a value is a dict lookup,
+a bisect and a few additions under a lock, so it is cheap enough to keep
+enabled in production.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bounds in seconds for request and stage latencies
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Upper bounds in characters for submitted texts
+TEXT_LENGTH_BUCKETS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 100000)
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = 'counter'
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            yield f'{self.name}{_format_labels(self.labels, label_values)} {_format_number(value)}'
+
+class Histogram:
+    """Cumulative histogram with fixed buckets and optional labels"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, description, buckets, labels=()):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.labels = labels
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, *label_values):
+        entry = self._values.get(label_values)
+        return entry[2] if entry else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, [list(counts), total, count]) for key, (counts, total, count) in self._values.items())
+        for label_values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                yield f'{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(self.labels, label_values)} {_format_number(total)}'
+            yield f'{self.name}_count{_format_labels(self.labels, label_values)} {count}'
+
+class Registry:
+    """Collection of metrics rendered together on /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, description, labels=()):
+        return self.register(Counter(name, description, labels))
+
+    def histogram(self, name, description, buckets, labels=()):
+        return self.register(Histogram(name, description, buckets, labels))
+
+    def add_collector(self, collect):
+        """Register a callable returning extra [(name, kind, description, value)] at render time"""
+        self._collectors.append(collect)
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.description}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        for collect in self._collectors:
+            for name, kind, description, value in collect():
+                lines.append(f'# HELP {name} {description}')
+                lines.append(f'# TYPE {name} {kind}')
+                lines.append(f'{name} {_format_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+class SentimentMetrics:
+    """The metrics recorded by the sentiment app"""
+
+    def __init__(self):
+        self.registry = Registry()
+        self.requests = self.registry.counter(
+            'sentiment_requests_total', 'HTTP requests by route and status code', ('route', 'status'))
+        self.errors = self.registry.counter(
+            'sentiment_errors_total', 'HTTP requests answered with a 4xx or 5xx status', ('route',))
+        self.request_seconds = self.registry.histogram(
+            'sentiment_request_seconds', 'Total request latency', LATENCY_BUCKETS, ('route',))
+        self.stage_seconds = self.registry.histogram(
+            'sentiment_stage_seconds', 'Latency per request stage (parse, validate, score, serialize)',
+            LATENCY_BUCKETS, ('route', 'stage'))
+        self.text_length = self.registry.histogram(
+            'sentiment_text_length_chars', 'Length of submitted texts in characters', TEXT_LENGTH_BUCKETS)
+
+    def observe_request(self, route, status, seconds):
+        self.requests.inc(route, str(status))
+        if status >= 400:
+            self.errors.inc(route)
+        self.request_seconds.observe(seconds, route)
+
+    def observe_text_length(self, length):
+        self.text_length.observe(length)
+
+    def timer(self, route):
+        return StageTimer(self, route)
+
+    def render(self):
+        return self.registry.render()
+
+class StageTimer:
+    """
+    Lap timer for one request: each mark() records the time since the
+    previous mark (or the start of the request) under the given stage
+    """
+
+    def __init__(self, metrics, route):
+        self.metrics = metrics
+        self.route = route
+        self.start = self.last = time.perf_counter()
+        self.last_stage = None
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.metrics.stage_seconds.observe(now - self.last, self.route, stage)
+        self.last = now
+        self.last_stage = stage
+
+    def finish(self, status):
+        """Record serialization time (if scoring happened) and the request totals"""
+        if self.last_stage == 'score':
+            self.mark('serialize')
+        self.metrics.observe_request(self.route, status, time.perf_counter() - self.start)
+
+class NullTimer:
+    """Stand-in timer used when metrics are disabled"""
+
+    def mark(self, stage):
+        pass
+
+    def finish(self, status):
+        pass
@@ -0,0 +1,143 @@
+"""
+Cached page rendering and fingerprinted static assets
+
+The index page is mostly static. PageRenderer renders templates/index.html
+once with placeholders, keeps the pieces of the resulting shell, and per
+request only renders the small result fragment (templates/_result.html)
+and splices it in. The plain shell gets an ETag so browsers can revalidate
+it with a conditional GET.
+
+AssetManifest serves CSS/JS from static/ under URLs that embed a digest of
+the file contents (/assets/css/app.1a2b3c4d.css), so they can be cached by
+browsers and proxies for a year and change URL whenever they change.
+"""
+
+import hashlib
+import mimetypes
+import os
+import threading
+
+from markupsafe import Markup, escape
+
+# A year, the longest max-age caches reliably honour
+ASSET_MAX_AGE = 365 * 24 * 3600
+
+# The page shell is revalidated on every view, with its ETag
+PAGE_CACHE_CONTROL = 'no-cache'
+
+TEXT_SLOT = Markup('<!--slot:text-->')
+RESULT_SLOT = Markup('<!--slot:result-->')
+
+def content_digest(data):
+    """Short hex digest used for asset fingerprints and ETags"""
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+class AssetManifest:
+    """Fingerprinted URLs for the files in a static folder, contents held in memory"""
+
+    def __init__(self, folder, url_prefix='/assets/'):
+        self.folder = folder
+        self.url_prefix = url_prefix
+        # filename -> (digest, body, content type)
+        self._assets = {}
+        self._lock = threading.Lock()
+
+    def _load(self, filename):
+        asset = self._assets.get(filename)
+        if asset is None:
+            path = os.path.join(self.folder, filename)
+            with open(path, 'rb') as f:
+                body = f.read()
+            content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            if content_type.startswith('text/') or content_type == 'application/javascript':
+                content_type += '; charset=utf-8'
+            asset = (content_digest(body), body, content_type)
+            with self._lock:
+                self._assets[filename] = asset
+        return asset
+
+    def url(self, filename):
+        """Fingerprinted URL for a file in the static folder (e.g. 'css/app.css')"""
+        digest = self._load(filename)[0]
+        stem, extension = os.path.splitext(filename)
+        return f"{self.url_prefix}{stem}.{digest}{extension}"
+
+    def lookup(self, path):
+        """
+        Resolve a fingerprinted path (relative to url_prefix)
+        Returns: (body, content type, Cache-Control value, ETag) or None if there is no such file.
+        A stale fingerprint (from a page rendered before a deploy) still gets
+        the current file, but it is not cached for long.
+        """
+        stem, extension = os.path.splitext(path)
+        stem, _, digest = stem.rpartition('.')
+        filename = stem + extension
+        if not stem or '..' in filename.split('/') or filename.startswith('/'):
+            return None
+
+        try:
+            current_digest, body, content_type = self._load(filename)
+        except OSError:
+            return None
+
+        if digest == current_digest:
+            return body, content_type, f'public, max-age={ASSET_MAX_AGE}, immutable', current_digest
+        return body, content_type, 'public, max-age=60', current_digest
+
+    def clear(self):
+        """Forget cached files and digests (after editing assets in development)"""
+        with self._lock:
+            self._assets.clear()
+
+class PageRenderer:
+    """Renders the index page from a cached shell plus a per-request fragment"""
+
+    def __init__(self, jinja_env, template='index.html', fragment='_result.html', enabled=True):
+        self.jinja_env = jinja_env
+        self.template = template
+        self.fragment = fragment
+        self.enabled = enabled
+        self._shell = None
+        self._lock = threading.Lock()
+
+    def _render_shell(self):
+        """Render the page with placeholders and split it around them"""
+        html = self.jinja_env.get_template(self.template).render(text_slot=TEXT_SLOT, result_slot=RESULT_SLOT)
+        before_text, rest = html.split(TEXT_SLOT, 1)
+        between, after_result = rest.split(RESULT_SLOT, 1)
+        empty = (before_text + between + after_result).encode('utf-8')
+        return before_text, between, after_result, empty, content_digest(empty)
+
+    def shell(self):
+        """The cached shell, rendered on first use (or every time when disabled)"""
+        if not self.enabled:
+            return self._render_shell()
+
+        if self._shell is None:
+            with self._lock:
+                if self._shell is None:
+                    self._shell = self._render_shell()
+        return self._shell
+
+    def empty_page(self):
+        """
+        The page without a result
+        Returns: (HTML bytes, ETag)
+        """
+        _, _, _, body, etag = self.shell()
+        return body, etag
+
+    def render(self, result=None, error=None):
+        """Return the page HTML with the text box and result fragment filled in"""
+        if result is None and error is None:
+            return self.empty_page()[0].decode('utf-8')
+
+        before_text, between, after_result, _, _ = self.shell()
+        text = escape(result['text']) if result and 'text' in result else ''
+        fragment = self.jinja_env.get_template(self.fragment).render(result=result, error=error)
+        return ''.join((before_text, text, between, fragment, after_result))
+
+    def clear(self):
+        """Drop the cached shell so the next request renders it again"""
+        with self._lock:
+            self._shell = None
@@ -0,0 +1,173 @@
+"""
+Cheap pre-scoring checks for texts that cannot get a meaningful score
+
+The pattern lexicon only knows English, so a text in another language,
+a text with nothing to score (emoji, numbers, punctuation) or a known
+piece of boilerplate ("Sent from my iPhone") always comes out Neutral,
+after the full tokenize-and-score pass. Prefilter.check() spots these
+with a hash lookup, a character scan and a stopword count, so the app can
+answer them straight away with a flagged result. A text that contains
+any word of the English lexicon is always scored, whatever its language
+looks like.
+"""
+
+import hashlib
+import re
+import unicodedata
+
+import lexicon_scorer
+
+# Texts that are never worth scoring, compared after normalize()
+DEFAULT_BOILERPLATE = (
+    'Sent from my iPhone',
+    'Sent from my Android device',
+    'Sent from my mobile',
+    'Lorem ipsum dolor sit amet',
+    'N/A',
+    'None',
+    'No comment',
+    'No comments',
+    'Nothing to add',
+    'asdf',
+    'This review was collected as part of a promotion.',
+)
+
+# Frequent, distinctive function words; a Latin-script text is taken as
+# the language whose words it uses most (English on a tie or no evidence).
+# Words that also occur in English text ('as', 'do', 'la', 'de', 'per',
+# 'die', 'Las Vegas', ...) are left out of the other languages' lists.
+STOPWORDS = {
+    'en': frozenset('the and is are was were this that with for have not but you very it of to'.split()),
+    'es': frozenset('es pero muy que para por una esto está también más fue'.split()),
+    'fr': frozenset('sont mais très que avec une cette nous vous aussi était'.split()),
+    'de': frozenset('der das ist sind aber sehr und für nicht ein eine auch ich'.split()),
+    'it': frozenset('il gli è sono molto che una questo della anche perché'.split()),
+    'pt': frozenset('é são mas muito que para uma não isso você também'.split()),
+    'nl': frozenset('een zijn maar zeer voor niet ik ook heel'.split()),
+}
+
+# Stopword -> languages using it, so each word is looked up once
+STOPWORD_LANGUAGES = {}
+for _language, _words in STOPWORDS.items():
+    for _word in _words:
+        STOPWORD_LANGUAGES.setdefault(_word, []).append(_language)
+
+# Language guessed from the script of a text's letters
+SCRIPT_LANGUAGES = {
+    'CYRILLIC': 'ru', 'ARABIC': 'ar', 'HEBREW': 'he', 'GREEK': 'el', 'DEVANAGARI': 'hi',
+    'THAI': 'th', 'HANGUL': 'ko', 'HIRAGANA': 'ja', 'KATAKANA': 'ja', 'CJK': 'zh',
+}
+
+# Another language needs at least this many stopword hits to win
+MIN_STOPWORD_HITS = 2
+
+# Only the start of a long text is looked at
+SAMPLE_CHARS = 300
+
+# Stripped from words before the stopword lookup
+WORD_PUNCTUATION = '.,;:!?¡¿"\'()[]«»'
+
+def normalize(text):
+    """Lowercase words only, single-spaced, so trivial variations hash the same"""
+    return ' '.join(re.findall(r'\w+', text.lower()))
+
+def text_digest(text):
+    """Digest of a normalized text, for the boilerplate set"""
+    return hashlib.blake2b(normalize(text).encode('utf-8'), digest_size=8).digest()
+
+def detect_language(text):
+    """
+    Guess the language of text from its script and stopwords
+    Returns: ISO 639-1 code ('other' for unknown scripts), or None when it has no letters
+    """
+    sample = text[:SAMPLE_CHARS]
+
+    if not sample.isascii():
+        letters = 0
+        scripts = {}
+        for char in sample:
+            if char.isalpha():
+                letters += 1
+                if ord(char) > 0x24F:  # beyond Latin Extended-B
+                    script = unicodedata.name(char, 'OTHER').split()[0]
+                    scripts[script] = scripts.get(script, 0) + 1
+        if not letters:
+            return None
+        if sum(scripts.values()) * 2 > letters:
+            return SCRIPT_LANGUAGES.get(max(scripts, key=scripts.get), 'other')
+
+    words = sample.lower().split()
+    if not words:
+        return None
+
+    hits = dict.fromkeys(STOPWORDS, 0)
+    get = STOPWORD_LANGUAGES.get
+    for word in words:
+        languages = get(word.strip(WORD_PUNCTUATION))
+        if languages is not None:
+            for language in languages:
+                hits[language] += 1
+
+    best = max(hits, key=hits.get)
+    if best != 'en' and hits[best] >= MIN_STOPWORD_HITS and hits[best] > hits['en']:
+        return best
+    return 'en'
+
+def has_english_words(text):
+    """True if any word of text is in the English lexicon"""
+    lexicon = lexicon_scorer.tables()[0]
+    return any(word.strip(WORD_PUNCTUATION) in lexicon for word in text.lower().split())
+
+def has_signal(text):
+    """True if text has letters or a known emoticon, i.e. something the lexicon could score"""
+    if any(char.isalpha() for char in text):
+        return True
+    emoticons = lexicon_scorer.tables()[1]
+    return any(token.lower() in emoticons for token in text.split())
+
+class Prefilter:
+    """Flags texts to answer without scoring: boilerplate, no signal, unsupported language"""
+
+    def __init__(self, languages=('en',), boilerplate=DEFAULT_BOILERPLATE, enabled=True):
+        self.languages = frozenset(languages)
+        self.enabled = enabled
+        self._boilerplate = set()
+        # Longer texts cannot be boilerplate and are not hashed
+        self._max_boilerplate_length = 0
+        self.add_boilerplate(boilerplate)
+
+    def add_boilerplate(self, texts):
+        """Add known boilerplate texts (matched after normalize())"""
+        for text in texts:
+            if normalize(text):
+                self._boilerplate.add(text_digest(text))
+                self._max_boilerplate_length = max(self._max_boilerplate_length, 2 * len(text) + 16)
+
+    def check(self, text):
+        """
+        Decide whether text needs scoring
+        Returns: None to score it, or (reason, detected language or None) where
+        reason is 'boilerplate', 'no_signal' or 'unsupported_language'
+        """
+        if not self.enabled:
+            return None
+
+        if len(text) <= self._max_boilerplate_length and text_digest(text) in self._boilerplate:
+            return 'boilerplate', None
+
+        if not has_signal(text):
+            return 'no_signal', None
+
+        language = detect_language(text)
+        if language is not None and language not in self.languages:
+            # Stopword guesses go wrong on short or mixed texts; the lexicon can score these
+            if 'en' in self.languages and has_english_words(text):
+                return None
+            return 'unsupported_language', language
+
+        return None
+
+def read_boilerplate(path):
+    """Boilerplate texts from a file, one per line (blank lines and # comments skipped)"""
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
@@ -0,0 +1,300 @@
+"""
+Sampled request tracing for finding slow requests in production
+
+While profiling is on, a random fraction of scoring requests is traced:
+every request stage (parse, validate, score, serialize) and every call
+into the sentiment engine (the time spent inside TextBlob, or whichever
+engine scores the text) is recorded as a span, and a background thread
+samples the traced request's Python stack every few milliseconds. A
+traced request that turns out slower than the threshold leaves a report
+with its route, status, input size, spans and the stacks it spent its
+time in (folded, flame-graph style). Reports never contain the texts.
+
+Requests that are not sampled pay one attribute check and one random
+number. The stack sampler only runs while a traced request is in flight,
+and profiling switches itself off after a set duration, so it is safe to
+turn on briefly in production.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Seconds between stack samples of a traced request
+SAMPLE_INTERVAL = 0.005
+
+# Innermost frames kept per stack sample
+MAX_STACK_DEPTH = 48
+
+# Distinct stacks listed in a report, most sampled first
+MAX_REPORT_STACKS = 20
+
+# The report file is not appended to beyond this size
+MAX_REPORT_FILE_BYTES = 64 * 1024 * 1024
+
+# Trace of the request being handled in this thread (or asyncio task)
+_current = contextvars.ContextVar('sentiment_trace', default=None)
+
+def current_trace():
+    """The trace of the request being handled here, or None when it is not sampled"""
+    return _current.get()
+
+def activate(trace):
+    """Make trace the current trace for this thread or task (None clears it)"""
+    _current.set(trace)
+
+class span:
+    """Context manager recording the time inside it as a span of the current trace, if any"""
+
+    def __init__(self, name):
+        self.name = name
+        self.trace = None
+
+    def __enter__(self):
+        self.trace = _current.get()
+        if self.trace is not None:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.trace is not None:
+            self.trace.add_span(self.name, time.perf_counter() - self.started)
+        return False
+
+def collapse_stack(frame, max_depth=MAX_STACK_DEPTH):
+    """A frame's call stack as 'file.py:function' entries, outermost first, joined by ';'"""
+    names = []
+    while frame is not None and len(names) < max_depth:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+class Trace:
+    """Spans and stack samples of one sampled request"""
+
+    def __init__(self, route, input_bytes=None):
+        self.route = route
+        self.input_bytes = input_bytes
+        self.started = self.last = time.perf_counter()
+        self.last_stage = None
+        self.spans = {}  # name -> [seconds, calls]
+        self.texts = 0
+        self.longest_text = 0
+        self.threads = set()
+        self.stacks = {}  # collapsed stack -> samples
+
+    def mark(self, stage):
+        """Record the time since the previous mark (or the start) as the stage's span"""
+        now = time.perf_counter()
+        self.add_span(stage, now - self.last)
+        self.last = now
+        self.last_stage = stage
+
+    def add_span(self, name, seconds):
+        entry = self.spans.get(name)
+        if entry is None:
+            self.spans[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def add_text(self, length):
+        """Count a scored text of the given length"""
+        self.texts += 1
+        if length > self.longest_text:
+            self.longest_text = length
+
+    def add_stack(self, stack):
+        self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def enter(self):
+        """Trace this thread: make the trace current and sample the thread's stack"""
+        activate(self)
+        self.threads.add(threading.get_ident())
+
+    def exit(self):
+        self.threads.discard(threading.get_ident())
+        activate(None)
+
+    def call(self, func, *args):
+        """Run func(*args) in this thread as part of the trace (for executor threads)"""
+        self.enter()
+        try:
+            return func(*args)
+        finally:
+            self.exit()
+
+    def report(self, status, seconds):
+        """Return the slow-request report for this trace as a dict"""
+        stacks = sorted(self.stacks.items(), key=lambda item: item[1], reverse=True)
+        return {
+            'time': round(time.time(), 3),
+            'route': self.route,
+            'status': status,
+            'duration_ms': round(seconds * 1000, 3),
+            'input_bytes': self.input_bytes,
+            'texts': self.texts,
+            'longest_text': self.longest_text,
+            'spans': {name: {'ms': round(total * 1000, 3), 'calls': calls}
+                      for name, (total, calls) in self.spans.items()},
+            'stack_samples': sum(self.stacks.values()),
+            'stacks': [{'stack': stack, 'samples': samples} for stack, samples in stacks[:MAX_REPORT_STACKS]]
+        }
+
+class Profiler:
+    """Samples requests into traces and keeps reports of the slow ones"""
+
+    def __init__(self, sample_rate=0.01, slow_ms=500, report_path='', duration=0, max_reports=100,
+                 interval=SAMPLE_INTERVAL):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.report_path = report_path
+        self.duration = duration  # seconds until profiling switches itself off, 0 = never
+        self.interval = interval
+        self.enabled = False
+        self.until = None
+        self.sampled = 0
+        self.slow = 0
+        self.reports = deque(maxlen=max_reports)
+        self._active = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._sampler = None
+
+    def enable(self, sample_rate=None, duration=None):
+        """Start sampling requests, for duration seconds (the configured duration if None)"""
+        with self._lock:
+            if sample_rate is not None:
+                self.sample_rate = sample_rate
+            duration = self.duration if duration is None else duration
+            self.until = time.time() + duration if duration else None
+            self.enabled = True
+        logger.info(f"Profiling enabled: sampling {self.sample_rate:.1%} of requests"
+                    + (f" for {duration}s" if duration else ''))
+
+    def disable(self):
+        """Stop sampling requests (traces in flight still finish)"""
+        with self._lock:
+            self.enabled = False
+            self.until = None
+
+    def is_enabled(self):
+        """True while profiling is on, switching it off once its duration is over"""
+        if self.enabled and self.until is not None and time.time() >= self.until:
+            self.disable()
+            logger.info("Profiling disabled: duration elapsed")
+        return self.enabled
+
+    def start(self, route, input_bytes=None):
+        """
+        Decide whether to trace a request
+        Returns: a new Trace, or None when the request is not sampled
+        """
+        if not self.enabled or random.random() >= self.sample_rate or not self.is_enabled():
+            return None
+
+        trace = Trace(route, input_bytes)
+        with self._lock:
+            self.sampled += 1
+            self._active.add(trace)
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_stacks, name='profiler', daemon=True)
+                self._sampler.start()
+            self._wake.set()
+        return trace
+
+    def finish(self, trace, status):
+        """
+        End a trace; a slow one is kept and written to the report file
+        Returns: the report dict, or None if the request was fast enough
+        """
+        seconds = time.perf_counter() - trace.started
+        with self._lock:
+            self._active.discard(trace)
+        if seconds * 1000 < self.slow_ms:
+            return None
+
+        report = trace.report(status, seconds)
+        with self._lock:
+            self.slow += 1
+            self.reports.append(report)
+        self._write(report)
+        return report
+
+    def _write(self, report):
+        """Append a report to the report file as one JSON line"""
+        if not self.report_path:
+            return
+        try:
+            with self._file_lock:
+                if os.path.exists(self.report_path) and os.path.getsize(self.report_path) >= MAX_REPORT_FILE_BYTES:
+                    return
+                with open(self.report_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(report) + '\n')
+        except OSError as e:
+            logger.error(f"Error writing profiling report: {str(e)}")
+
+    def stats(self):
+        """Return a dict with the profiler settings and counters"""
+        enabled = self.is_enabled()
+        return {
+            'enabled': enabled,
+            'sample_rate': self.sample_rate,
+            'slow_ms': self.slow_ms,
+            'seconds_left': round(max(0.0, self.until - time.time()), 1) if enabled and self.until else None,
+            'sampled': self.sampled,
+            'slow': self.slow,
+            'in_flight': len(self._active)
+        }
+
+    def _sample_stacks(self):
+        """Sampler thread: record the stacks of traced threads while traces are in flight"""
+        while True:
+            self._wake.wait()
+            with self._lock:
+                active = list(self._active)
+                if not active:
+                    self._wake.clear()
+                    continue
+
+            frames = sys._current_frames()
+            for trace in active:
+                for thread_id in list(trace.threads):
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        trace.add_stack(collapse_stack(frame))
+            del frames, active
+            time.sleep(self.interval)
+
+class TracedTimer:
+    """Stage timer that also records the stages of a sampled request in its trace"""
+
+    def __init__(self, timer, trace, profiler):
+        self.timer = timer
+        self.trace = trace
+        self.profiler = profiler
+
+    def mark(self, stage):
+        self.timer.mark(stage)
+        self.trace.mark(stage)
+
+    def finish(self, status):
+        self.timer.finish(status)
+        if self.trace.last_stage == 'score':
+            self.trace.mark('serialize')
+        try:
+            self.profiler.finish(self.trace, status)
+        except Exception as e:
+            # Profiling never fails a request
+            logger.error(f"Error finishing request trace: {str(e)}")
@@ -0,0 +1,141 @@
+"""
+Per-client rate limiting and admission control
+
+RateLimiter is a token bucket per client (a configured API key, or the
+client address for everyone else): each request takes a token, tokens refill at a fixed rate
+up to a burst size, and a client with an empty bucket gets 429 with a
+Retry-After telling it when the next token is due. ConcurrencyLimiter caps
+the number of scoring requests in flight in this process and sheds the rest
+with 503 right away, instead of queueing them behind slow work.
+
+Buckets live in memory by default (per process). RedisBackend shares them
+across processes and hosts; any client object with a redis-py compatible
+eval() can be passed in (the tests run the script with fakeredis).
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+
+def refill(tokens, updated, now, rate, burst, cost):
+    """
+    Token bucket arithmetic shared by every backend
+    Returns: (allowed, tokens left, seconds until cost tokens are available)
+    """
+    tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+    if tokens >= cost:
+        return True, tokens - cost, 0.0
+    return False, tokens, (cost - tokens) / rate
+
+class MemoryBackend:
+    """Token buckets in a bounded in-process dict (least recently seen clients are dropped first)"""
+
+    def __init__(self, max_keys=100000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        # key -> (tokens, updated)
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, cost=1):
+        """Take cost tokens from key's bucket; returns (allowed, tokens left, retry after)"""
+        now = self.clock()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            allowed, tokens, retry_after = refill(tokens, updated, now, rate, burst, cost)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, tokens, retry_after
+
+# Same arithmetic as refill(), run atomically inside Redis with its own clock
+REDIS_TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+class RedisBackend:
+    """Token buckets shared through Redis (or anything with a compatible eval())"""
+
+    def __init__(self, client, prefix='sentiment:ratelimit:'):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        """Connect with redis-py (pip install redis)"""
+        import redis
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def take(self, key, rate, burst, cost=1):
+        """Take cost tokens from key's bucket; returns (allowed, tokens left, retry after)"""
+        allowed, tokens, retry_after = self.client.eval(REDIS_TAKE_SCRIPT, 1, self.prefix + key, rate, burst, cost)
+        return bool(int(allowed)), float(tokens), float(retry_after)
+
+class RateLimiter:
+    """Token bucket rate limit per client key"""
+
+    def __init__(self, rate, burst, backend=None):
+        self.rate = rate
+        self.burst = burst
+        self.backend = backend or MemoryBackend()
+        self.limited = 0
+
+    def check(self, key, cost=1):
+        """
+        Charge a request to key's bucket
+        Returns: (allowed, headers to add to the response)
+        """
+        allowed, tokens, retry_after = self.backend.take(key, self.rate, self.burst, cost)
+        headers = {'X-RateLimit-Limit': str(self.burst), 'X-RateLimit-Remaining': str(int(tokens))}
+        if not allowed:
+            self.limited += 1
+            headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return allowed, headers
+
+class ConcurrencyLimiter:
+    """Caps requests in flight; callers that do not get a slot are shed immediately"""
+
+    def __init__(self, max_in_flight):
+        self.max_in_flight = max_in_flight
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self.shed = 0
+
+    def acquire(self):
+        """Take a slot without waiting; returns False when the limit is reached"""
+        if self._slots.acquire(blocking=False):
+            return True
+        self.shed += 1
+        return False
+
+    def release(self):
+        self._slots.release()
+
+def client_key(api_key, remote_addr, known_keys=()):
+    """
+    Bucket key for a request: its API key when that is one of known_keys,
+    its address otherwise. Unknown keys are ignored, or a client could get
+    a fresh bucket on every request just by changing the header.
+    """
+    if api_key and api_key in known_keys:
+        return f"key:{api_key}"
+    return f"ip:{remote_addr or 'unknown'}"
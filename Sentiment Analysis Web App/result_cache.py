@@ -0,0 +1,119 @@
+"""
+Bounded LRU/TTL cache for sentiment analysis results
+
+Entries are keyed on a digest of the normalized text and capped both by
+entry count and by (approximate) byte size. Hit, miss, eviction and
+expiration counters are kept for monitoring.
+"""
+
+import hashlib
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+def normalize_text(text):
+    """
+    Normalize text for cache lookups
+    Only changes that cannot affect the score are applied: surrounding
+    whitespace and Windows line endings. Case and inner whitespace are
+    kept because the tokenizer treats them differently.
+    """
+    return text.strip().replace('\r\n', '\n')
+
+def text_key(text):
+    """Return the cache key (a 16-byte digest) for the given text"""
+    return hashlib.blake2b(normalize_text(text).encode('utf-8'), digest_size=16).digest()
+
+def _entry_size(key, value):
+    """Approximate memory used by one cache entry, in bytes"""
+    size = sys.getsizeof(key) + sys.getsizeof(value)
+    for item_key, item_value in value.items():
+        size += sys.getsizeof(item_key) + sys.getsizeof(item_value)
+    return size
+
+class ResultCache:
+    """Thread-safe LRU cache with optional time-to-live"""
+
+    def __init__(self, max_entries=10000, max_bytes=16 * 1024 * 1024, ttl=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        # key -> (value, size, expires_at)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, text):
+        """Return the cached result for text, or None"""
+        key = text_key(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, size, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, text, value):
+        """Store a result for text, evicting least recently used entries if needed"""
+        key = text_key(text)
+        size = _entry_size(key, value)
+        if size > self.max_bytes:
+            return
+
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        """Remove all entries (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Return a dict of cache counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
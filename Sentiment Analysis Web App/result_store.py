@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Persistent, content-addressed store of sentiment analysis results
+
+Results live in a SQLite file keyed by the same text digest as the
+in-process result cache, so they survive deploys and are shared by every
+worker process on the machine (WAL mode: many readers, one writer).
+Every entry is tagged with the engine version; when the scorer or its
+lexicon changes, old entries simply stop matching and can be purged.
+
+Usage:
+    python result_store.py precompute results.db reviews.ndjson --text-field review
+    python result_store.py stats results.db
+    python result_store.py purge results.db
+"""
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# Add the current directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from result_cache import text_key
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    version TEXT NOT NULL,
+    key BLOB NOT NULL,
+    result TEXT NOT NULL,
+    PRIMARY KEY (version, key)
+) WITHOUT ROWID
+"""
+
+# SQLite limits the number of parameters in one statement
+LOOKUP_CHUNK = 500
+
+class ResultStore:
+    """SQLite-backed result store shared by processes, versioned by engine"""
+
+    def __init__(self, path, version, timeout=5.0):
+        self.path = path
+        self.version = version
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+        connection = self._connection()
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute(SCHEMA)
+        connection.commit()
+
+    def _connection(self):
+        """One connection per thread (and per process after a fork)"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, text):
+        """Return the stored result for text, or None"""
+        return self.get_many([text])[0]
+
+    def get_many(self, texts):
+        """
+        Look up many texts in as few queries as possible
+        Returns: list of result dicts (None where missing) in input order
+        """
+        keys = [text_key(text) for text in texts]
+        found = {}
+        connection = self._connection()
+        for i in range(0, len(keys), LOOKUP_CHUNK):
+            chunk = keys[i:i + LOOKUP_CHUNK]
+            rows = connection.execute(
+                f"SELECT key, result FROM results WHERE version = ? AND key IN ({','.join('?' * len(chunk))})",
+                [self.version] + chunk
+            )
+            found.update(rows)
+
+        results = [json.loads(found[key]) if key in found else None for key in keys]
+        hits = len(results) - results.count(None)
+        with self._lock:
+            self.hits += hits
+            self.misses += len(results) - hits
+        return results
+
+    def put_many(self, items):
+        """Store (text, result) pairs in one transaction"""
+        rows = [(self.version, text_key(text), json.dumps(result)) for text, result in items]
+        if not rows:
+            return
+
+        connection = self._connection()
+        with connection:
+            connection.executemany('INSERT OR REPLACE INTO results (version, key, result) VALUES (?, ?, ?)', rows)
+        with self._lock:
+            self.writes += len(rows)
+
+    def put(self, text, result):
+        """Store the result for one text"""
+        self.put_many([(text, result)])
+
+    def count(self, all_versions=False):
+        """Number of stored results for this version (or for every version)"""
+        if all_versions:
+            query, params = 'SELECT COUNT(*) FROM results', ()
+        else:
+            query, params = 'SELECT COUNT(*) FROM results WHERE version = ?', (self.version,)
+        return self._connection().execute(query, params).fetchone()[0]
+
+    def purge_stale(self):
+        """
+        Delete results written by other engine versions
+        Returns: number of deleted entries
+        """
+        connection = self._connection()
+        with connection:
+            deleted = connection.execute('DELETE FROM results WHERE version != ?', (self.version,)).rowcount
+        connection.execute('VACUUM')
+        return deleted
+
+    def stats(self):
+        """Return a dict of store counters and size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            counters = {
+                'hits': self.hits,
+                'misses': self.misses,
+                'writes': self.writes,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+        return dict(counters, path=self.path, version=self.version, entries=self.count())
+
+    def close(self):
+        """Close this thread's connection"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+def read_texts(path, text_field):
+    """Yield texts from an NDJSON file (text_field), a CSV file (column) or plain text (one per line)"""
+    with open(path, encoding='utf-8', newline='') as f:
+        if path.lower().endswith('.csv'):
+            for row in csv.DictReader(f):
+                yield row.get(text_field)
+        elif path.lower().endswith(('.ndjson', '.jsonl')):
+            for line in f:
+                if line.strip():
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    yield record.get(text_field) if isinstance(record, dict) else record
+        else:
+            for line in f:
+                yield line.rstrip('\r\n')
+
+def precompute(store, texts, chunk_size=1000, progress=True):
+    """
+    Score every text not yet in the store and save the results
+    Returns: (texts seen, texts scored)
+    """
+    from app import score_texts, validate_text
+
+    seen = scored = 0
+    started = time.perf_counter()
+    chunk = []
+
+    def flush():
+        nonlocal scored
+        missing = [text for text, result in zip(chunk, store.get_many(chunk)) if result is None]
+        missing = list(dict.fromkeys(missing))
+        results = score_texts(missing)
+        store.put_many((text, {key: value for key, value in result.items() if key != 'text'})
+                       for text, result in zip(missing, results) if 'error' not in result)
+        scored += len(missing)
+        chunk.clear()
+        if progress:
+            rate = seen / (time.perf_counter() - started)
+            print(f"\r{seen} texts, {scored} scored ({rate:.0f} texts/sec)", end='', file=sys.stderr)
+
+    for text in texts:
+        if not isinstance(text, str) or validate_text(text.strip()):
+            continue
+        seen += 1
+        chunk.append(text.strip())
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+
+    if progress:
+        print(file=sys.stderr)
+    return seen, scored
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the persistent sentiment result store")
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    precompute_parser = subcommands.add_parser('precompute', help="score a corpus into the store")
+    precompute_parser.add_argument('store', help="SQLite store file")
+    precompute_parser.add_argument('input', help="corpus: .ndjson/.jsonl, .csv or plain text (one text per line)")
+    precompute_parser.add_argument('--text-field', default='text', help="field/column holding the text (default: text)")
+    precompute_parser.add_argument('--chunk-size', type=int, default=1000, help="texts per transaction")
+
+    stats_parser = subcommands.add_parser('stats', help="show entry counts")
+    stats_parser.add_argument('store', help="SQLite store file")
+
+    purge_parser = subcommands.add_parser('purge', help="delete results from other engine versions")
+    purge_parser.add_argument('store', help="SQLite store file")
+
+    args = parser.parse_args()
+
+    from app import result_version, warm_up
+
+    store = ResultStore(args.store, result_version())
+
+    if args.command == 'precompute':
+        warm_up()
+        seen, scored = precompute(store, read_texts(args.input, args.text_field), args.chunk_size)
+        print(f"✅ {seen} texts, {scored} newly scored into {args.store}")
+    elif args.command == 'stats':
+        print(f"Version:        {store.version}")
+        print(f"Current:        {store.count()} results")
+        print(f"All versions:   {store.count(all_versions=True)} results")
+    elif args.command == 'purge':
+        print(f"✅ Deleted {store.purge_stale()} stale results")
+
+if __name__ == "__main__":
+    main()
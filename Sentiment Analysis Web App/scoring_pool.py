@@ -0,0 +1,114 @@
+"""
+Multi-process scoring pool for sentiment analysis
+
+Sentiment scoring is pure Python and CPU-bound, so a single Flask worker
+is capped at one core by the GIL. ScoringPool spreads scoring across a
+ProcessPoolExecutor sized to the available cores, warms each worker up
+(lexicon loaded) at startup and rejects new work when too many chunks
+are already queued, so callers can shed load instead of piling up.
+
+score_fn is pickled by reference, so under the spawn start method (the
+default on Windows and macOS) each worker imports its module: use a
+function from a light module such as engines.EngineScorer, not one
+defined in the web app.
+"""
+
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import lexicon_scorer
+
+class PoolBusyError(Exception):
+    """Raised when the scoring pool queue is full"""
+
+def available_cores():
+    """Number of CPU cores this process may run on"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def is_worker_process():
+    """
+    True inside a process started by multiprocessing, including while a
+    spawned child re-runs the main script as __mp_main__ (before it knows
+    its parent). Elsewhere __mp_main__ is either missing or an alias of __main__.
+    """
+    if multiprocessing.parent_process() is not None:
+        return True
+    main = sys.modules.get('__main__')
+    return sys.modules.get('__mp_main__', main) is not main
+
+def _warm_up():
+    """Worker initializer: load the lexicon before the first request arrives"""
+    lexicon_scorer.load_lexicon()
+
+def _worker_ready():
+    """No-op task used to make sure a worker process has started"""
+    return os.getpid()
+
+def _score_chunk(score_fn, texts):
+    """Score a chunk of texts inside a worker process"""
+    return [score_fn(text) for text in texts]
+
+class ScoringPool:
+    """Process pool that scores texts with score_fn, with bounded queueing"""
+
+    def __init__(self, score_fn, workers=None, max_pending=None, chunk_size=64, timeout=30, mp_context=None):
+        self.score_fn = score_fn
+        self.workers = workers or available_cores()
+        self.max_pending = max_pending or self.workers * 4
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=mp_context, initializer=_warm_up)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+
+    def warm_up(self):
+        """Start every worker process and wait until each has loaded the lexicon"""
+        futures = [self._executor.submit(_worker_ready) for _ in range(self.workers)]
+        return sorted({future.result(timeout=self.timeout) for future in futures})
+
+    def submit(self, texts, block=False):
+        """
+        Queue one chunk and return its future
+        Raises PoolBusyError if the queue is full, unless block is True,
+        in which case it waits for a free slot.
+        """
+        if not self._slots.acquire(blocking=block):
+            raise PoolBusyError("Scoring pool is busy, please retry shortly")
+
+        try:
+            future = self._executor.submit(_score_chunk, self.score_fn, texts)
+        except Exception:
+            self._slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def map(self, texts):
+        """
+        Score texts across the pool
+        Returns: list of results in input order
+        """
+        futures = []
+        try:
+            for i in range(0, len(texts), self.chunk_size):
+                futures.append(self.submit(texts[i:i + self.chunk_size]))
+        except PoolBusyError:
+            for future in futures:
+                future.cancel()
+            raise
+
+        results = []
+        for future in futures:
+            results.extend(future.result(timeout=self.timeout))
+        return results
+
+    def shutdown(self):
+        """Stop all worker processes"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
@@ -1,3 +1,4 @@
+import importlib.util
 import sys
 import os
 
@@ -9,20 +10,15 @@ print("Starting Sentiment Analysis Web Application...")
 print("Current directory:", current_dir)
 
 try:
-    # Test imports
-    from flask import Flask
-    from textblob import TextBlob
-    print("✅ Required packages imported successfully")
-    
-    # Test TextBlob
-    blob = TextBlob("This is a test.")
-    print(f"✅ TextBlob test: {blob.sentiment}")
-    
-    # Import and run the app
+    # Import the app; TextBlob/NLTK load on a background warm-up thread,
+    # so the server starts right away and /readyz reports when it is warm
     from app import app
+    if importlib.util.find_spec('textblob') is None:
+        raise ImportError("No module named 'textblob'")
     print("✅ Flask app imported successfully")
     print("\n🚀 Starting web server...")
     print("Open your browser and go to: http://localhost:5000")
+    print("Readiness: http://localhost:5000/readyz")
     print("Press Ctrl+C to stop the server")
     
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,50 @@
+// Character counter
+const textInput = document.getElementById('textInput');
+const charCounter = document.getElementById('charCounter');
+
+textInput.addEventListener('input', function() {
+    const length = this.value.length;
+    charCounter.textContent = `${length}/5000`;
+
+    if (length > 4500) {
+        charCounter.style.color = '#dc3545';
+    } else if (length > 4000) {
+        charCounter.style.color = '#ffc107';
+    } else {
+        charCounter.style.color = '#6c757d';
+    }
+});
+
+// Initialize character counter
+if (textInput.value) {
+    textInput.dispatchEvent(new Event('input'));
+}
+
+// Form submission with loading state
+document.getElementById('sentimentForm').addEventListener('submit', function() {
+    document.getElementById('loading').style.display = 'block';
+    document.getElementById('analyzeBtn').disabled = true;
+});
+
+// Show examples modal
+function showExamples() {
+    new bootstrap.Modal(document.getElementById('examplesModal')).show();
+}
+
+// Use example text
+function useExample(element) {
+    textInput.value = element.textContent.trim().replace(/"/g, '');
+    textInput.dispatchEvent(new Event('input'));
+    bootstrap.Modal.getInstance(document.getElementById('examplesModal')).hide();
+}
+
+// Make example texts clickable
+document.querySelectorAll('.example-text').forEach(function(element) {
+    element.style.cursor = 'pointer';
+    element.addEventListener('mouseenter', function() {
+        this.style.backgroundColor = '#e9ecef';
+    });
+    element.addEventListener('mouseleave', function() {
+        this.style.backgroundColor = '';
+    });
+});
@@ -6,13 +6,44 @@ This script tests the sentiment analysis functionality with various examples.
 
 import sys
 import os
+import asyncio
+import csv
+import gzip
+import io
+import json
+import multiprocessing
+import re
+import tempfile
+import time
 
 # Add the current directory to the Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 try:
     from textblob import TextBlob
-    from app import analyze_sentiment
+    import fast_json
+    from compression import choose_encoding
+    from rate_limit import MemoryBackend, RateLimiter, RedisBackend, client_key
+    import lexicon_scorer
+    from labelled_cases import SENTIMENT_TEST_CASES
+    from result_cache import ResultCache
+    from result_store import ResultStore, precompute
+    from scoring_pool import ScoringPool, PoolBusyError, is_worker_process
+    from bulk_score import bulk_score
+    from asgi_app import application
+    import asgi_app
+    from long_document import iter_sentences
+    from load_test import make_corpus, percentile, run_load, start_local_server
+    from app import app
+    from app import analyze_sentiment, analyze_batch, configure_result_cache, configure_result_store, warm_up
+    from app import configure_admission_control, configure_engines, configure_jobs, score_job_chunk
+    from jobs import JobQueue, JobWorkers
+    from aspects import AspectMatcher, analyze_aspects
+    from prefilter import Prefilter, detect_language
+    from app import configure_prefilter, configure_profiling
+    from profiling import Profiler
+    from engines import CascadeEngine, HashedLinearEngine, LexiconEngine, calibrate_margin, classify
+    import app as sentiment_app
 except ImportError as e:
     print(f"Error importing required modules: {e}")
     print("Please make sure you have installed the requirements:")
@@ -22,49 +53,7 @@ except ImportError as e:
 def test_sentiment_analysis():
     """Test the sentiment analysis function with various examples."""
     
-    test_cases = [
-        # Positive examples
-        {
-            'text': "I absolutely love this new product! It's amazing and works perfectly.",
-            'expected_sentiment': 'Positive'
-        },
-        {
-            'text': "What a beautiful day! I'm feeling great and excited about the future.",
-            'expected_sentiment': 'Positive'
-        },
-        {
-            'text': "This is the best thing that has ever happened to me!",
-            'expected_sentiment': 'Positive'
-        },
-        
-        # Negative examples
-        {
-            'text': "This is terrible! I hate how complicated everything is.",
-            'expected_sentiment': 'Negative'
-        },
-        {
-            'text': "I'm really disappointed and frustrated with this service.",
-            'expected_sentiment': 'Negative'
-        },
-        {
-            'text': "This product is awful and completely useless.",
-            'expected_sentiment': 'Negative'
-        },
-        
-        # Neutral examples
-        {
-            'text': "The meeting is scheduled for tomorrow at 3 PM.",
-            'expected_sentiment': 'Neutral'
-        },
-        {
-            'text': "Python is a programming language used for web development.",
-            'expected_sentiment': 'Neutral'
-        },
-        {
-            'text': "The weather report shows 20 degrees Celsius.",
-            'expected_sentiment': 'Neutral'
-        }
-    ]
+    test_cases = SENTIMENT_TEST_CASES
     
     print("=" * 60)
     print("SENTIMENT ANALYSIS TEST RESULTS")
@@ -164,6 +153,974 @@ def test_edge_cases():
         except Exception as e:
             print(f"❌ Unhandled error: {str(e)}")
 
+def test_batch_analysis():
+    """Test batch analysis returns per-item results and errors in input order."""
+    
+    print("\n" + "=" * 60)
+    print("BATCH ANALYSIS TESTS")
+    print("=" * 60)
+    
+    texts = [
+        "I absolutely love this new product!",
+        "",
+        "This product is awful and completely useless.",
+        42,
+        "I absolutely love this new product!",
+    ]
+    
+    results = analyze_batch(texts)
+    
+    assert [item['index'] for item in results] == list(range(len(texts)))
+    assert results[0]['sentiment'] == 'Positive'
+    assert 'error' in results[1]
+    assert results[2]['sentiment'] == 'Negative'
+    assert 'error' in results[3]
+    assert results[4]['polarity'] == results[0]['polarity']
+    
+    for item in results:
+        status = f"❌ {item['error']}" if 'error' in item else f"✅ {item['sentiment']}"
+        print(f"Item {item['index']}: {status}")
+    
+    # A chunked body has no Content-Length: the limit applies to the bytes read
+    client = app.test_client()
+    chunked = {'headers': {'Transfer-Encoding': 'chunked'}, 'environ_overrides': {'wsgi.input_terminated': True}}
+    body = json.dumps(["I absolutely love this new product!"] * 40000).encode('utf-8')
+    response = client.post('/api/analyze/batch', input_stream=io.BytesIO(body),
+                           content_type='application/json', **chunked)
+    assert response.status_code == 413
+    response = client.post('/api/analyze/batch', input_stream=io.BytesIO(json.dumps(texts[:1]).encode('utf-8')),
+                           content_type='application/json', **chunked)
+    assert response.status_code == 200 and response.get_json()['count'] == 1
+    response = client.post('/api/analyze/document', input_stream=io.BytesIO(b'Great day. ' * 200000),
+                           content_type='text/plain', **chunked)
+    assert response.status_code == 413
+    print(f"✅ Chunked bodies over the byte limit rejected: {response.status_code}")
+
+def test_lexicon_scorer_matches_textblob():
+    """Test the precompiled lexicon scorer gives the same scores as TextBlob."""
+    
+    print("\n" + "=" * 60)
+    print("LEXICON SCORER VS TEXTBLOB")
+    print("=" * 60)
+    
+    texts = [
+        "I absolutely love this new product! It's amazing and works perfectly.",
+        "This is not a good idea, it's really not bad either.",
+        "I'm really disappointed and frustrated with this service.",
+        "Very very good!!! :) <3",
+        "It was great (!) as always...",
+        "The weather report shows 20 degrees Celsius.",
+        "NEVER buy this. Absolutely terrible, terribly slow.",
+        "",
+    ]
+    
+    for text in texts:
+        expected = TextBlob(text).sentiment
+        polarity, subjectivity = lexicon_scorer.score(text)
+        
+        assert abs(polarity - expected.polarity) < 1e-6, text
+        assert abs(subjectivity - expected.subjectivity) < 1e-6, text
+        print(f"✅ {text[:50]!r}: polarity={polarity:.3f}, subjectivity={subjectivity:.3f}")
+
+def test_result_cache():
+    """Test LRU eviction, byte limits and TTL expiry of the result cache."""
+    
+    print("\n" + "=" * 60)
+    print("RESULT CACHE TESTS")
+    print("=" * 60)
+    
+    cache = ResultCache(max_entries=2)
+    cache.put("first", {'sentiment': 'Positive'})
+    cache.put("second", {'sentiment': 'Negative'})
+    assert cache.get("  first  ") == {'sentiment': 'Positive'}  # normalized key
+    cache.put("third", {'sentiment': 'Neutral'})  # evicts "second", the LRU entry
+    assert cache.get("second") is None
+    assert cache.get("first") is not None
+    assert cache.stats()['evictions'] == 1
+    print(f"✅ LRU eviction: {cache.stats()}")
+    
+    cache = ResultCache(max_entries=100, max_bytes=1000)
+    for i in range(20):
+        cache.put(f"text {i}", {'sentiment': 'Neutral'})
+    assert cache.stats()['bytes'] <= 1000
+    assert len(cache) < 20
+    print(f"✅ Byte limit: {len(cache)} entries, {cache.stats()['bytes']} bytes")
+    
+    cache = ResultCache(ttl=-1)  # every entry is already expired
+    cache.put("stale", {'sentiment': 'Neutral'})
+    assert cache.get("stale") is None
+    assert cache.stats()['expirations'] == 1
+    print("✅ TTL expiry")
+
+def test_scoring_pool():
+    """Test the scoring pool keeps input order and sheds load when full."""
+    
+    print("\n" + "=" * 60)
+    print("SCORING POOL TESTS")
+    print("=" * 60)
+    
+    pool = ScoringPool(lexicon_scorer.score, workers=2, chunk_size=2)
+    try:
+        texts = ["good", "bad", "great", "awful", "fine"]
+        assert pool.map(texts) == [lexicon_scorer.score(text) for text in texts]
+        print(f"✅ Results in input order from {len(pool.warm_up())} workers")
+    finally:
+        pool.shutdown()
+    
+    pool = ScoringPool(time.sleep, workers=1, max_pending=1, chunk_size=1)
+    try:
+        pool.map([0.5, 0.5])
+        assert False, "expected PoolBusyError"
+    except PoolBusyError as e:
+        print(f"✅ Backpressure: {e}")
+    finally:
+        pool.shutdown()
+    
+    # Spawned workers (Windows, macOS) import only the scorer's module, not the app
+    pool = ScoringPool(sentiment_app.pool_scorer(), workers=1, chunk_size=2,
+                       mp_context=multiprocessing.get_context('spawn'))
+    try:
+        texts = ["I absolutely love this new product!", "This product is awful and completely useless.", "ok"]
+        assert pool.map(texts) == [sentiment_app.compute_sentiment(text) for text in texts]
+        # eval is a builtin, so it runs in the worker without importing anything
+        probe = "('app' in __import__('sys').modules, len(__import__('multiprocessing').active_children()), " \
+                "__import__('scoring_pool').is_worker_process())"
+        imported_app, children, in_worker = pool._executor.submit(eval, probe).result(timeout=30)
+        # Run as a script, this file is the main module and spawn re-imports it (and so the app)
+        assert children == 0 and (not imported_app or __name__ == '__main__')
+        assert in_worker and not is_worker_process()
+        print("✅ Spawned workers score without importing the app or starting pools of their own")
+    finally:
+        pool.shutdown()
+
+def test_bulk_score():
+    """Test bulk scoring of an NDJSON file, including resuming from a checkpoint."""
+    
+    print("\n" + "=" * 60)
+    print("BULK SCORING TESTS")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, 'reviews.ndjson')
+        output_path = os.path.join(tmp, 'scored.ndjson')
+        texts = ["I love it", "I hate it", "It is a chair", ""] * 5
+        with open(input_path, 'w') as f:
+            for i, text in enumerate(texts):
+                f.write(json.dumps({'id': i, 'text': text}) + '\n')
+        
+        count = bulk_score(input_path, output_path, workers=1, chunk_size=3, progress=False)
+        with open(output_path) as f:
+            rows = [json.loads(line) for line in f]
+        assert count == len(texts)
+        assert [row['id'] for row in rows] == list(range(len(texts)))
+        assert rows[0]['sentiment'] == 'Positive' and rows[1]['sentiment'] == 'Negative'
+        assert 'error' in rows[3]
+        print(f"✅ Scored {count} records in input order")
+        
+        # Pretend the run crashed after the first two chunks
+        with open(output_path + '.checkpoint') as f:
+            checkpoint = json.load(f)
+        with open(input_path, 'rb') as f:
+            lines = f.readlines()
+        checkpoint['input_offset'] = sum(len(line) for line in lines[:6])
+        checkpoint['output_offset'] = len(''.join(json.dumps(row) + '\n' for row in rows[:6]).encode('utf-8'))
+        checkpoint['records'] = 6
+        with open(output_path + '.checkpoint', 'w') as f:
+            json.dump(checkpoint, f)
+        
+        count = bulk_score(input_path, output_path, workers=1, chunk_size=3, resume=True, progress=False)
+        with open(output_path) as f:
+            resumed = [json.loads(line) for line in f]
+        assert count == len(texts) - 6
+        assert resumed == rows
+        print(f"✅ Resumed and scored the remaining {count} records")
+        
+        # A line that is not valid UTF-8 becomes an error record, in both formats
+        for name, content in (('bad.ndjson', b'{"text": "I love it"}\n{"text": "caf\xe9 is awful"}\n{"text": "I hate it"}\n'),
+                              ('bad.csv', b'id,text\n1,I love it\n2,caf\xe9 is awful\n3,I hate it\n')):
+            input_path = os.path.join(tmp, name)
+            output_path = os.path.join(tmp, 'scored-' + name)
+            with open(input_path, 'wb') as f:
+                f.write(content)
+            count = bulk_score(input_path, output_path, workers=1, chunk_size=2, progress=False)
+            with open(output_path, encoding='utf-8') as f:
+                if name.endswith('.csv'):
+                    rows = list(csv.DictReader(f))
+                    assert rows[1]['id'] == '2'
+                else:
+                    rows = [json.loads(line) for line in f]
+                    assert rows[1]['raw'] == '{"text": "caf\ufffd is awful"}'
+            assert count == 3 and len(rows) == 3
+            assert rows[0]['sentiment'] == 'Positive' and rows[2]['sentiment'] == 'Negative'
+            assert rows[1]['error'] and not rows[1].get('sentiment')
+        print("✅ Lines that are not valid UTF-8 are reported as errors, not fatal")
+
+def call_asgi(method, path, body=b'', content_type='application/json', headers=()):
+    """Send one request through the ASGI app, return (status, headers, body)"""
+    path, _, query = path.partition('?')
+    scope = {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query.encode(),
+        'client': ('127.0.0.1', 50000),
+        'headers': [(b'content-type', content_type.encode())] + list(headers)
+    }
+    messages = []
+    
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+    
+    async def send(message):
+        messages.append(message)
+    
+    asyncio.run(application(scope, receive, send))
+    return messages[0]['status'], dict(messages[0]['headers']), messages[1]['body']
+
+def test_asgi_app():
+    """Test the ASGI serving mode keeps the Flask routes' contracts."""
+    
+    print("\n" + "=" * 60)
+    print("ASGI APP TESTS")
+    print("=" * 60)
+    
+    status, _, body = call_asgi('POST', '/api/analyze', b'{"text": "I love this!"}')
+    assert status == 200 and json.loads(body)['sentiment'] == 'Positive'
+    print(f"✅ POST /api/analyze: {status}")
+    
+    status, _, body = call_asgi('POST', '/api/analyze', b'{"text": "   "}')
+    assert status == 400 and json.loads(body)['error'] == 'Text cannot be empty'
+    print(f"✅ Empty text rejected: {status}")
+    
+    status, headers, body = call_asgi('POST', '/analyze', b'text=I+hate+this', 'application/x-www-form-urlencoded')
+    assert status == 200 and headers[b'content-type'].startswith(b'text/html') and b'Negative' in body
+    print(f"✅ Form POST /analyze renders HTML: {status}")
+    
+    # A busy scoring pool gives both front ends the same page, with a 503
+    def busy(text, engine=None):
+        raise PoolBusyError("Scoring pool is busy, please retry shortly")
+    original = sentiment_app.analyze_sentiment
+    asgi_app.analyze_sentiment = sentiment_app.analyze_sentiment = busy
+    try:
+        status, headers, body = call_asgi('POST', '/analyze', b'text=I+hate+this', 'application/x-www-form-urlencoded')
+        response = app.test_client().post('/analyze', data={'text': 'I hate this'})
+    finally:
+        asgi_app.analyze_sentiment = sentiment_app.analyze_sentiment = original
+    assert status == response.status_code == 503 and headers[b'retry-after'] == b'1'
+    assert headers[b'content-type'].startswith(b'text/html') and response.mimetype == 'text/html'
+    assert body == response.get_data() and b'Scoring pool is busy' in body
+    print(f"✅ Busy pool renders the same HTML page as Flask: {status}")
+    
+    status, _, body = call_asgi('POST', '/api/analyze/batch', b'["good", 5]')
+    assert status == 200 and json.loads(body)['errors'] == 1
+    print(f"✅ POST /api/analyze/batch: {status}")
+    
+    status, _, _ = call_asgi('GET', '/missing')
+    assert status == 404
+    print(f"✅ Unknown path: {status}")
+
+def test_metrics_endpoint():
+    """Test /metrics reports request counts and per-stage latency histograms."""
+    
+    print("\n" + "=" * 60)
+    print("METRICS TESTS")
+    print("=" * 60)
+    
+    client = app.test_client()
+    client.post('/api/analyze', json={'text': 'What a great day'})
+    client.post('/api/analyze', json={'text': ''})
+    
+    body = client.get('/metrics').get_data(as_text=True)
+    
+    assert 'sentiment_requests_total{route="/api/analyze",status="200"}' in body
+    assert 'sentiment_errors_total{route="/api/analyze"}' in body
+    for stage in ('parse', 'validate', 'score', 'serialize'):
+        assert f'sentiment_stage_seconds_count{{route="/api/analyze",stage="{stage}"}}' in body
+        print(f"✅ Stage histogram recorded: {stage}")
+    assert 'sentiment_text_length_chars_bucket{le="25"}' in body
+    print("✅ Text length distribution recorded")
+
+def test_long_document():
+    """Test sentence-level scoring of long documents."""
+    
+    print("\n" + "=" * 60)
+    print("LONG DOCUMENT TESTS")
+    print("=" * 60)
+    
+    document = "I love this product. The battery is terrible!\n\nIt arrived on Tuesday. " * 300
+    
+    sentences = list(iter_sentences([document]))
+    assert sentences[:3] == [(0, 'I love this product.'), (21, 'The battery is terrible!'),
+                             (47, 'It arrived on Tuesday.')]
+    assert all(document[start:start + len(s)] == s for start, s in sentences)
+    print(f"✅ Split into {len(sentences)} sentences with correct offsets")
+    
+    # Feeding the text in small chunks must give the same sentences
+    chunks = [document[i:i + 7] for i in range(0, len(document), 7)]
+    assert list(iter_sentences(chunks)) == sentences
+    print("✅ Chunked input gives the same sentences")
+    
+    long_run = "word " * 3000
+    assert all(len(s) <= 100 for _, s in iter_sentences([long_run], max_sentence_length=100))
+    print("✅ Sentences without punctuation are capped")
+    
+    client = app.test_client()
+    response = client.post('/api/analyze/document', data=document.encode('utf-8'), content_type='text/plain')
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data['sentence_count'] == 900 and len(data['sentences']) == 900
+    assert data['sentiment_counts'] == {'Positive': 300, 'Negative': 300, 'Neutral': 300}
+    print(f"✅ POST /api/analyze/document ({len(document)} chars): {data['sentiment']}, "
+          f"polarity {data['polarity']}")
+    
+    response = client.post('/api/analyze/document', json={'text': '   '})
+    assert response.status_code == 400
+    print(f"✅ Empty document rejected: {response.status_code}")
+    
+    status, _, body = call_asgi('POST', '/api/analyze/document', document.encode('utf-8'), 'text/plain')
+    assert status == 200 and json.loads(body)['polarity'] == data['polarity']
+    print(f"✅ ASGI mode agrees: {status}")
+
+def test_load_test():
+    """Test the load-testing suite's corpus, percentiles and load driver."""
+    
+    print("\n" + "=" * 60)
+    print("LOAD TEST SUITE TESTS")
+    print("=" * 60)
+    
+    corpus = make_corpus(200, 'short', seed=7)
+    assert corpus == make_corpus(200, 'short', seed=7)
+    assert len(set(corpus)) == 200
+    print(f"✅ Corpus is reproducible and unique ({len(corpus)} texts)")
+    
+    values = list(range(1, 101))
+    assert percentile(values, 0.50) == 50 and percentile(values, 0.99) == 99
+    print("✅ Nearest-rank percentiles")
+    
+    url, server = start_local_server()
+    try:
+        run = run_load(url, corpus, concurrency=2, requests_count=40)
+    finally:
+        server.shutdown()
+        app.config['RESULT_CACHE_ENABLED'] = True
+        configure_result_cache()
+    assert run['requests'] == 40 and run['errors'] == 0
+    assert run['p50_ms'] <= run['p95_ms'] <= run['p99_ms']
+    print(f"✅ Load run: {run['requests_per_sec']} req/s, p99 {run['p99_ms']} ms")
+
+def test_health_and_readiness():
+    """Test /healthz and /readyz before and after warm-up."""
+    
+    print("\n" + "=" * 60)
+    print("HEALTH AND READINESS TESTS")
+    print("=" * 60)
+    
+    client = app.test_client()
+    
+    response = client.get('/healthz')
+    assert response.status_code == 200 and response.get_json() == {'status': 'ok'}
+    print(f"✅ /healthz: {response.status_code}")
+    
+    assert warm_up()
+    response = client.get('/readyz')
+    assert response.status_code == 200 and response.get_json()['status'] == 'ready'
+    print(f"✅ /readyz after warm-up: {response.status_code}")
+    
+    sentiment_app.ready.clear()
+    try:
+        response = client.get('/readyz')
+        assert response.status_code == 503 and response.headers['Retry-After'] == '1'
+        print(f"✅ /readyz while warming up: {response.status_code}")
+        
+        status, _, body = call_asgi('GET', '/readyz')
+        assert status == 503
+    finally:
+        sentiment_app.ready.set()
+    
+    status, _, body = call_asgi('GET', '/readyz')
+    assert status == 200 and json.loads(body)['status'] == 'ready'
+    print(f"✅ ASGI /readyz: {status}")
+
+def test_result_store():
+    """Test the persistent result store and its use behind analyze_sentiment."""
+    
+    print("\n" + "=" * 60)
+    print("RESULT STORE TESTS")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'results.db')
+        
+        store = ResultStore(path, 'v1')
+        store.put_many([('good movie', {'polarity': 0.7}), ('bad movie', {'polarity': -0.7})])
+        assert store.get_many(['  good movie ', 'bad movie', 'other']) == [{'polarity': 0.7}, {'polarity': -0.7}, None]
+        print("✅ Stored results are found by normalized text")
+        
+        # Another process (or a new deploy) opening the same file sees them
+        assert ResultStore(path, 'v1').get('good movie') == {'polarity': 0.7}
+        print("✅ Results persist across store instances")
+        
+        newer = ResultStore(path, 'v2')
+        assert newer.get('good movie') is None
+        assert newer.purge_stale() == 2 and store.count(all_versions=True) == 0
+        print("✅ A new engine version invalidates and purges old results")
+        
+        app.config['RESULT_STORE_PATH'] = path
+        configure_result_store()
+        try:
+            first = analyze_sentiment('The store keeps this great result')
+            sentiment_app.result_cache.clear()
+            store = sentiment_app.result_store
+            hits = store.hits
+            assert analyze_sentiment('The store keeps this great result') == first
+            assert store.hits == hits + 1 and store.writes >= 1
+            print(f"✅ analyze_sentiment reads through the store (version {store.version})")
+            
+            seen, scored = precompute(store, ['Lovely day', 'Awful food', 'Lovely day', ''], progress=False)
+            assert (seen, scored) == (3, 2) and store.get('Awful food')['sentiment'] == 'Negative'
+            print("✅ Precomputing a corpus fills the store")
+        finally:
+            app.config['RESULT_STORE_PATH'] = ''
+            configure_result_store()
+
+def test_fast_json():
+    """Test the fast JSON codec and the lean JSON request path."""
+    
+    print("\n" + "=" * 60)
+    print(f"FAST JSON TESTS ({fast_json.BACKEND})")
+    print("=" * 60)
+    
+    data = {'text': 'Café ☕ is great', 'polarity': 0.8, 'items': [1, None, True]}
+    assert fast_json.loads(fast_json.dumps(data)) == data
+    assert fast_json.loads(json.dumps(data).encode('utf-8')) == data
+    try:
+        fast_json.loads(b'{not json')
+        assert False, "invalid JSON must raise ValueError"
+    except ValueError:
+        pass
+    print("✅ Round trip and invalid input")
+    
+    client = app.test_client()
+    response = client.post('/api/analyze', data='{"text": "Café food is wonderful"}'.encode('utf-8'),
+                           content_type='application/json')
+    assert response.status_code == 200 and response.get_json()['sentiment'] == 'Positive'
+    assert json.loads(response.get_data()) == response.get_json()
+    print(f"✅ /api/analyze: {response.status_code}")
+    
+    for path in ('/analyze', '/api/analyze'):
+        for body in (b'{broken', b'["not", "an", "object"]', b'{"text": 42}'):
+            response = client.post(path, data=body, content_type='application/json')
+            assert response.status_code == 400, (path, body, response.status_code)
+    print("✅ Malformed JSON bodies get 400")
+
+def test_page_cache():
+    """Test the cached index page shell, ETags and fingerprinted assets."""
+    
+    print("\n" + "=" * 60)
+    print("PAGE CACHE TESTS")
+    print("=" * 60)
+    
+    client = app.test_client()
+    
+    response = client.get('/')
+    etag = response.headers['ETag']
+    assert response.status_code == 200 and b'slot:' not in response.data
+    assert client.get('/', headers={'If-None-Match': etag}).status_code == 304
+    print(f"✅ GET / with ETag {etag}, conditional GET gets 304")
+    
+    asset_urls = re.findall(r'/assets/[^"]+', response.get_data(as_text=True))
+    assert len(asset_urls) == 2
+    for url in asset_urls:
+        asset_response = client.get(url)
+        assert asset_response.status_code == 200
+        assert 'immutable' in asset_response.headers['Cache-Control']
+    assert client.get('/assets/../app.py').status_code == 404
+    print(f"✅ Fingerprinted assets: {', '.join(asset_urls)}")
+    
+    response = client.post('/analyze', data={'text': 'I <b>love</b> this'})
+    html = response.get_data(as_text=True)
+    assert '>I &lt;b&gt;love&lt;/b&gt; this</textarea>' in html and 'Positive' in html
+    print("✅ Form result is spliced into the cached shell (escaped)")
+    
+    status, headers, _ = call_asgi('GET', '/', headers=[(b'if-none-match', etag.encode('latin-1'))])
+    assert status == 304
+    status, headers, _ = call_asgi('GET', asset_urls[0])
+    assert status == 200 and b'immutable' in headers[b'cache-control']
+    print("✅ ASGI mode serves the same page and assets")
+
+def test_compression():
+    """Test Accept-Encoding negotiation and compressed responses."""
+    
+    print("\n" + "=" * 60)
+    print("COMPRESSION TESTS")
+    print("=" * 60)
+    
+    assert choose_encoding('gzip, deflate') == 'gzip'
+    assert choose_encoding('gzip;q=0, identity') is None
+    assert choose_encoding('') is None
+    assert choose_encoding('*') in ('br', 'gzip')
+    print("✅ Accept-Encoding negotiation")
+    
+    client = app.test_client()
+    texts = [f"Review {i}: the service was great" for i in range(200)]
+    plain = client.post('/api/analyze/batch', json={'texts': texts})
+    response = client.post('/api/analyze/batch', json={'texts': texts}, headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip' and 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.get_data()) == plain.get_data()
+    print(f"✅ Batch response: {len(plain.get_data())} -> {len(response.get_data())} bytes")
+    
+    small = client.post('/api/analyze', json={'text': 'Nice'}, headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small.headers
+    print("✅ Responses under the size threshold are not compressed")
+    
+    page = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert page.headers['ETag'].startswith('W/')
+    assert client.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': page.headers['ETag']}).status_code == 304
+    print("✅ Compressed page gets a weak ETag that still revalidates")
+    
+    body = json.dumps({'texts': texts}).encode('utf-8')
+    status, headers, compressed = call_asgi('POST', '/api/analyze/batch', body,
+                                            headers=[(b'accept-encoding', b'gzip')])
+    assert status == 200 and headers[b'content-encoding'] == b'gzip'
+    assert json.loads(gzip.decompress(compressed)) == plain.get_json()
+    print("✅ ASGI mode compresses the same way")
+
+def test_admission_control():
+    """Test per-client rate limiting and the concurrency limit."""
+    
+    print("\n" + "=" * 60)
+    print("ADMISSION CONTROL TESTS")
+    print("=" * 60)
+    
+    clock = [0.0]
+    limiter = RateLimiter(rate=1.0, burst=2, backend=MemoryBackend(clock=lambda: clock[0]))
+    assert [limiter.check('a')[0] for _ in range(3)] == [True, True, False]
+    assert limiter.check('a')[1]['Retry-After'] == '1'
+    assert limiter.check('b')[0]
+    clock[0] += 1.0
+    assert limiter.check('a')[0]
+    print("✅ Token bucket: burst, refill and per-client buckets")
+    
+    # REDIS_TAKE_SCRIPT itself, run by fakeredis's Lua interpreter
+    try:
+        import fakeredis
+        redis = fakeredis.FakeRedis()
+        redis.eval("return 1", 0)
+    except Exception:
+        print("⚠️ fakeredis[lua] is not installed, the Redis token bucket script is untested")
+    else:
+        shared = RateLimiter(rate=20.0, burst=1, backend=RedisBackend(redis))
+        assert shared.check('a')[0]
+        allowed, headers = shared.check('a')
+        assert not allowed and headers['Retry-After'] == '1' and headers['X-RateLimit-Remaining'] == '0'
+        assert shared.check('b')[0]
+        time.sleep(0.1)  # two tokens' worth of refill, capped at the burst of 1
+        assert shared.check('a')[0] and not shared.check('a')[0]
+        assert 0 < redis.ttl('sentiment:ratelimit:a') <= 2
+        print("✅ Redis backend runs the token bucket script (fakeredis)")
+    
+    assert client_key('secret', '10.0.0.1', {'secret'}) == 'key:secret'
+    assert client_key('made-up', '10.0.0.1', {'secret'}) == client_key(None, '10.0.0.1') == 'ip:10.0.0.1'
+    print("✅ Unknown API keys are limited by address")
+    
+    client = app.test_client()
+    app.config.update(RATE_LIMIT_ENABLED=True, RATE_LIMIT_PER_SECOND=0.001, RATE_LIMIT_BURST=2, API_KEYS='other-client')
+    configure_admission_control()
+    try:
+        statuses = [client.post('/api/analyze', json={'text': 'Good'}).status_code for _ in range(3)]
+        response = client.post('/api/analyze', json={'text': 'Good'})
+        assert statuses == [200, 200, 429] and response.status_code == 429
+        assert int(response.headers['Retry-After']) >= 1
+        print(f"✅ Noisy client gets 429 (Retry-After {response.headers['Retry-After']}s)")
+        
+        # Rotating made-up keys does not get around the limit
+        statuses = [client.post('/api/analyze', json={'text': 'Good'}, headers={'X-API-Key': f'fake-{i}'}).status_code
+                    for i in range(3)]
+        assert statuses == [429, 429, 429]
+        print("✅ Made-up API keys share their address's bucket")
+        
+        response = client.post('/api/analyze', json={'text': 'Good'}, headers={'X-API-Key': 'other-client'})
+        assert response.status_code == 200 and response.headers['X-RateLimit-Remaining'] == '1'
+        assert client.get('/healthz').status_code == 200
+        print("✅ Other clients and non-scoring routes are not affected")
+        
+        status, headers, _ = call_asgi('POST', '/api/analyze', b'{"text": "Good"}')
+        assert status == 429 and b'retry-after' in headers
+        print(f"✅ ASGI mode: {status}")
+    finally:
+        app.config.update(RATE_LIMIT_ENABLED=False, API_KEYS='')
+        configure_admission_control()
+    
+    app.config['MAX_CONCURRENT_REQUESTS'] = 1
+    configure_admission_control()
+    try:
+        assert sentiment_app.concurrency_limiter.acquire()
+        response = client.post('/api/analyze', json={'text': 'Good'})
+        assert response.status_code == 503 and response.headers['Retry-After'] == '1'
+        sentiment_app.concurrency_limiter.release()
+        assert client.post('/api/analyze', json={'text': 'Good'}).status_code == 200
+        assert client.post('/api/analyze', json={'text': 'Good'}).status_code == 200
+        print("✅ Requests over the concurrency limit are shed with 503, slots are released")
+    finally:
+        app.config['MAX_CONCURRENT_REQUESTS'] = 0
+        configure_admission_control()
+
+def test_engines():
+    """Test the pluggable engines, the cascade and per-request engine selection."""
+    
+    print("\n" + "=" * 60)
+    print("SENTIMENT ENGINE TESTS")
+    print("=" * 60)
+    
+    lexicon, hashed = LexiconEngine(), HashedLinearEngine()
+    for case in SENTIMENT_TEST_CASES:
+        assert classify(hashed.score(case['text'])[0]) == case['expected_sentiment'], case['text']
+    assert hashed.score("not good")[0] < 0 < hashed.score("not bad")[0]
+    assert hashed.score("I don't like it")[0] == lexicon.score("I don't like it")[0]
+    assert hashed.score("The meeting is at 3 PM.") == (0.0, 0.0)
+    print(f"✅ Hashed model labels all {len(SENTIMENT_TEST_CASES)} test cases correctly and handles negation")
+    
+    cascade = CascadeEngine(hashed, lexicon, margin=0.05)
+    assert cascade.score("I love it")[0] == hashed.score("I love it")[0]
+    near = "This is very good but the last one was bad"
+    assert not cascade.is_confident(hashed.score(near)[0])
+    assert cascade.score(near) == lexicon.score(near)
+    assert cascade.stats()['answered'] == 1 and cascade.stats()['escalated'] == 1
+    print("✅ Cascade answers confident texts and escalates near-threshold ones")
+    
+    corpus = make_corpus(300, seed=3)
+    margin, agreement, escalation_rate = calibrate_margin(hashed, lexicon, corpus, target_agreement=0.98)
+    assert agreement >= 0.98 and escalation_rate < 1.0
+    assert calibrate_margin(hashed, lexicon, corpus, target_agreement=1.0)[1] == 1.0
+    print(f"✅ Calibrated margin {margin}: {agreement:.1%} agreement, {escalation_rate:.1%} escalated")
+    
+    client = app.test_client()
+    text = "Fresh text for the hashed engine: not bad at all"
+    response = client.post('/api/analyze?engine=hashed', json={'text': text})
+    assert response.status_code == 200
+    assert response.get_json()['polarity'] == round(hashed.score(text)[0], 3)
+    response = client.post('/api/analyze/batch?engine=cascade', json={'texts': [text, 'Great']})
+    assert response.status_code == 200 and response.get_json()['errors'] == 0
+    response = client.post('/api/analyze?engine=magic', json={'text': text})
+    assert response.status_code == 400 and 'Unknown engine' in response.get_json()['error']
+    status, _, body = call_asgi('POST', '/api/analyze?engine=hashed', json.dumps({'text': text}).encode())
+    assert status == 200 and json.loads(body)['polarity'] == round(hashed.score(text)[0], 3)
+    print("✅ Requests pick an engine with ?engine= (Flask and ASGI), unknown engines get 400")
+    
+    app.config['ENGINE'] = 'cascade'
+    configure_engines()
+    configure_result_cache()
+    try:
+        assert sentiment_app.result_version().startswith('cascade-0.05-hashed-')
+        assert client.post('/api/analyze', json={'text': 'Deployment-wide cascade'}).status_code == 200
+        print("✅ SENTIMENT_ENGINE switches the default engine and the result version")
+    finally:
+        app.config['ENGINE'] = 'lexicon'
+        configure_engines()
+        configure_result_cache()
+
+def test_jobs():
+    """Test the durable background job API."""
+    
+    print("\n" + "=" * 60)
+    print("BACKGROUND JOB TESTS")
+    print("=" * 60)
+    
+    # Job workers are only started by warm-up; drive them by hand here
+    warm_up()
+    client = app.test_client()
+    assert client.post('/api/jobs', json=['Good']).status_code == 404
+    print("✅ Job API is off until SENTIMENT_JOBS_PATH is set")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'jobs.db')
+        app.config.update(JOBS_PATH=path, JOBS_CHUNK_SIZE=2, JOBS_MAX_ACTIVE_PER_CLIENT=2,
+                          API_KEYS='other,asgi,webhook')
+        configure_jobs()
+        configure_admission_control()
+        try:
+            texts = ['I love it', 'I hate it', '', 42, 'The meeting is at 3 PM']
+            response = client.post('/api/jobs', json={'texts': texts})
+            assert response.status_code == 202
+            job = response.get_json()
+            assert job['status'] == 'queued' and job['total'] == 5
+            assert response.headers['Location'] == f"/api/jobs/{job['id']}"
+            assert client.post('/api/jobs?engine=hashed', json=['Fine']).status_code == 202
+            response = client.post('/api/jobs', json=['One too many'])
+            assert response.status_code == 429 and 'Too many active jobs' in response.get_json()['error']
+            assert client.post('/api/jobs', json=['Other client'], headers={'X-API-Key': 'other'}).status_code == 202
+            for fake_key in ('made-up-1', 'made-up-2'):
+                response = client.post('/api/jobs', json=['Rotated key'], headers={'X-API-Key': fake_key})
+                assert response.status_code == 429
+            print(f"✅ Jobs are queued with 202 and capped at 2 active jobs per client (unknown API keys count as the address)")
+            
+            # A restart: a new queue on the same file still has the jobs
+            restarted = JobQueue(path)
+            assert restarted.get(job['id'])['status'] == 'queued'
+            
+            # A worker that dies after one chunk: its job is resumed once the lease expires
+            crashed = JobQueue(path, lease=0.0)
+            assert crashed.claim('crashed-worker')['id'] == job['id']
+            first = crashed.pending(job['id'], 2)
+            crashed.save(job['id'], [(index, dict(result, index=index)) for (index, _), result
+                                     in zip(first, score_job_chunk([text for _, text in first], ''))])
+            time.sleep(0.01)
+            
+            notified = []
+            workers = JobWorkers(restarted, score_job_chunk, chunk_size=2,
+                                 notify=lambda url, payload: notified.append(payload))
+            while workers.run_once():
+                pass
+            status = client.get(f"/api/jobs/{job['id']}").get_json()
+            assert status['status'] == 'done' and status['processed'] == 5 and status['errors'] == 2
+            assert status['progress'] == 1.0
+            print(f"✅ Jobs survive a restart and resume after a worker dies ({status['processed']} processed)")
+            
+            page = client.get(f"/api/jobs/{job['id']}/results?offset=0&limit=3").get_json()
+            assert [item['index'] for item in page['results']] == [0, 1, 2] and page['next_offset'] == 3
+            assert page['results'][0]['sentiment'] == 'Positive' and 'error' in page['results'][2]
+            page = client.get(f"/api/jobs/{job['id']}/results?offset=3&limit=3").get_json()
+            assert page['results'][0]['error'] == 'Text must be a string' and page['next_offset'] is None
+            assert client.get('/api/jobs/missing').status_code == 404
+            print("✅ Results are paged in input order with per-text errors")
+            
+            status, _, body = call_asgi('GET', f"/api/jobs/{job['id']}")
+            assert status == 200 and json.loads(body)['status'] == 'done'
+            status, _, body = call_asgi('POST', '/api/jobs', b'["Async"]', headers=[(b'x-api-key', b'asgi')])
+            assert status == 202 and json.loads(body)['total'] == 1
+            print("✅ ASGI mode serves the same job API")
+            
+            assert client.post('/api/jobs?webhook=http://example.com/done', json=['Hi']).status_code == 400
+            app.config['JOBS_WEBHOOKS_ENABLED'] = True
+            queued = client.post('/api/jobs?webhook=http://example.com/done', json=['Hi'],
+                                 headers={'X-API-Key': 'webhook'}).get_json()
+            while workers.run_once():
+                pass
+            assert [payload['id'] for payload in notified] == [queued['id']]
+            assert notified[0]['status'] == 'done'
+            print("✅ Webhooks are opt-in and called with the finished job")
+            
+            # A worker that stalls past its lease: the job is reclaimed and only the new holder finishes it
+            stale_id = restarted.submit(['Slow'], 'key:lease')
+            stalled = JobQueue(path, lease=0.0)
+            assert stalled.claim('stalled-worker')['id'] == stale_id
+            time.sleep(0.01)
+            assert restarted.claim('live-worker')['id'] == stale_id
+            assert not stalled.finish(stale_id, 'stalled-worker')
+            assert restarted.get(stale_id)['status'] == 'running'
+            assert restarted.finish(stale_id, 'live-worker') and not restarted.finish(stale_id, 'live-worker')
+            assert restarted.get(stale_id)['status'] == 'done'
+            print("✅ Only the worker holding a job's lease can finish it")
+            
+            # A worker waiting on a busy pool renews its lease, and gives the job up once it was reclaimed
+            busy_id = restarted.submit(['Busy'], 'key:busy')
+            calls = []
+            
+            def reclaimed_while_busy(texts, engine):
+                calls.append(texts)
+                time.sleep(0.01)
+                assert restarted.claim('live-worker')['id'] == busy_id
+                raise PoolBusyError("Scoring pool is busy, please retry shortly")
+            
+            assert JobWorkers(stalled, reclaimed_while_busy, poll_interval=0.01).run_once()
+            assert len(calls) == 1 and restarted.get(busy_id)['processed'] == 0
+            assert restarted.renew(busy_id, 'live-worker') and not restarted.renew(busy_id, 'stalled-worker')
+            assert restarted.finish(busy_id, 'live-worker') and not restarted.renew(busy_id, 'live-worker')
+            
+            def busy_once(texts, engine):
+                calls.append(texts)
+                if len(calls) == 2:
+                    raise PoolBusyError("Scoring pool is busy, please retry shortly")
+                return score_job_chunk(texts, engine)
+            
+            busy_id = restarted.submit(['Busy'], 'key:busy')
+            assert JobWorkers(restarted, busy_once, poll_interval=0.01).run_once()
+            assert len(calls) == 3 and restarted.get(busy_id)['status'] == 'done'
+            print("✅ Busy-pool retries renew the lease and stop once the job is reclaimed")
+        finally:
+            app.config.update(JOBS_PATH='', JOBS_CHUNK_SIZE=500, JOBS_WEBHOOKS_ENABLED=False, API_KEYS='')
+            configure_jobs()
+            configure_admission_control()
+
+def test_aspects():
+    """Test aspect matching and per-aspect sentiment."""
+    
+    print("\n" + "=" * 60)
+    print("ASPECT SENTIMENT TESTS")
+    print("=" * 60)
+    
+    matcher = AspectMatcher(['battery', 'battery life', 'life', 'price'])
+    tokens = 'the battery life and the price'.split()
+    assert sorted(matcher.find_all(tokens)) == [(1, 2, 'battery'), (1, 3, 'battery life'), (2, 3, 'life'), (5, 6, 'price')]
+    assert matcher.find(tokens) == [(1, 3, 'battery life'), (5, 6, 'price')]
+    assert matcher.find('batteryish prices'.split()) == []
+    print("✅ Aho-Corasick matcher finds whole-word, longest non-overlapping aspect terms")
+    
+    text = "The battery life is great, but the screen is terrible. I love the battery."
+    result = analyze_aspects(text)
+    aspects = {item['aspect']: item for item in result['aspects']}
+    assert [item['aspect'] for item in result['aspects']] == ['battery life', 'screen', 'battery']
+    assert aspects['battery life']['sentiment'] == 'Positive' and aspects['screen']['sentiment'] == 'Negative'
+    assert aspects['screen']['contexts'] == ['the screen is terrible']
+    assert result['polarity'] == round(lexicon_scorer.score(text)[0], 3)
+    summary = ', '.join(f"{name} {item['polarity']}" for name, item in aspects.items())
+    print(f"✅ Per-aspect polarity: {summary}")
+    
+    client = app.test_client()
+    body = {'text': "Cheap price, but the delivery was slow and the delivery box was damaged", 'aspects': ['Price', 'delivery']}
+    response = client.post('/api/analyze/aspects', json=body)
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [(item['aspect'], item['mentions']) for item in data['aspects']] == [('Price', 1), ('delivery', 2)]
+    assert client.post('/api/analyze/aspects', json={'text': 'Good', 'aspects': []}).status_code == 400
+    assert client.post('/api/analyze/aspects', json={'text': 'Good', 'window': 0}).status_code == 400
+    status, _, asgi_body = call_asgi('POST', '/api/analyze/aspects', json.dumps(body).encode())
+    assert status == 200 and json.loads(asgi_body) == data
+    print("✅ /api/analyze/aspects (Flask and ASGI) with custom aspects and validation")
+
+def test_prefilter():
+    """Test the language, empty-signal and boilerplate pre-filter."""
+    
+    print("\n" + "=" * 60)
+    print("PRE-FILTER TESTS")
+    print("=" * 60)
+    
+    assert detect_language("Este producto es muy bueno pero la batería es mala") == 'es'
+    assert detect_language("Das ist sehr gut, aber der Akku ist schlecht.") == 'de'
+    assert detect_language("Это отличный товар") == 'ru'
+    assert detect_language("I went to la playa and it was great") == 'en'
+    assert detect_language("Great") == 'en'
+    print("✅ Language detection by script and stopwords")
+    
+    # English reviews made of words that are also Spanish/French/Portuguese/Dutch stopwords
+    english = ["Awful as always, do not buy", "Do as you like, great stuff",
+               "I do love it as much as I can", "La la land is a wonderful film"]
+    for text in english:
+        assert detect_language(text) == 'en' and Prefilter().check(text) is None
+    assert Prefilter().check("Das ist sehr gut, aber nicht great") is None
+    print("✅ English texts (and texts with English lexicon words) are never rejected")
+    
+    prefilter = Prefilter()
+    assert prefilter.check("SENT from my iPhone!") == ('boilerplate', None)
+    assert prefilter.check("😍😍😍 123") == ('no_signal', None)
+    assert prefilter.check(":)") is None
+    assert prefilter.check("Ce produit est très bien, mais la batterie est nulle.") == ('unsupported_language', 'fr')
+    for case in SENTIMENT_TEST_CASES:
+        assert prefilter.check(case['text']) is None
+    print("✅ Boilerplate, emoji-only and non-English texts are flagged, English texts pass")
+    
+    assert 'skipped' not in analyze_sentiment("No comment")
+    print("✅ The pre-filter is off by default")
+    
+    client = app.test_client()
+    texts = ["Este producto es muy bueno pero la batería es mala", "!!! 42 !!!", "No comment", "I love it"]
+    app.config['PREFILTER_ENABLED'] = True
+    configure_prefilter()
+    configure_result_cache()
+    try:
+        response = client.post('/api/analyze/batch', json=texts)
+        results = response.get_json()['results']
+        assert [item.get('skipped') for item in results] == ['unsupported_language', 'no_signal', 'boilerplate', None]
+        assert results[0]['language'] == 'es' and results[0]['sentiment'] == 'Neutral' and results[0]['polarity'] == 0.0
+        assert results[3]['sentiment'] == 'Positive'
+        body = client.get('/metrics').get_data(as_text=True)
+        assert 'sentiment_prefilter_rejected_total{reason="unsupported_language"}' in body
+        print("✅ Flagged texts are answered without scoring and counted on /metrics")
+        
+        result = client.post('/api/analyze', json={'text': english[0]}).get_json()
+        assert 'skipped' not in result and result['sentiment'] == 'Negative' and result['polarity'] == -1.0
+        assert all('skipped' not in item for item in analyze_batch(english))
+        print("✅ English reviews with foreign-looking stopwords are scored, not skipped")
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'boilerplate.txt')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write("# house signatures\nPosted via the ACME app\n")
+            app.config.update(PREFILTER_LANGUAGES='en, es', PREFILTER_BOILERPLATE_PATH=path)
+            configure_prefilter()
+            results = analyze_batch([texts[0], "Posted via the ACME app"])
+            assert 'skipped' not in results[0] and results[1]['skipped'] == 'boilerplate'
+            app.config['PREFILTER_ENABLED'] = False
+            configure_prefilter()
+            assert 'skipped' not in analyze_sentiment("No comment")
+            print("✅ Accepted languages, extra boilerplate and the on/off switch are configurable")
+    finally:
+        app.config.update(PREFILTER_ENABLED=False, PREFILTER_LANGUAGES='en', PREFILTER_BOILERPLATE_PATH='')
+        configure_prefilter()
+        configure_result_cache()
+
+def test_profiling():
+    """Test sampled request tracing and slow-request reports."""
+    
+    print("\n" + "=" * 60)
+    print("PROFILING TESTS")
+    print("=" * 60)
+    
+    profiler = Profiler(sample_rate=1.0, slow_ms=0)
+    assert profiler.start('/api/analyze') is None
+    profiler.enable(duration=60)
+    trace = profiler.start('/api/analyze', 42)
+    trace.enter()
+    try:
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            trace.mark('score')
+    finally:
+        trace.exit()
+    report = profiler.finish(trace, 200)
+    assert report['input_bytes'] == 42 and report['spans']['score']['calls'] > 1
+    assert report['stack_samples'] > 0
+    assert any('test_sentiment.py:test_profiling' in item['stack'] for item in report['stacks'])
+    profiler.enable(duration=0.01)
+    time.sleep(0.02)
+    assert not profiler.is_enabled() and profiler.start('/api/analyze') is None
+    print(f"✅ Traces record spans and {report['stack_samples']} stack samples; profiling switches itself off")
+    
+    client = app.test_client()
+    assert client.get('/debug/profiling').status_code == 404
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'profiles.jsonl')
+        app.config.update(PROFILING_SLOW_MS=0, PROFILING_REPORT_PATH=path, PROFILING_TOKEN='secret',
+                          RESULT_CACHE_ENABLED=False)
+        configure_profiling()
+        configure_result_cache()
+        try:
+            headers = {'X-Profiling-Token': 'secret'}
+            assert client.get('/debug/profiling', headers={'X-Profiling-Token': 'wrong'}).status_code == 403
+            assert client.post('/debug/profiling', json={'enabled': True, 'duration': 10 ** 6},
+                               headers=headers).status_code == 400
+            response = client.post('/debug/profiling', json={'enabled': True, 'sample_rate': 1.0, 'duration': 60},
+                                   headers=headers)
+            assert response.status_code == 200 and response.get_json()['enabled']
+            
+            text = "The battery is great but the screen is awful"
+            assert client.post('/api/analyze?engine=textblob', json={'text': text}).status_code == 200
+            status, _, _ = call_asgi('POST', '/api/analyze?engine=textblob', json.dumps({'text': text}).encode())
+            assert status == 200
+            client.get('/healthz')
+            
+            reports = client.get('/debug/profiling', headers=headers).get_json()['reports']
+            assert [report['route'] for report in reports] == ['/api/analyze', '/api/analyze']
+            for report in reports:
+                assert list(report['spans'])[:2] == ['parse', 'validate']
+                assert report['spans']['engine:textblob']['calls'] == 1 and 'serialize' in report['spans']
+                assert report['texts'] == 1 and report['longest_text'] == len(text)
+                assert text not in json.dumps(report)
+            with open(path, encoding='utf-8') as f:
+                assert [json.loads(line)['route'] for line in f] == ['/api/analyze', '/api/analyze']
+            print("✅ Sampled Flask and ASGI requests leave reports with stage and TextBlob spans, no texts")
+            
+            response = client.post('/debug/profiling', json={'enabled': False}, headers=headers)
+            assert not response.get_json()['enabled']
+            client.post('/api/analyze', json={'text': text})
+            assert client.get('/debug/profiling', headers=headers).get_json()['sampled'] == 2
+            print("✅ /debug/profiling needs the token and switches sampling on and off")
+        finally:
+            app.config.update(PROFILING_SLOW_MS=500, PROFILING_REPORT_PATH='', PROFILING_TOKEN='',
+                              RESULT_CACHE_ENABLED=True)
+            configure_profiling()
+            configure_result_cache()
+
 def test_textblob_installation():
     """Test if TextBlob is properly installed with required corpora."""
     
@@ -205,6 +1162,66 @@ if __name__ == "__main__":
     # Test edge cases
     test_edge_cases()
     
+    # Test batch analysis
+    test_batch_analysis()
+    
+    # Test the lexicon scorer against TextBlob
+    test_lexicon_scorer_matches_textblob()
+    
+    # Test the result cache
+    test_result_cache()
+    
+    # Test the scoring pool
+    test_scoring_pool()
+    
+    # Test bulk scoring
+    test_bulk_score()
+    
+    # Test the ASGI serving mode
+    test_asgi_app()
+    
+    # Test the metrics endpoint
+    test_metrics_endpoint()
+    
+    # Test long documents
+    test_long_document()
+    
+    # Test the load-testing suite
+    test_load_test()
+    
+    # Test health and readiness probes
+    test_health_and_readiness()
+    
+    # Test the persistent result store
+    test_result_store()
+    
+    # Test the fast JSON path
+    test_fast_json()
+    
+    # Test page caching and static assets
+    test_page_cache()
+    
+    # Test response compression
+    test_compression()
+    
+    # Test rate limiting and admission control
+    test_admission_control()
+    
+    # Test the sentiment engines
+    test_engines()
+    
+    # Test the background job API
+    test_jobs()
+    
+    # Test aspect-level sentiment
+    test_aspects()
+    
+    # Test the pre-scoring filter
+    test_prefilter()
+    
+    # Test request profiling
+    test_profiling()
+    
     print("\n🎉 All tests completed!")
     print("\nTo run the web application:")
     print("   python app.py")